@@ -0,0 +1 @@
+# Benchmark scripts (run from backend/, e.g. `python -m benchmarks.bench_terrain`)
@@ -0,0 +1,76 @@
+"""
+Executor load benchmark - generation throughput per executor kind and pool size
+
+Runs many offline generations (fallback-parsed specs, no LLM) concurrently
+through GenerationExecutor and reports jobs per second, so throughput can
+be compared across inline, thread and process pools as workers are added.
+
+Usage (from backend/):
+    python -m benchmarks.bench_executor [--jobs N] [--size STUDS]
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Dict, List
+
+from core.executor import GenerationExecutor, generate_stage, convert_stage
+from core.prompt_processor import PromptProcessor
+
+PROMPTS = [
+    "a mountain fortress",
+    "a desert oasis",
+    "a forest village",
+    "a tropical island",
+    "a quiet valley",
+    "open plains"
+]
+
+
+async def _run_job(executor: GenerationExecutor, index: int, size: int):
+    """Run the CPU stages of one job"""
+    spec = PromptProcessor._fallback_parse(None, PROMPTS[index % len(PROMPTS)], {})
+    world_data = await executor.run(generate_stage, spec, {"size": size, "seed": index})
+    await executor.run(convert_stage, world_data)
+
+
+async def _measure(kind: str, workers: int, jobs: int, size: int) -> float:
+    """Jobs per second for one executor configuration"""
+    executor = GenerationExecutor(kind=kind, workers=workers)
+    try:
+        await executor.warm_up()
+        start = time.perf_counter()
+        await asyncio.gather(*(_run_job(executor, i, size) for i in range(jobs)))
+        return jobs / (time.perf_counter() - start)
+    finally:
+        executor.shutdown()
+
+
+def run(jobs: int = 24, size: int = 2048) -> List[Dict[str, float]]:
+    """Measure every executor kind at pool sizes up to the CPU count"""
+    cpus = os.cpu_count() or 1
+    pool_sizes = sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1))) or [1]
+
+    results = [{"kind": "inline", "workers": 1,
+                "jobs_per_s": asyncio.run(_measure("inline", 1, jobs, size))}]
+    for kind in ("thread", "process"):
+        for workers in pool_sizes:
+            results.append({"kind": kind, "workers": workers,
+                            "jobs_per_s": asyncio.run(_measure(kind, workers, jobs, size))})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=24)
+    parser.add_argument("--size", type=int, default=2048)
+    args = parser.parse_args()
+
+    print(f"{args.jobs} jobs, {args.size}-stud worlds, {os.cpu_count()} CPUs")
+    print(f"{'executor':<10}{'workers':>8}{'jobs/s':>10}")
+    for row in run(args.jobs, args.size):
+        print(f"{row['kind']:<10}{row['workers']:>8}{row['jobs_per_s']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Heightmap encoding benchmark - nested JSON float lists vs the int16 codec
+
+Usage (from backend/):
+    python -m benchmarks.bench_heightmap [--repeat N] [--terrain TYPE]
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from core.heightmap_codec import decode_heightmap, encode_heightmap
+from core.terrain import TerrainEngine
+
+RESOLUTIONS = [64, 128, 256, 512]
+
+# name -> (encode, decode); every encoder produces the JSON text a world
+# file would carry for its heightmap
+FORMATS: Dict[str, Tuple[Callable[[np.ndarray], str], Callable[[str], np.ndarray]]] = {
+    "json-indent2": (
+        lambda h: json.dumps(h.tolist(), indent=2),
+        lambda s: np.array(json.loads(s))
+    ),
+    "json-compact": (
+        lambda h: json.dumps(h.tolist(), separators=(",", ":")),
+        lambda s: np.array(json.loads(s))
+    ),
+    "int16": (
+        lambda h: json.dumps(encode_heightmap(h, delta=False, compress=False)),
+        lambda s: decode_heightmap(json.loads(s))
+    ),
+    "int16+zlib": (
+        lambda h: json.dumps(encode_heightmap(h, delta=False)),
+        lambda s: decode_heightmap(json.loads(s))
+    ),
+    "int16+delta+zlib": (
+        lambda h: json.dumps(encode_heightmap(h)),
+        lambda s: decode_heightmap(json.loads(s))
+    )
+}
+
+
+def _best_time(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """Best wall time of `repeat` runs in milliseconds, and the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def run(terrain_type: str = "mountain", repeat: int = 3) -> List[Dict[str, Any]]:
+    """Measure size, encode/decode time and error for every format and resolution"""
+    results = []
+    for resolution in RESOLUTIONS:
+        engine = TerrainEngine(max_resolution=resolution)
+        heights = engine.generate(terrain_type, resolution * 4, {"height_variation": 0.5}, seed=1)["heightmap"]
+        for name, (encode, decode) in FORMATS.items():
+            encode_ms, text = _best_time(lambda: encode(heights), repeat)
+            decode_ms, decoded = _best_time(lambda: decode(text), repeat)
+            results.append({
+                "format": name,
+                "resolution": resolution,
+                "bytes": len(text.encode("utf-8")),
+                "encode_ms": encode_ms,
+                "decode_ms": decode_ms,
+                "max_error": float(np.abs(decoded - heights).max())
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--terrain", default="mountain")
+    args = parser.parse_args()
+
+    print(f"{'format':<18}{'res':>6}{'bytes':>12}{'ratio':>8}{'enc ms':>10}{'dec ms':>10}{'max err':>10}")
+    baseline = {}
+    for row in run(args.terrain, args.repeat):
+        baseline.setdefault(row["resolution"], row["bytes"])
+        ratio = baseline[row["resolution"]] / row["bytes"]
+        print(
+            f"{row['format']:<18}{row['resolution']:>6}{row['bytes']:>12,}{ratio:>7.1f}x"
+            f"{row['encode_ms']:>10.2f}{row['decode_ms']:>10.2f}{row['max_error']:>10.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
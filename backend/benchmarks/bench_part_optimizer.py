@@ -0,0 +1,100 @@
+"""
+Part optimizer benchmark - part counts and time of the merge pass on block builds and generated worlds
+
+Block builds are what the pass is for: floors, walls and stacks of
+unit blocks, with parts hidden inside larger ones. Generated worlds
+show what it finds in the pipeline's own output (objects with random
+rotations never merge).
+
+Usage (from backend/):
+    python -m benchmarks.bench_part_optimizer [--repeat N] [--blocks N]
+"""
+import argparse
+import copy
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.workloads import benchmark_spec
+from core.executor import generate_stage
+from core.part_optimizer import optimize_parts, optimize_world
+from core.terrain import SurfaceSampler
+from core.world_generator import WorldGenerator
+
+
+def _block(x: float, y: float, z: float, material: str = "Brick", size: float = 4.0) -> Dict[str, Any]:
+    return {
+        "shape": "block",
+        "size": {"x": size, "y": size, "z": size},
+        "position": {"x": x, "y": y, "z": z},
+        "material": material,
+        "color": [180, 180, 180]
+    }
+
+
+def _builds(blocks: int, rng: np.random.Generator) -> Dict[str, List[Dict[str, Any]]]:
+    """Synthetic block builds of about `blocks` parts each"""
+    side = int(blocks ** 0.5)
+    height = max(1, blocks // (4 * side))
+    floor = [_block(4 * i, 0, 4 * j) for i in range(side) for j in range(side)]
+    walls = [_block(4 * i, 4 * k, 4 * j)
+             for k in range(height) for i in range(side) for j in (0, side - 1)]
+    walls += [_block(4 * i, 4 * k, 4 * j)
+              for k in range(height) for j in range(1, side - 1) for i in (0, side - 1)]
+    # Two materials at random: only same-material neighbours merge
+    mixed = [_block(4 * i, 0, 4 * j, "Brick" if rng.random() < 0.5 else "Slate")
+             for i in range(side) for j in range(side)]
+    # Small parts inside big ones (furniture in solid rooms)
+    hidden = [_block(40 * i, 0, 0, size=16) for i in range(blocks // 10)]
+    hidden += [_block(40 * i + rng.uniform(-4, 4), rng.uniform(-4, 4), rng.uniform(-4, 4), "Wood", 2)
+               for i in range(blocks // 10) for _ in range(9)]
+    return {"floor": floor, "walls": walls, "mixed": mixed, "hidden": hidden}
+
+
+def _best_time(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """Best wall time of `repeat` runs in milliseconds, and the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def run(blocks: int, repeat: int) -> List[Dict[str, Any]]:
+    """Optimize every build and a few generated worlds, counting parts before and after"""
+    rng = np.random.default_rng(1)
+    results = []
+    for name, parts in _builds(blocks, rng).items():
+        ms, (optimized, counts) = _best_time(lambda: optimize_parts(parts), repeat)
+        results.append({"case": name, "before": len(parts), "after": len(optimized), "ms": ms, **counts})
+
+    generator = WorldGenerator(object_output="parts")
+    for terrain in ("mountain", "island"):
+        world_data = generate_stage(benchmark_spec(terrain, "high", 1000), {"size": 512, "seed": 1})
+        world = generator.to_roblox_format_sync(world_data)
+        surface = SurfaceSampler(world_data["terrain"]["heightmap"], world_data["size"])
+        copies = iter([copy.deepcopy(world) for _ in range(repeat)])
+        ms, stats = _best_time(lambda: optimize_world(next(copies), surface), repeat)
+        results.append({"case": f"world/{terrain}", "before": stats["parts_before"],
+                        "after": stats["parts_after"], "ms": ms,
+                        "hidden": stats["hidden"], "merged": stats["merged"]})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--blocks", type=int, default=2500, help="Parts per synthetic build")
+    args = parser.parse_args()
+
+    print(f"{'case':<16}{'before':>9}{'after':>9}{'hidden':>9}{'merged':>9}{'ratio':>9}{'ms':>10}")
+    for row in run(args.blocks, args.repeat):
+        print(f"{row['case']:<16}{row['before']:>9,}{row['after']:>9,}{row['hidden']:>9,}{row['merged']:>9,}"
+              f"{row['before'] / max(row['after'], 1):>8.1f}x{row['ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
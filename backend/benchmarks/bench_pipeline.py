@@ -0,0 +1,257 @@
+"""
+Pipeline benchmark - the full offline generation pipeline over a matrix of worlds, with baselines
+
+Runs fallback parse -> generate -> terrain tiles (tiled sizes) -> Roblox
+format -> save for every combination of terrain type, world size,
+complexity and object count, and reports latency percentiles per stage,
+peak traced memory and output bytes. Results are written as JSON;
+passing an earlier result file as --baseline compares against it and
+exits non-zero when a case got slower, bigger or hungrier than the
+threshold allows.
+
+Complexity only reaches the LLM prompt in the API. Offline it selects
+how rich the spec is: "low" keeps the fallback spec, "medium" adds a
+house, "high" adds a castle and houses and spreads objects over more
+types.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pipeline [--quick] [--sizes STUDS ...] [--terrains TYPE ...]
+        [--complexities LEVEL ...] [--objects N ...] [--repeat N]
+        [--output results.json] [--baseline baseline.json] [--threshold 0.25]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.workloads import benchmark_spec
+from core.executor import convert_stage, generate_stage, terrain_tile_stage
+from core.terrain import TILED_THRESHOLD
+from utils.storage import StorageManager
+
+TERRAINS = ["plains", "mountain", "island", "desert"]
+SIZES = [128, 512, 2048, 4096]
+COMPLEXITIES = ["low", "medium", "high"]
+OBJECT_COUNTS = [0, 1000, 10000]
+QUICK = {"terrains": ["mountain", "island"], "sizes": [128, 512, 2048],
+         "complexities": ["low", "high"], "objects": [0, 1000]}
+
+STAGES = ["parse", "generate", "tiles", "convert", "save"]
+PERCENTILES = (50, 90, 99)
+
+# Regressions are flagged for these metrics (case value / baseline value - 1)
+COMPARED = {"p50_ms": "latency_ms.p50", "peak_mb": "peak_mb", "bytes": "bytes"}
+# ...when they also grew by more than this much, so timer noise on tiny
+# worlds is not reported
+NOISE_FLOOR = {"p50_ms": 5.0, "peak_mb": 1.0, "bytes": 1024}
+
+
+def _run_once(case: Dict[str, Any], storage: StorageManager, seed: int) -> Tuple[Dict[str, float], Dict[str, Any]]:
+    """One pass through the pipeline; (milliseconds per stage, output sizes)"""
+    size = case["size"]
+    options = {"size": size, "seed": seed,
+               "terrain_mode": "tiled" if size > TILED_THRESHOLD else "single"}
+    stages: Dict[str, float] = {}
+
+    start = time.perf_counter()
+    spec = benchmark_spec(case["terrain"], case["complexity"], case["objects"])
+    stages["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    world_data = generate_stage(spec, options)
+    stages["generate"] = time.perf_counter() - start
+
+    tile_bytes = 0
+    start = time.perf_counter()
+    layout = (world_data["terrain"] or {}).get("tiles")
+    if layout:
+        for row in range(layout["tiles_per_side"]):
+            for col in range(layout["tiles_per_side"]):
+                tile = terrain_tile_stage(layout, row, col)
+                tile_bytes += os.path.getsize(
+                    storage.save_terrain_tile(layout["key"], row, col, tile)
+                )
+    stages["tiles"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    roblox_world = convert_stage(world_data)
+    stages["convert"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    path = asyncio.run(storage.save_world("bench", roblox_world))
+    stages["save"] = time.perf_counter() - start
+
+    workspace = roblox_world["workspace"]
+    instances = workspace.get("instances") or {}
+    output = {
+        "bytes": os.path.getsize(path),
+        "tile_bytes": tile_bytes,
+        "parts": len(workspace.get("parts", [])),
+        "models": len(workspace.get("models", [])),
+        "instances": sum(len(group["positions"]) // 3 for group in instances.get("groups", []))
+    }
+    return {stage: seconds * 1000 for stage, seconds in stages.items()}, output
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    summary = {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+    summary.update(mean=float(np.mean(values)), min=float(np.min(values)), max=float(np.max(values)))
+    return {key: round(value, 3) for key, value in summary.items()}
+
+
+def run_case(case: Dict[str, Any], repeat: int, root: Path) -> Dict[str, Any]:
+    """Time `repeat` runs of a case, then trace one more for peak memory"""
+    storage = StorageManager(str(root / "storage"))
+    try:
+        # Warm-up: imports, NumPy caches and the first-write file system paths
+        _run_once(case, storage, seed=0)
+        runs = [_run_once(case, storage, seed=i + 1) for i in range(repeat)]
+
+        tracemalloc.start()
+        try:
+            _run_once(case, storage, seed=1)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        storage.close()
+        shutil.rmtree(root / "storage", ignore_errors=True)
+
+    totals = [sum(stages.values()) for stages, _ in runs]
+    return {
+        **case,
+        "case": case_key(case),
+        "repeat": repeat,
+        "latency_ms": _percentiles(totals),
+        "stages_ms": {stage: _percentiles([stages[stage] for stages, _ in runs]) for stage in STAGES},
+        "peak_mb": round(peak / 2**20, 2),
+        **runs[-1][1]
+    }
+
+
+def case_key(case: Dict[str, Any]) -> str:
+    return f"{case['terrain']}/{case['size']}/{case['complexity']}/{case['objects']}"
+
+
+def _environment() -> Dict[str, Any]:
+    """Where the results came from, so baselines are compared like for like"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+
+def _lookup(result: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = result
+    for key in path.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+            threshold: float) -> List[Dict[str, Any]]:
+    """
+    Relative change of every compared metric for cases present in both runs
+
+    Returns:
+        One row per case and metric, with `regression` set where the
+        metric grew by more than `threshold` and by more than its noise floor
+    """
+    previous = {row["case"]: row for row in baseline}
+    rows = []
+    for result in results:
+        before = previous.get(result["case"])
+        if before is None:
+            continue
+        for metric, path in COMPARED.items():
+            new, old = _lookup(result, path), _lookup(before, path)
+            if not new or not old:
+                continue
+            change = new / old - 1
+            rows.append({"case": result["case"], "metric": metric, "baseline": old, "value": new,
+                         "change": round(change, 4),
+                         "regression": change > threshold and new - old > NOISE_FLOOR[metric]})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="Small matrix for a fast check")
+    parser.add_argument("--terrains", nargs="+")
+    parser.add_argument("--sizes", type=int, nargs="+")
+    parser.add_argument("--complexities", nargs="+", choices=COMPLEXITIES)
+    parser.add_argument("--objects", type=int, nargs="+")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_pipeline.json")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Relative growth counted as a regression")
+    args = parser.parse_args()
+
+    defaults = QUICK if args.quick else {"terrains": TERRAINS, "sizes": SIZES,
+                                         "complexities": COMPLEXITIES, "objects": OBJECT_COUNTS}
+    cases = [
+        {"terrain": terrain, "size": size, "complexity": complexity, "objects": objects}
+        for terrain in args.terrains or defaults["terrains"]
+        for size in args.sizes or defaults["sizes"]
+        for complexity in args.complexities or defaults["complexities"]
+        for objects in args.objects or defaults["objects"]
+    ]
+
+    root = Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    results = []
+    print(f"{'case':<30}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'peak MB':>9}{'bytes':>13}{'slowest stage':>15}")
+    try:
+        for case in cases:
+            row = run_case(case, args.repeat, root)
+            results.append(row)
+            slowest = max(STAGES, key=lambda stage: row["stages_ms"][stage]["p50"])
+            latency = row["latency_ms"]
+            print(f"{row['case']:<30}{latency['p50']:>10.1f}{latency['p90']:>10.1f}{latency['p99']:>10.1f}"
+                  f"{row['peak_mb']:>9.1f}{row['bytes']:>13,}{slowest:>15}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    report = {"environment": _environment(), "repeat": args.repeat, "results": results}
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compare(results, baseline["results"], args.threshold)
+        report["baseline"] = {"file": args.baseline, "environment": baseline.get("environment"),
+                              "threshold": args.threshold, "comparison": comparison}
+        regressions = [row for row in comparison if row["regression"]]
+        print(f"\n{len(comparison)} metrics compared with {args.baseline}, {len(regressions)} regressions")
+        for row in regressions:
+            print(f"  {row['case']:<30}{row['metric']:<8}{row['baseline']:>12,.1f} -> {row['value']:>12,.1f}"
+                  f"  (+{row['change']:.0%})")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Placement benchmark - uniform scattering vs blue-noise placement with collision checks
+
+Places one object group on an island with a castle in the middle and
+reports time, objects placed, overlapping pairs, objects in water and
+objects inside the structure footprint.
+
+Usage (from backend/):
+    python -m benchmarks.bench_placement [--counts N ...] [--size STUDS]
+"""
+import argparse
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from core.placement import Placer, footprint_radius, structure_footprint
+from core.terrain import WATER_LEVEL, TerrainEngine
+from core.world_generator import WorldGenerator
+
+COUNTS = [1000, 10000, 100000]
+
+
+def _legacy(rng: np.random.Generator, world_size: int, count: int, spread: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Reference implementation: the original uniform offsets around the center"""
+    x = rng.uniform(-spread, spread, count) * world_size
+    z = rng.uniform(-spread, spread, count) * world_size
+    return x.astype(int).astype(float), z.astype(int).astype(float)
+
+
+def _overlapping_pairs(x: np.ndarray, z: np.ndarray, radius: float) -> int:
+    """Pairs of footprints closer than 2 * radius (grid cells of that size)"""
+    cell = 2 * radius
+    cx = np.floor(x / cell).astype(np.int64)
+    cz = np.floor(z / cell).astype(np.int64)
+    order = np.lexsort((cz, cx))
+    keys = (cx[order] << 32) + cz[order]
+    pairs = 0
+    for dx, dz in [(0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]:
+        other = ((cx + dx) << 32) + (cz + dz)
+        start = np.searchsorted(keys, other, side="left")
+        stop = np.searchsorted(keys, other, side="right")
+        for offset in range(int((stop - start).max(initial=0))):
+            live = start + offset < stop
+            j = order[np.minimum(start + offset, len(order) - 1)]
+            close = (x - x[j]) ** 2 + (z - z[j]) ** 2 < cell * cell
+            if (dx, dz) == (0, 0):
+                # Same cell: count each unordered pair once
+                close &= j > np.arange(len(x))
+            pairs += int(np.count_nonzero(live & close))
+    return pairs
+
+
+def run(counts: List[int], world_size: int, spread: float = 0.45) -> List[Dict[str, Any]]:
+    """Place every count with both methods and measure the result"""
+    generator = WorldGenerator()
+    terrain = TerrainEngine().generate("island", world_size, {}, seed=7)
+    heights = terrain["heightmap"]
+    castle = generator._generate_structure(
+        {"type": "castle", "position": {"x": 0.5, "y": 0, "z": 0.5},
+         "size": {"width": 60, "height": 80, "depth": 60}},
+        world_size
+    )
+    footprint = structure_footprint(castle)
+    radius = footprint_radius(generator._get_object_size("tree"))
+    rows = heights.shape[0]
+
+    def measure(x: np.ndarray, z: np.ndarray) -> Dict[str, int]:
+        i = np.clip(((x + world_size / 2) * rows / world_size).astype(int), 0, rows - 1)
+        j = np.clip(((z + world_size / 2) * rows / world_size).astype(int), 0, rows - 1)
+        min_x, min_z, max_x, max_z = footprint
+        return {
+            "placed": len(x),
+            "overlaps": _overlapping_pairs(x, z, radius),
+            "in_water": int(np.count_nonzero(heights[i, j] <= WATER_LEVEL)),
+            "in_structure": int(np.count_nonzero(
+                (x > min_x - radius) & (x < max_x + radius) & (z > min_z - radius) & (z < max_z + radius)
+            ))
+        }
+
+    results = []
+    for count in counts:
+        start = time.perf_counter()
+        x, z = _legacy(np.random.default_rng(1), world_size, count, spread)
+        elapsed = time.perf_counter() - start
+        results.append({"method": "uniform", "count": count, "ms": elapsed * 1000, **measure(x, z)})
+
+        start = time.perf_counter()
+        placer = Placer(world_size, heights)
+        placer.add_structure(castle)
+        x, z = placer.place(np.random.default_rng(1), (0, 0), spread * world_size, count, radius)
+        elapsed = time.perf_counter() - start
+        results.append({"method": "blue-noise", "count": count, "ms": elapsed * 1000, **measure(x, z)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=COUNTS)
+    parser.add_argument("--size", type=int, default=4096)
+    args = parser.parse_args()
+
+    print(f"{'method':<12}{'count':>9}{'ms':>10}{'placed':>9}{'overlaps':>10}{'in water':>10}{'in struct':>11}")
+    for row in run(args.counts, args.size):
+        print(
+            f"{row['method']:<12}{row['count']:>9,}{row['ms']:>10.1f}{row['placed']:>9,}"
+            f"{row['overlaps']:>10,}{row['in_water']:>10,}{row['in_structure']:>11,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
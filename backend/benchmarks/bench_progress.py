@@ -0,0 +1,122 @@
+"""
+Progress load test - status requests per job for polling vs long-poll vs SSE
+
+Runs the API in-process (embedded worker, in-memory job store, storage in a
+temp directory) and follows concurrent jobs the way each client would:
+the plugin's old Heartbeat polling (one request per frame), the frontend's
+2-second interval, the long-poll cursor and a single SSE stream.
+
+Usage (from backend/):
+    python -m benchmarks.bench_progress [--jobs N] [--size STUDS]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+FINISHED = ("completed", "failed")
+
+
+async def follow_polling(client: httpx.AsyncClient, job_id: str, interval: float) -> int:
+    """Poll /api/status every `interval` seconds; returns requests made"""
+    requests = 0
+    while True:
+        requests += 1
+        status = (await client.get(f"/api/status/{job_id}")).json()
+        if status["status"] in FINISHED:
+            return requests
+        await asyncio.sleep(interval)
+
+
+async def follow_long_poll(client: httpx.AsyncClient, job_id: str) -> int:
+    """Long-poll /api/status with the (status, progress) cursor"""
+    requests = 0
+    params: Dict[str, Any] = {"wait": 25}
+    while True:
+        requests += 1
+        status = (await client.get(f"/api/status/{job_id}", params=params)).json()
+        if status["status"] in FINISHED:
+            return requests
+        params.update(status=status["status"], progress=status["progress"])
+
+
+async def follow_sse(client: httpx.AsyncClient, job_id: str) -> int:
+    """Read the SSE stream to the end (one request)"""
+    async with client.stream("GET", f"/api/progress/{job_id}/stream") as response:
+        async for _ in response.aiter_lines():
+            pass
+    return 1
+
+
+MODES = {
+    "heartbeat-poll": lambda client, job_id: follow_polling(client, job_id, 1 / 60),
+    "2s-poll": lambda client, job_id: follow_polling(client, job_id, 2.0),
+    "long-poll": follow_long_poll,
+    "sse": follow_sse
+}
+
+
+async def run(jobs: int, size: int) -> List[Dict[str, Any]]:
+    """Follow `jobs` concurrent jobs with every client mode"""
+    import main
+
+    await main.startup()
+    transport = httpx.ASGITransport(app=main.app)
+    results = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for seed, (mode, follow) in enumerate(MODES.items()):
+                start = time.perf_counter()
+                job_ids = [
+                    (await client.post("/api/generate", json={
+                        "prompt": "an island with a lighthouse",
+                        "world_size": size,
+                        "seed": seed * jobs + i
+                    })).json()["job_id"]
+                    for i in range(jobs)
+                ]
+                counts = await asyncio.gather(*(follow(client, job_id) for job_id in job_ids))
+                results.append({
+                    "mode": mode,
+                    "requests": sum(counts),
+                    "per_job": sum(counts) / jobs,
+                    "seconds": time.perf_counter() - start
+                })
+    finally:
+        await main.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--size", type=int, default=16384, help="World size (tiled above 2048)")
+    args = parser.parse_args()
+
+    # Isolated, single-process setup; the LLM endpoint is unreachable so
+    # prompts take the fallback parser
+    sys.path.insert(0, os.getcwd())
+    os.environ.setdefault("JOB_STORE_URL", "memory://")
+    os.environ.setdefault("GENERATION_EXECUTOR", "thread")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:9/v1")
+    os.environ.setdefault("LLM_MAX_RETRIES", "0")
+    os.chdir(tempfile.mkdtemp(prefix="bench_progress_"))
+
+    results = asyncio.run(run(args.jobs, args.size))
+    baseline = results[0]["per_job"]
+    print(f"{'mode':<16}{'requests':>10}{'per job':>10}{'vs heartbeat':>14}{'seconds':>10}")
+    for row in results:
+        print(
+            f"{row['mode']:<16}{row['requests']:>10}{row['per_job']:>10.1f}"
+            f"{baseline / row['per_job']:>13.0f}x{row['seconds']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
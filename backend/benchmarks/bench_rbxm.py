@@ -0,0 +1,98 @@
+"""
+Roblox model export benchmark - .rbxm export time and size vs the JSON world, round-tripped through a reference reader
+
+Each world is exported with core.rbxm, read back by the reference reader
+in benchmarks.rbxm_reader (written from the file format description,
+sharing no code with the writer) and compared, instance by instance,
+with the tree the plugin's JSON import builds. The instance count is also the
+number of Instance.new/Clone calls the Lua import makes, which an .rbxm
+insert avoids.
+
+Usage (from backend/):
+    python -m benchmarks.bench_rbxm [--counts N ...] [--repeat N]
+"""
+import argparse
+import struct
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.rbxm_reader import check_round_trip, lz4, rotated_model
+from benchmarks.workloads import benchmark_spec, build_object_table, random_placements
+from core.rbxm import iter_rbxm
+from core.world_generator import WorldGenerator
+from utils.serialization import dumps_json, loads_json
+
+COUNTS = [1_000, 100_000, 1_000_000]
+
+
+def _matches(world: Dict[str, Any], data: bytes) -> bool:
+    """Whether an export reads back as the plugin's import of the world"""
+    try:
+        check_round_trip(world, data)
+    except AssertionError:
+        return False
+    return True
+
+
+def _best_time(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """Best wall time of `repeat` runs in milliseconds, and the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def run(counts: List[int], repeat: int, check_max: int) -> List[Dict[str, Any]]:
+    """Export worlds of every object count in both object outputs; round-trip the smaller ones"""
+    rng = np.random.default_rng(1)
+    results = []
+    for output in ("instanced", "parts"):
+        generator = WorldGenerator(object_output=output, terrain_voxels=False)
+        for count in counts:
+            world_data = generator.generate_sync(benchmark_spec("mountain", "high", 0), {"size": 1024, "seed": 1})
+            world_data["objects"] = build_object_table(generator, random_placements(count))
+            world = generator.to_roblox_format_sync(world_data)
+            world["workspace"]["models"].append(rotated_model(rng, 50))
+            json_bytes = len(dumps_json(world, compact=True))
+            # Saved worlds come back from JSON as plain dicts and lists
+            loaded = loads_json(dumps_json(world))
+            for source, data in (("view", world), ("loaded", loaded)):
+                if source == "view" and output == "instanced":
+                    continue
+                ms, rbxm = _best_time(lambda: b"".join(iter_rbxm(data)), repeat)
+                results.append({
+                    "output": output,
+                    "source": source,
+                    "objects": count,
+                    "instances": struct.unpack("<i", rbxm[20:24])[0],
+                    "json_bytes": json_bytes,
+                    "rbxm_bytes": len(rbxm),
+                    "ms": ms,
+                    "match": _matches(loaded, rbxm) if count <= check_max else None
+                })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=COUNTS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--check-max", type=int, default=100_000,
+                        help="Largest object count to round-trip through the (slow) reference reader")
+    args = parser.parse_args()
+
+    print(f"lz4 chunk compression: {'on' if lz4 is not None else 'off (lz4 not installed)'}")
+    print(f"{'output':<11}{'source':<8}{'objects':>11}{'instances':>11}{'JSON MB':>9}{'rbxm MB':>9}{'export ms':>11}  match")
+    for row in run(args.counts, args.repeat, args.check_max):
+        print(f"{row['output']:<11}{row['source']:<8}{row['objects']:>11,}{row['instances']:>11,}"
+              f"{row['json_bytes'] / 2**20:>9.1f}"
+              f"{row['rbxm_bytes'] / 2**20:>9.1f}{row['ms']:>11.1f}  {'' if row['match'] is None else row['match']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Storage benchmark - world write/read throughput and event-loop stalls per storage format
+
+Compares the old StorageManager save (blocking json.dump with indent=2 on
+the event loop) with the threaded, atomic writer in each format, with and
+without orjson, and reports bytes on disk, write/read throughput and the
+longest event-loop stall seen while saving.
+
+Usage (from backend/):
+    python -m benchmarks.bench_storage [--size STUDS] [--objects N] [--repeat N]
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import utils.serialization as serialization
+from core.world_generator import WorldGenerator
+from utils.serialization import json_default
+from utils.storage import StorageManager
+
+# name -> (world format, compression, use orjson)
+CONFIGS: Dict[str, Tuple[str, Any, bool]] = {
+    "json pretty": ("pretty", None, False),
+    "json compact": ("compact", None, False),
+    "orjson pretty": ("pretty", None, True),
+    "orjson compact": ("compact", None, True),
+    "orjson compact+gzip": ("compact", "gzip", True)
+}
+
+
+async def _legacy_save(path: Path, world: Dict[str, Any]):
+    """Reference implementation: the original blocking save"""
+    with open(path, "w") as f:
+        json.dump(world, f, indent=2, default=json_default)
+
+
+async def _legacy_load(path: Path) -> Dict[str, Any]:
+    """Reference implementation: the original blocking load"""
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+async def _timed(fn: Callable[[], Awaitable[Any]]) -> Tuple[float, float]:
+    """Run a coroutine while a 1 ms ticker watches the loop; (seconds, longest stall in ms)"""
+    stall = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal stall
+        last = time.perf_counter()
+        while running:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stall = max(stall, now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await fn()
+    elapsed = time.perf_counter() - start
+    running = False
+    await task
+    return elapsed, stall * 1000
+
+
+async def run(size: int, objects: int, repeat: int) -> List[Dict[str, Any]]:
+    """Save and load one world `repeat` times per configuration"""
+    generator = WorldGenerator(heightmap_encoding="float")
+    spec = {
+        "terrain": {"type": "mountain"},
+        "objects": [{"type": "tree", "count": objects, "spread": 0.5}]
+    }
+    world = generator.to_roblox_format_sync(generator.generate_sync(spec, {"size": size, "seed": 1}))
+    root = Path(tempfile.mkdtemp(prefix="bench_storage_"))
+    orjson = serialization.orjson
+    results = []
+    try:
+        path = root / "legacy.json"
+        write = min([await _timed(lambda: _legacy_save(path, world)) for _ in range(repeat)])
+        read = min([(await _timed(lambda: _legacy_load(path)))[0] for _ in range(repeat)])
+        results.append({"name": "legacy (blocking)", "bytes": path.stat().st_size,
+                        "write_s": write[0], "stall_ms": write[1], "read_s": read})
+
+        for name, (world_format, compression, use_orjson) in CONFIGS.items():
+            if use_orjson and orjson is None:
+                continue
+            serialization.orjson = orjson if use_orjson else None
+            storage = StorageManager(str(root / name.replace(" ", "_")), world_format, compression or "none")
+            write = min([await _timed(lambda: storage.save_world("bench", world)) for _ in range(repeat)])
+            read = min([(await _timed(lambda: storage.load_world("bench")))[0] for _ in range(repeat)])
+            results.append({"name": name, "bytes": storage.world_path("bench").stat().st_size,
+                            "write_s": write[0], "stall_ms": write[1], "read_s": read})
+            storage.close()
+    finally:
+        serialization.orjson = orjson
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--objects", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.size, args.objects, args.repeat))
+    print(f"{'format':<22}{'bytes':>13}{'write ms':>10}{'write MB/s':>12}{'stall ms':>10}{'read ms':>9}{'read MB/s':>11}")
+    for row in results:
+        mb = row["bytes"] / 1e6
+        print(
+            f"{row['name']:<22}{row['bytes']:>13,}{row['write_s'] * 1000:>10.1f}{mb / row['write_s']:>12.1f}"
+            f"{row['stall_ms']:>10.1f}{row['read_s'] * 1000:>9.1f}{mb / row['read_s']:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Surface sampling benchmark - per-object Python bilinear lookup vs SurfaceSampler
+
+Usage (from backend/):
+    python -m benchmarks.bench_surface [--count N] [--size STUDS] [--repeat N]
+"""
+import argparse
+import math
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from core.terrain import SurfaceSampler, TerrainEngine
+
+TERRAIN_TYPES = ["mountain", "island", "desert"]
+
+
+def _python_sample(heights: List[List[float]], size: int, x: float, z: float) -> Tuple[float, Tuple[float, float, float]]:
+    """Reference implementation: one point at a time over nested lists"""
+    rows, cols = len(heights), len(heights[0])
+    cell_x, cell_z = size / rows, size / cols
+    u = min(max((x + size / 2) / cell_x - 0.5, 0), rows - 1)
+    v = min(max((z + size / 2) / cell_z - 0.5, 0), cols - 1)
+    i0, j0 = int(u), int(v)
+    i1, j1 = min(i0 + 1, rows - 1), min(j0 + 1, cols - 1)
+    fu, fv = u - i0, v - j0
+    h00, h10, h01, h11 = heights[i0][j0], heights[i1][j0], heights[i0][j1], heights[i1][j1]
+    height = (h00 * (1 - fu) * (1 - fv) + h10 * fu * (1 - fv)
+              + h01 * (1 - fu) * fv + h11 * fu * fv)
+    dh_dx = ((h10 - h00) * (1 - fv) + (h11 - h01) * fv) / cell_x
+    dh_dz = ((h01 - h00) * (1 - fu) + (h11 - h10) * fu) / cell_z
+    length = math.sqrt(dh_dx * dh_dx + 1 + dh_dz * dh_dz)
+    return height, (-dh_dx / length, 1 / length, -dh_dz / length)
+
+
+def _best_time(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """Best wall time of `repeat` runs in milliseconds, and the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def run(count: int, size: int, repeat: int) -> List[Dict[str, Any]]:
+    """Sample `count` random placements on each terrain type both ways"""
+    engine = TerrainEngine()
+    rng = np.random.default_rng(0)
+    x = rng.uniform(-size / 2, size / 2, count)
+    z = rng.uniform(-size / 2, size / 2, count)
+
+    results = []
+    for terrain_type in TERRAIN_TYPES:
+        heights = engine.generate(terrain_type, size, {}, seed=1)["heightmap"]
+        nested = heights.tolist()
+        xs, zs = x.tolist(), z.tolist()
+
+        loop_ms, reference = _best_time(
+            lambda: [_python_sample(nested, size, px, pz) for px, pz in zip(xs, zs)], repeat
+        )
+        sampler = SurfaceSampler(heights, size)
+        vector_ms, (sampled, normals) = _best_time(lambda: sampler.sample(x, z), repeat)
+
+        ref_heights = np.array([h for h, _ in reference])
+        ref_normals = np.array([n for _, n in reference])
+        results.append({
+            "terrain": terrain_type,
+            "loop_ms": loop_ms,
+            "vector_ms": vector_ms,
+            "height_error": float(np.abs(ref_heights - sampled).max()),
+            "normal_error": float(np.abs(ref_normals - normals).max())
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.count:,} placements on a {args.size}-stud world")
+    print(f"{'terrain':<10}{'loop ms':>10}{'vector ms':>11}{'speedup':>9}{'h err':>10}{'n err':>10}")
+    for row in run(args.count, args.size, args.repeat):
+        print(
+            f"{row['terrain']:<10}{row['loop_ms']:>10.1f}{row['vector_ms']:>11.2f}"
+            f"{row['loop_ms'] / row['vector_ms']:>8.0f}x{row['height_error']:>10.2e}{row['normal_error']:>10.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Voxelization benchmark - per-column Python loop vs the vectorized voxelizer, with output sizes
+
+The Python reference walks columns and voxels one at a time, the way a
+Luau conversion inside Studio would; it only runs for small worlds.
+Also reports how many terrain calls the plugin makes either way (one
+FillBlock per heightmap sample vs one WriteVoxels per region).
+
+Usage (from backend/):
+    python -m benchmarks.bench_voxels [--repeat N] [--sizes STUDS ...] [--reference-max STUDS]
+"""
+import argparse
+import math
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from core.terrain import WATER_LEVEL, TerrainEngine
+from core.voxels import (
+    AIR, ROCK, SEA_DEPTH, SURFACE_DEPTH, TERRAIN_FLOOR, VOXEL_SIZE, WATER,
+    decode_runs, grid_origin, surface_materials, voxelize_heightmap
+)
+
+TERRAIN_TYPES = ["mountain", "island", "desert"]
+SIZES = [256, 512, 1024, 2048]
+
+
+def _python_voxelize(heights: np.ndarray, terrain_type: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Reference implementation: (x, y, z) materials and quantized occupancy, voxel by voxel"""
+    surface = surface_materials(heights, terrain_type).tolist()
+    rows, cols = heights.shape
+    ground = [[h - SEA_DEPTH if h <= WATER_LEVEL else h for h in row] for row in heights.tolist()]
+    ny = math.ceil((max(max(map(max, ground)), WATER_LEVEL) - TERRAIN_FLOOR) / VOXEL_SIZE)
+    materials = np.zeros((rows, ny, cols), dtype=np.uint8)
+    occupancy = np.zeros((rows, ny, cols), dtype=np.uint8)
+    for i in range(rows):
+        for j in range(cols):
+            height = ground[i][j]
+            for k in range(ny):
+                bottom = TERRAIN_FLOOR + k * VOXEL_SIZE
+                solid = min(max((height - bottom) / VOXEL_SIZE, 0), 1)
+                water = min(max((WATER_LEVEL - bottom) / VOXEL_SIZE, 0), 1)
+                if solid > 0:
+                    material = ROCK if height - bottom - VOXEL_SIZE > SURFACE_DEPTH else surface[i][j]
+                    amount = solid
+                elif water > 0:
+                    material, amount = WATER, water
+                else:
+                    material, amount = AIR, 0
+                quantized = int(np.rint(amount * 255))
+                materials[i, k, j] = material if quantized else AIR
+                occupancy[i, k, j] = quantized
+    return materials, occupancy
+
+
+def _assemble(voxels: Dict[str, Any], size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode every region into one (x, y, z) grid"""
+    columns = size // VOXEL_SIZE
+    height = max(region["size"][1] for region in voxels["regions"])
+    materials = np.zeros((columns, height, columns), dtype=np.uint8)
+    occupancy = np.zeros((columns, height, columns), dtype=np.uint8)
+    origin = grid_origin(size)
+    for region in voxels["regions"]:
+        decoded = decode_runs(region)
+        i = (region["origin"][0] - origin) // VOXEL_SIZE
+        j = (region["origin"][2] - origin) // VOXEL_SIZE
+        nx, ny, nz = region["size"]
+        materials[i:i + nx, :ny, j:j + nz] = decoded["materials"]
+        occupancy[i:i + nx, :ny, j:j + nz] = np.rint(decoded["occupancy"] * 255)
+    return materials, occupancy
+
+
+def _best_time(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """Best wall time of `repeat` runs in milliseconds, and the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def run(sizes: List[int], repeat: int, reference_max: int) -> List[Dict[str, Any]]:
+    """Voxelize every terrain type at every size, checking small sizes against the reference"""
+    engine = TerrainEngine()
+    results = []
+    for terrain_type in TERRAIN_TYPES:
+        for size in sizes:
+            heights = engine.generate(terrain_type, size, {}, seed=1)["heightmap"]
+            numpy_ms, voxels = _best_time(lambda: voxelize_heightmap(heights, size, terrain_type), repeat)
+            regions = voxels["regions"]
+            row = {
+                "terrain": terrain_type,
+                "size": size,
+                "voxels": sum(math.prod(region["size"]) for region in regions),
+                "runs": sum(region["runs"] for region in regions),
+                "raw_bytes": sum(region["bytes"] for region in regions),
+                "encoded_bytes": sum(len(region["data"]) for region in regions),
+                "fill_calls": heights.size,
+                "write_calls": len(regions),
+                "numpy_ms": numpy_ms,
+                "python_ms": None,
+                "match": None
+            }
+            if size <= reference_max and heights.shape == (size // VOXEL_SIZE,) * 2:
+                python_ms, (materials, occupancy) = _best_time(
+                    lambda: _python_voxelize(heights, terrain_type), 1
+                )
+                decoded_materials, decoded_occupancy = _assemble(voxels, size)
+                ny = materials.shape[1]
+                row["python_ms"] = python_ms
+                row["match"] = bool(np.array_equal(decoded_materials[:, :ny], materials)
+                                    and np.array_equal(decoded_occupancy[:, :ny], occupancy))
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--reference-max", type=int, default=512,
+                        help="Largest world size the Python reference runs for")
+    args = parser.parse_args()
+
+    print(f"{'terrain':<10}{'size':>6}{'voxels':>12}{'runs':>10}{'raw KB':>9}{'b64 KB':>9}"
+          f"{'fills':>9}{'writes':>8}{'python ms':>11}{'numpy ms':>10}{'speedup':>9}  match")
+    for row in run(args.sizes, args.repeat, args.reference_max):
+        python = f"{row['python_ms']:>11.1f}" if row["python_ms"] is not None else f"{'-':>11}"
+        speedup = (f"{row['python_ms'] / row['numpy_ms']:>8.0f}x" if row["python_ms"] is not None
+                   else f"{'-':>9}")
+        print(
+            f"{row['terrain']:<10}{row['size']:>6}{row['voxels']:>12,}{row['runs']:>10,}"
+            f"{row['raw_bytes'] / 1024:>9.0f}{row['encoded_bytes'] / 1024:>9.0f}"
+            f"{row['fill_calls']:>9,}{row['write_calls']:>8}{python}{row['numpy_ms']:>10.1f}{speedup}"
+            f"  {'' if row['match'] is None else row['match']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+World model benchmark - object dicts vs the columnar ObjectTable, memory and throughput
+
+Both sides start from the same placed positions and rotations, build the
+world's objects, pickle them (the executor's process hand-off) and
+convert them to instanced Roblox output. The dict side is the
+per-object representation the generator used before ObjectTable.
+
+Usage (from backend/):
+    python -m benchmarks.bench_world_model [--counts N ...] [--repeat N]
+"""
+import argparse
+import gc
+import pickle
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from benchmarks.workloads import build_object_table, random_placements
+from core.world_generator import WorldGenerator
+
+COUNTS = [10_000, 100_000, 1_000_000]
+
+
+def _build_dicts(generator: WorldGenerator, placements) -> List[Dict[str, Any]]:
+    objects = []
+    for obj_type, positions, rotations in placements:
+        size = generator._get_object_size(obj_type)
+        for (x, y, z), rotation in zip(positions.tolist(), rotations.tolist()):
+            objects.append({
+                "type": obj_type,
+                "position": {"x": round(x, 2), "y": round(y, 2), "z": round(z, 2)},
+                "size": dict(size),
+                "rotation": rotation
+            })
+    return objects
+
+
+def _convert_dicts(generator: WorldGenerator, objects: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Instanced output from object dicts: a full part dict per object, grouped by prototype"""
+    prototypes: List[Dict[str, Any]] = []
+    groups: Dict[str, Dict[str, Any]] = {}
+    for obj in objects:
+        part = {
+            "name": obj["type"],
+            "shape": "block",
+            "size": obj["size"],
+            "position": obj["position"],
+            "rotation": {"x": 0, "y": obj.get("rotation", 0), "z": 0},
+            "material": generator._get_material_for_object(obj["type"]),
+            "color": generator._get_color_for_object(obj["type"])
+        }
+        prototype = {field: part[field] for field in ("name", "shape", "size", "material", "color")}
+        key = repr(sorted(prototype.items()))
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {"prototype": len(prototypes), "positions": [], "rotations": []}
+            prototypes.append(prototype)
+        position = part["position"]
+        group["positions"].extend((position["x"], position["y"], position["z"]))
+        group["rotations"].append(round(part["rotation"]["y"], 2))
+    return {"prototypes": prototypes, "groups": list(groups.values())}
+
+
+def _measure(build: Callable[[], Any], convert: Callable[[Any], Any], repeat: int) -> Dict[str, float]:
+    """Best build/pickle/convert times, plus memory held by the built objects and peak while converting"""
+    times = {"build_ms": float("inf"), "pickle_ms": float("inf"), "convert_ms": float("inf")}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        objects = build()
+        times["build_ms"] = min(times["build_ms"], (time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        data = pickle.dumps(objects, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.loads(data)
+        times["pickle_ms"] = min(times["pickle_ms"], (time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        convert(objects)
+        times["convert_ms"] = min(times["convert_ms"], (time.perf_counter() - start) * 1000)
+        del objects
+    times["pickle_bytes"] = len(data)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        objects = build()
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        convert(objects)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    times["held_mb"] = held / 2**20
+    times["peak_mb"] = peak / 2**20
+    return times
+
+
+def run(counts: List[int], repeat: int) -> List[Dict[str, Any]]:
+    generator = WorldGenerator(object_output="instanced")
+    results = []
+    for count in counts:
+        placements = random_placements(count)
+        sides = {
+            "dicts": (lambda: _build_dicts(generator, placements),
+                      lambda objects: _convert_dicts(generator, objects)),
+            "table": (lambda: build_object_table(generator, placements),
+                      generator._instance_objects)
+        }
+        for name, (build, convert) in sides.items():
+            results.append({"model": name, "objects": count, **_measure(build, convert, repeat)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=COUNTS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'model':<8}{'objects':>11}{'build ms':>11}{'pickle ms':>11}{'convert ms':>12}"
+          f"{'pickle MB':>11}{'held MB':>10}{'peak MB':>10}")
+    for row in run(args.counts, args.repeat):
+        print(f"{row['model']:<8}{row['objects']:>11,}{row['build_ms']:>11.1f}{row['pickle_ms']:>11.1f}"
+              f"{row['convert_ms']:>12.1f}{row['pickle_bytes'] / 2**20:>11.2f}{row['held_mb']:>10.1f}"
+              f"{row['peak_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+World writer benchmark - peak memory and time of saving a world, whole-document encode vs streaming
+
+The "dumps" side is the writer StorageManager used before streaming:
+object parts built as a list of dicts, the world encoded into one bytes
+object, then written. The "stream" side keeps the parts as an
+ObjectParts view and writes `iter_json` chunks as they are encoded.
+Every case runs in a fresh process so its peak RSS is its own; both
+sides must write the same bytes.
+
+Usage (from backend/):
+    python -m benchmarks.bench_world_writer [--size STUDS] [--counts N ...] [--formats FORMAT ...]
+"""
+import argparse
+import gc
+import hashlib
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.workloads import build_object_table, random_placements
+from core.world_generator import WorldGenerator
+from utils.serialization import dumps_json, iter_json
+
+COUNTS = [100_000, 500_000, 1_000_000]
+FORMATS = ["pretty", "compact"]
+WRITERS = ["dumps", "stream"]
+
+
+def _rss_mb(field: str) -> float:
+    """VmRSS (current) or VmHWM (peak) of this process in MB"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    # No procfs: ru_maxrss (KB on Linux) is the best there is for either
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _reset_peak() -> bool:
+    """Reset VmHWM to the current RSS (Linux); False if the peak cannot be reset"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _case(writer: str, world_format: str, size: int, count: int) -> Dict[str, Any]:
+    """Build one world and save it with one writer (runs in its own process)"""
+    generator = WorldGenerator(object_output="parts", heightmap_encoding="float")
+    world_data = generator.generate_sync(
+        {"terrain": {"type": "mountain"}}, {"size": size, "seed": 1, "include_objects": False}
+    )
+    world_data["objects"] = build_object_table(generator, random_placements(count))
+    gc.collect()
+    before_mb = _rss_mb("VmRSS")
+
+    start = time.perf_counter()
+    world = generator.to_roblox_format_sync(world_data)
+    if writer == "dumps":
+        world["workspace"]["parts"] = list(world["workspace"]["parts"])
+    convert_seconds = time.perf_counter() - start
+    # Pinned, so both writers' output can be compared byte for byte
+    world["metadata"]["generated_at"] = "2000-01-01 00:00:00"
+    gc.collect()
+    held_mb = _rss_mb("VmRSS")
+    exact = _reset_peak()
+
+    compact = world_format == "compact"
+    digest = hashlib.sha256()
+    path = Path(tempfile.mkdtemp(prefix="bench_world_writer_")) / "world.json"
+    start = time.perf_counter()
+    with open(path, "wb") as f:
+        chunks = [dumps_json(world, compact)] if writer == "dumps" else iter_json(world, compact)
+        for chunk in chunks:
+            f.write(chunk)
+            digest.update(chunk)
+        del chunks
+    write_seconds = time.perf_counter() - start
+    peak_mb = _rss_mb("VmHWM")
+    file_bytes = path.stat().st_size
+    path.unlink()
+    path.parent.rmdir()
+    return {
+        "writer": writer,
+        "format": world_format,
+        "objects": count,
+        "world_mb": held_mb - before_mb,
+        "write_peak_mb": peak_mb - held_mb,
+        "exact_peak": exact,
+        "file_mb": file_bytes / 2**20,
+        "convert_s": convert_seconds,
+        "write_s": write_seconds,
+        "sha256": digest.hexdigest()
+    }
+
+
+def run(size: int, counts: List[int], formats: List[str]) -> List[Dict[str, Any]]:
+    """Save a world of every object count in every format with both writers, one process per case"""
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for count in counts:
+        for world_format in formats:
+            for writer in WRITERS:
+                with context.Pool(1, maxtasksperchild=1) as pool:
+                    results.append(pool.apply(_case, (writer, world_format, size, count)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=2048, help="World size in studs")
+    parser.add_argument("--counts", type=int, nargs="+", default=COUNTS)
+    parser.add_argument("--formats", nargs="+", default=FORMATS, choices=FORMATS)
+    args = parser.parse_args()
+
+    print(f"{'writer':<8}{'format':<9}{'objects':>11}{'world MB':>10}{'write peak MB':>15}"
+          f"{'file MB':>9}{'convert s':>11}{'write s':>9}{'total s':>9}  same output")
+    digests: Dict[Any, str] = {}
+    exact = True
+    for row in run(args.size, args.counts, args.formats):
+        key = (row["format"], row["objects"])
+        same = digests.setdefault(key, row["sha256"]) == row["sha256"]
+        exact = exact and row["exact_peak"]
+        peak = f"{row['write_peak_mb']:.1f}" + ("" if row["exact_peak"] else "*")
+        print(f"{row['writer']:<8}{row['format']:<9}{row['objects']:>11,}{row['world_mb']:>10.1f}{peak:>15}"
+              f"{row['file_mb']:>9.1f}{row['convert_s']:>11.2f}{row['write_s']:>9.2f}"
+              f"{row['convert_s'] + row['write_s']:>9.2f}  {same}")
+    if not exact:
+        print("* peak RSS could not be reset after building the world, so it may be the build's peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Reference .rbxm reader - reads binary Roblox models back and compares them with the plugin's JSON import
+
+Written from the binary file format description; shares no code with
+core.rbxm, so a round trip through it checks the writer rather than
+repeating it. Used by tests/test_rbxm.py and benchmarks.bench_rbxm.
+"""
+import math
+import struct
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    import lz4.block
+except ImportError:
+    lz4 = None
+
+# Enum.Material names by value, for the reader
+MATERIAL_NAMES = {256: "Plastic", 512: "Wood", 848: "Brick", 896: "Rock", 1296: "Sand", 1280: "Grass",
+                  800: "Slate", 1088: "Metal", 1568: "Glass"}
+
+
+# Reference reader
+
+def _untransform_float(word: int) -> float:
+    bits = ((word >> 1) | (word << 31)) & 0xFFFFFFFF
+    return struct.unpack("<f", struct.pack("<I", bits))[0]
+
+
+def _untransform_int(word: int) -> int:
+    return (word >> 1) ^ -(word & 1)
+
+
+def _deinterleave(data: bytes, offset: int, count: int) -> Tuple[List[int], int]:
+    """`count` interleaved big-endian 32-bit words"""
+    words = [
+        int.from_bytes(bytes(data[offset + plane * count + i] for plane in range(4)), "big")
+        for i in range(count)
+    ]
+    return words, offset + 4 * count
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def take(self, size: int) -> bytes:
+        value = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return value
+
+    def u8(self) -> int:
+        return self.take(1)[0]
+
+    def u32(self) -> int:
+        return struct.unpack("<I", self.take(4))[0]
+
+    def string(self) -> str:
+        return self.take(self.u32()).decode("utf-8")
+
+    def words(self, count: int) -> List[int]:
+        words, self.offset = _deinterleave(self.data, self.offset, count)
+        return words
+
+    def referents(self, count: int) -> List[int]:
+        refs, total = [], 0
+        for word in self.words(count):
+            total += _untransform_int(word)
+            refs.append(total)
+        return refs
+
+    def floats(self, count: int) -> List[float]:
+        return [_untransform_float(word) for word in self.words(count)]
+
+
+def read_rbxm(data: bytes) -> Dict[int, Dict[str, Any]]:
+    """Instances of a binary model by referent: {"class", "properties", "parent"}"""
+    # Magic, signature and version 0, then class and instance counts and 8 reserved bytes
+    assert data[:16] == b"<roblox!\x89\xff\r\n\x1a\n\x00\x00", "not a binary Roblox model"
+    class_count, instance_count = struct.unpack("<ii", data[16:24])
+    offset = 32
+    classes: Dict[int, Tuple[str, List[int]]] = {}
+    instances: Dict[int, Dict[str, Any]] = {}
+    while True:
+        name, compressed, length, _ = struct.unpack("<4sIII", data[offset:offset + 16])
+        offset += 16
+        if compressed:
+            assert lz4 is not None, "compressed chunk, but lz4 is not installed"
+            body = lz4.block.decompress(data[offset:offset + compressed], uncompressed_size=length)
+            offset += compressed
+        else:
+            body = data[offset:offset + length]
+            offset += length
+        reader = _Reader(body)
+        if name == b"END\x00":
+            assert body == b"</roblox>"
+            break
+        if name == b"INST":
+            class_id, class_name = reader.u32(), reader.string()
+            assert reader.u8() == 0
+            refs = reader.referents(reader.u32())
+            classes[class_id] = (class_name, refs)
+            for ref in refs:
+                instances[ref] = {"class": class_name, "properties": {}, "parent": None}
+        elif name == b"PROP":
+            class_id, prop, type_id = reader.u32(), reader.string(), reader.u8()
+            refs = classes[class_id][1]
+            count = len(refs)
+            if type_id == 0x01:
+                values = [reader.string() for _ in range(count)]
+            elif type_id == 0x02:
+                values = [bool(b) for b in reader.take(count)]
+            elif type_id == 0x0E:
+                xs, ys, zs = reader.floats(count), reader.floats(count), reader.floats(count)
+                values = list(zip(xs, ys, zs))
+            elif type_id == 0x10:
+                matrices = []
+                for _ in range(count):
+                    assert reader.u8() == 0, "only raw rotations are written"
+                    matrices.append(struct.unpack("<9f", reader.take(36)))
+                xs, ys, zs = reader.floats(count), reader.floats(count), reader.floats(count)
+                values = [(position, matrix) for position, matrix in zip(zip(xs, ys, zs), matrices)]
+            elif type_id == 0x12:
+                values = reader.words(count)
+            elif type_id == 0x13:
+                values = reader.referents(count)
+            elif type_id == 0x1A:
+                r, g, b = reader.take(count), reader.take(count), reader.take(count)
+                values = list(zip(r, g, b))
+            else:
+                raise AssertionError(f"unexpected property type {type_id:#x}")
+            assert reader.offset == len(body), prop
+            for ref, value in zip(refs, values):
+                instances[ref]["properties"][prop] = value
+        elif name == b"PRNT":
+            assert reader.u8() == 0
+            count = reader.u32()
+            children, parents = reader.referents(count), reader.referents(count)
+            for child, parent in zip(children, parents):
+                instances[child]["parent"] = parent
+    assert len(classes) == class_count and len(instances) == instance_count
+    return instances
+
+
+# What the plugin's JSON import builds
+
+def _orientation_matrix(x: float, y: float, z: float) -> List[float]:
+    """Rows of CFrame.fromOrientation(x, y, z) (degrees): Ry * Rx * Rz"""
+    cx, sx = math.cos(math.radians(x)), math.sin(math.radians(x))
+    cy, sy = math.cos(math.radians(y)), math.sin(math.radians(y))
+    cz, sz = math.cos(math.radians(z)), math.sin(math.radians(z))
+    return [
+        cy * cz + sy * sx * sz, -cy * sz + sy * sx * cz, sy * cx,
+        cx * sz, cx * cz, -sx,
+        -sy * cz + cy * sx * sz, sy * sz + cy * sx * cz, cy * cx
+    ]
+
+
+def _plugin_part(data: Dict[str, Any], origin=(0, 0, 0)) -> Dict[str, Any]:
+    rotation = data.get("rotation") or {}
+    color = data.get("color")
+    return {
+        "name": data.get("name") or "Part",
+        "size": tuple(data["size"].get(axis, 4) for axis in "xyz"),
+        "position": tuple(data["position"].get(axis, 0) + o for axis, o in zip("xyz", origin)),
+        "matrix": _orientation_matrix(*(rotation.get(axis, 0) for axis in "xyz")),
+        # Enum.Material[name] or Plastic
+        "material": data.get("material") if data.get("material") in MATERIAL_NAMES.values() else "Plastic",
+        "color": tuple(color) if color else (163, 162, 165)
+    }
+
+
+def plugin_tree(world: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """(parent name, part) for every part the JSON import creates, in import order"""
+    workspace = world["workspace"]
+    parts = []
+    instances = workspace.get("instances") or {}
+    for group in instances.get("groups", []):
+        prototype = instances["prototypes"][group["prototype"]]
+        positions = group["positions"]
+        for k, rotation in enumerate(group["rotations"]):
+            position = dict(zip("xyz", positions[3 * k:3 * k + 3]))
+            parts.append(("GeneratedWorld", _plugin_part({**prototype, "position": position,
+                                                          "rotation": {"y": rotation}})))
+    for part in workspace.get("parts", []):
+        parts.append(("GeneratedWorld", _plugin_part(part)))
+    for model in workspace.get("models", []):
+        origin = tuple(model["position"].get(axis, 0) for axis in "xyz")
+        for part in model.get("parts", []):
+            parts.append((model["name"], _plugin_part(part, origin)))
+    return parts
+
+
+def check_round_trip(world: Dict[str, Any], data: bytes):
+    """
+    Read an exported world back and compare it with the plugin's import
+
+    Raises:
+        AssertionError: Naming the first instance that differs
+    """
+    instances = read_rbxm(data)
+    expected = plugin_tree(world)
+    parts = [(ref, inst) for ref, inst in sorted(instances.items()) if inst["class"] == "Part"]
+    assert len(parts) == len(expected), f"{len(parts)} parts read, {len(expected)} imported"
+
+    roots = [inst for inst in instances.values() if inst["parent"] == -1]
+    assert [root["class"] for root in roots] == ["Folder"], "one root folder expected"
+    models = [(ref, inst) for ref, inst in sorted(instances.items()) if inst["class"] == "Model"]
+    assert [inst["properties"]["Name"] for _, inst in models] == \
+        [model.get("name") or "Model" for model in world["workspace"].get("models", [])]
+
+    for i, ((parent_name, want), (_, got)) in enumerate(zip(expected, parts)):
+        props = got["properties"]
+        position, matrix = props["CFrame"]
+        where = f"part {i} ({want['name']})"
+        assert instances[got["parent"]]["properties"]["Name"] == parent_name, f"{where}: parent"
+        assert props["Name"] == want["name"], f"{where}: name"
+        assert props["Anchored"], f"{where}: not anchored"
+        assert MATERIAL_NAMES.get(props["Material"], "Plastic") == want["material"], f"{where}: material"
+        assert props["Color3uint8"] == want["color"], f"{where}: color"
+        assert np.allclose(props["size"], want["size"], rtol=1e-6), f"{where}: size"
+        assert np.allclose(position, want["position"], rtol=1e-6, atol=1e-4), f"{where}: position"
+        assert np.allclose(matrix, want["matrix"], atol=1e-6), f"{where}: rotation"
+
+    # The plugin makes a model's first part its PrimaryPart
+    for ref, model in models:
+        children = [child for child, inst in parts if inst["parent"] == ref]
+        primary = model["properties"]["PrimaryPart"]
+        assert primary == (children[0] if children else -1), \
+            f"model {model['properties']['Name']}: PrimaryPart {primary}"
+
+
+def rotated_model(rng: np.random.Generator, count: int) -> Dict[str, Any]:
+    """A model of parts turned about every axis, with unset and unknown fields, to exercise defaults"""
+    parts = []
+    for i in range(count):
+        part = {
+            "name": f"block_{i}_é",
+            "size": {"x": float(rng.uniform(1, 8)), "y": 2, "z": 3},
+            "position": {"x": float(rng.uniform(-50, 50)), "y": float(rng.uniform(0, 20)), "z": 1.5},
+            "rotation": {axis: float(rng.uniform(-180, 180)) for axis in "xyz"},
+            "material": ["Brick", "Slate", "NotAMaterial"][i % 3]
+        }
+        if i % 2:
+            part["color"] = [int(c) for c in rng.integers(0, 256, 3)]
+        parts.append(part)
+    return {"name": "rotated", "parts": parts, "position": {"x": 10, "y": 5, "z": -10}}
@@ -0,0 +1,66 @@
+"""
+Benchmark workloads - specs and object tables shared by the benchmark scripts
+"""
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from core.prompt_processor import PromptProcessor
+from core.world_generator import WorldGenerator
+from core.world_model import ObjectKind, ObjectTable
+
+# Object types each complexity spreads its objects over
+OBJECT_TYPES = {"low": ["tree"], "medium": ["tree", "rock"], "high": ["tree", "rock", "decoration"]}
+
+# Object types of random placements
+PLACED_TYPES = ["tree", "rock", "decoration"]
+
+
+def benchmark_spec(terrain: str, complexity: str, objects: int) -> Dict[str, Any]:
+    """Fallback-parsed spec for a terrain type, enriched for the complexity level"""
+    spec = PromptProcessor._fallback_parse(None, f"a {terrain} world", {"complexity": complexity})
+    if complexity in ("medium", "high"):
+        spec["structures"].append({
+            "type": "house", "position": {"x": 0.3, "y": 0.0, "z": 0.6},
+            "size": {"width": 20, "height": 30, "depth": 20}, "style": "medieval"
+        })
+    if complexity == "high":
+        spec["structures"].append({
+            "type": "castle", "position": {"x": 0.5, "y": 0.0, "z": 0.5},
+            "size": {"width": 50, "height": 80, "depth": 50}, "style": "medieval"
+        })
+        spec["structures"].append({
+            "type": "house", "position": {"x": 0.7, "y": 0.0, "z": 0.35},
+            "size": {"width": 16, "height": 24, "depth": 16}, "style": "medieval"
+        })
+    if objects:
+        types = OBJECT_TYPES[complexity]
+        for i, obj_type in enumerate(types):
+            spec["objects"].append({
+                "type": obj_type,
+                "count": objects // len(types) + (1 if i < objects % len(types) else 0),
+                "position": {"x": 0.5, "y": 0.0, "z": 0.5},
+                "spread": 0.45
+            })
+    return spec
+
+
+def random_placements(count: int) -> List[Tuple[str, np.ndarray, np.ndarray]]:
+    """(type, (n, 3) positions, (n,) rotations) per object type, the same for every call"""
+    rng = np.random.default_rng(1)
+    per_type = np.array_split(np.arange(count), len(PLACED_TYPES))
+    return [
+        (obj_type, rng.uniform(-2048, 2048, (len(rows), 3)), rng.uniform(0, 360, len(rows)))
+        for obj_type, rows in zip(PLACED_TYPES, per_type)
+    ]
+
+
+def build_object_table(generator: WorldGenerator, placements) -> ObjectTable:
+    """The world objects of `random_placements`, as the generator would build them"""
+    objects = ObjectTable()
+    for obj_type, positions, rotations in placements:
+        kind = ObjectKind(obj_type, generator._get_object_size(obj_type),
+                          generator._get_material_for_object(obj_type),
+                          generator._get_color_for_object(obj_type))
+        objects.add(kind, positions, rotations)
+    return objects
@@ -0,0 +1,148 @@
+"""
+Generation executor - runs the CPU-bound pipeline stages off the event loop
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from core.world_generator import WorldGenerator
+from core.heightmap_codec import encode_heightmap
+from core.terrain import STUDS_PER_SAMPLE, decimate_heights
+from core.voxels import grid_origin, voxelize_columns
+from utils.metrics import charge_cpu, timed_call
+
+EXECUTOR_KINDS = ("process", "thread", "inline")
+
+# One generator per worker process, created on first use
+_worker_generator: Optional[WorldGenerator] = None
+
+
+def _generator() -> WorldGenerator:
+    """Get this process's WorldGenerator"""
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = WorldGenerator()
+    return _worker_generator
+
+
+def generate_stage(spec: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Pipeline stage: spec -> world data (runs in a worker)"""
+    return _generator().generate_sync(spec, options)
+
+
+def convert_stage(world_data: Dict[str, Any], optimize_parts: bool = False) -> Dict[str, Any]:
+    """Pipeline stage: world data -> Roblox format, optionally with merged parts (runs in a worker)"""
+    return _generator().to_roblox_format_sync(world_data, optimize_parts)
+
+
+def terrain_tile_stage(layout: Dict[str, Any], row: int, col: int, lod: int = 0) -> Dict[str, Any]:
+    """
+    Pipeline stage: one terrain tile (runs in a worker)
+    
+    Returns the tile as a download chunk with an int16-encoded heightmap,
+    so only the compact encoding crosses the process boundary. Coarser
+    levels of detail average 2^lod x 2^lod blocks of the full-resolution
+    tile. With terrain voxels enabled, the full-detail tile also carries
+    its voxel regions (tile samples are the 4-stud voxel columns).
+    """
+    generator = _generator()
+    heights = generator.terrain_engine.generate_tile(layout, row, col)
+    tile = layout["tile_samples"]
+    step = 2 ** lod
+    chunk = {
+        "kind": "terrain",
+        "row": row * tile,
+        "col": col * tile,
+        "lod": lod,
+        "step": step,
+        "heightmap": encode_heightmap(decimate_heights(heights, step))
+    }
+    if lod == 0 and generator.terrain_voxels:
+        origin = grid_origin(layout["size"])
+        chunk["voxels"] = voxelize_columns(
+            heights,
+            origin + row * tile * STUDS_PER_SAMPLE,
+            origin + col * tile * STUDS_PER_SAMPLE,
+            layout["type"]
+        )
+    return chunk
+
+
+def _warm_up() -> bool:
+    """Import NumPy and build the worker's generator ahead of the first job"""
+    _generator()
+    return True
+
+
+class GenerationExecutor:
+    """
+    Runs CPU-bound generation stages in a thread or process pool
+
+    Stages are module-level functions so they pickle by reference; their
+    arguments and results are specs and world dicts whose bulk (the
+    heightmap) is a single NumPy buffer, which keeps process hand-off cheap.
+    """
+
+    def __init__(self, kind: Optional[str] = None, workers: Optional[int] = None):
+        """
+        Args:
+            kind: "process", "thread" or "inline" (run on the calling thread);
+                defaults to GENERATION_EXECUTOR, then "process"
+            workers: Pool size; defaults to GENERATION_WORKERS, then the CPU count
+        """
+        kind = (kind or os.getenv("GENERATION_EXECUTOR", "process")).lower()
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind '{kind}', expected one of {EXECUTOR_KINDS}")
+        if workers is None:
+            workers = int(os.getenv("GENERATION_WORKERS", "0")) or os.cpu_count() or 1
+
+        self.kind = kind
+        self.workers = workers
+        self._pool: Optional[Executor] = None
+
+    @property
+    def pool(self) -> Optional[Executor]:
+        """The underlying pool, created on first use (None when inline)"""
+        if self._pool is None and self.kind != "inline":
+            if self.kind == "process":
+                # spawn avoids forking a process that already runs threads
+                # (uvicorn, the HTTP client pool)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="generation"
+                )
+        return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a stage function in the pool and await its result
+
+        The CPU time the worker spent is charged to the caller's current
+        pipeline stage (see utils.metrics.StageTimer).
+        """
+        if self.kind == "inline":
+            result, cpu = timed_call(fn, *args)
+        else:
+            loop = asyncio.get_running_loop()
+            result, cpu = await loop.run_in_executor(self.pool, timed_call, fn, *args)
+        charge_cpu(cpu)
+        return result
+
+    async def warm_up(self):
+        """Start every worker so the first jobs do not pay process start-up"""
+        if self.kind == "inline":
+            return
+        await asyncio.gather(*(self.run(_warm_up) for _ in range(self.workers)))
+
+    def shutdown(self, wait: bool = True):
+        """Stop the pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
@@ -0,0 +1,110 @@
+"""
+Heightmap codec - packs float heightmaps as quantized int16 for transport
+"""
+import base64
+import zlib
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+
+ENCODING = "int16"
+PACKINGS = ("base64", "binary")
+
+# Quantized values use the symmetric int16 range so the offset is the midpoint
+QUANT_LEVELS = 32767
+
+
+def encode_heightmap(
+    heights: np.ndarray,
+    delta: bool = True,
+    compress: bool = True,
+    packing: str = "base64",
+    level: int = 6
+) -> Dict[str, Any]:
+    """
+    Encode a 2D heightmap as quantized int16 samples
+
+    Heights map linearly onto [-32767, 32767]: value = q * scale + offset,
+    so the round-trip error is at most scale / 2 (about 0.0015 studs for a
+    100-stud range). With `delta`, samples are stored as row-major
+    differences (wrapping in 16 bits), which zlib compresses far better on
+    smooth terrain.
+
+    Args:
+        heights: 2D float array
+        delta: Store differences between consecutive samples
+        compress: zlib-compress the packed bytes
+        packing: "base64" (a string, for JSON) or "binary" (raw bytes)
+        level: zlib compression level
+
+    Returns:
+        Dictionary with encoding, shape, scale, offset, delta, compression
+        and data (little-endian int16 samples)
+    """
+    if packing not in PACKINGS:
+        raise ValueError(f"Unknown packing '{packing}', expected one of {PACKINGS}")
+    heights = np.asarray(heights, dtype=np.float64)
+    if heights.ndim != 2:
+        raise ValueError(f"Heightmap must be 2D, got shape {heights.shape}")
+
+    low, high = (float(heights.min()), float(heights.max())) if heights.size else (0.0, 0.0)
+    offset = (low + high) / 2
+    scale = (high - low) / (2 * QUANT_LEVELS) or 1.0
+    quantized = np.rint((heights - offset) / scale).astype(np.int32)
+
+    samples = quantized.ravel()
+    if delta:
+        # int32 -> int16 wraps modulo 2**16; the decoder's running sum wraps back
+        samples = np.diff(samples, prepend=0)
+    data = samples.astype("<i2").tobytes()
+    if compress:
+        data = zlib.compress(data, level)
+
+    return {
+        "encoding": ENCODING,
+        "shape": list(heights.shape),
+        "scale": scale,
+        "offset": offset,
+        "delta": delta,
+        "compression": "zlib" if compress else None,
+        "data": base64.b64encode(data).decode("ascii") if packing == "base64" else data
+    }
+
+
+def decode_heightmap(encoded: Dict[str, Any]) -> np.ndarray:
+    """
+    Decode an `encode_heightmap` result back to a float64 array
+
+    Args:
+        encoded: Encoded heightmap (base64 string or raw bytes in "data")
+
+    Returns:
+        2D float64 heightmap
+    """
+    if encoded.get("encoding") != ENCODING:
+        raise ValueError(f"Unsupported heightmap encoding: {encoded.get('encoding')}")
+    data: Union[str, bytes] = encoded["data"]
+    if isinstance(data, str):
+        data = base64.b64decode(data)
+    if encoded.get("compression") == "zlib":
+        data = zlib.decompress(data)
+
+    samples = np.frombuffer(data, dtype="<i2")
+    if encoded.get("delta"):
+        samples = np.cumsum(samples, dtype=np.int16)
+    heights = samples.astype(np.float64) * encoded["scale"] + encoded["offset"]
+    return heights.reshape(encoded["shape"])
+
+
+def is_encoded(heightmap: Any) -> bool:
+    """Check whether a heightmap value is in encoded form"""
+    return isinstance(heightmap, dict) and heightmap.get("encoding") == ENCODING
+
+
+def as_array(heightmap: Any) -> Optional[np.ndarray]:
+    """Get a heightmap as a float64 array, whatever form it is stored in"""
+    if heightmap is None:
+        return None
+    if is_encoded(heightmap):
+        return decode_heightmap(heightmap)
+    return np.asarray(heightmap, dtype=np.float64)
@@ -0,0 +1,129 @@
+"""
+Job worker - claims queued jobs from a JobStore and runs them with bounded concurrency
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.job_store import JobStore
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[str, Dict[str, Any], str], Awaitable[None]]
+
+
+class JobWorker:
+    """
+    Pulls jobs from a store and hands them to a handler
+
+    Each of `concurrency` slots claims one job at a time and renews its
+    lease while the handler runs, so a job outlives the visibility timeout
+    only while its worker is alive. A maintenance loop returns jobs whose
+    workers died to the queue and deletes finished jobs past their TTL.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handler: JobHandler,
+        concurrency: Optional[int] = None,
+        visibility_timeout: Optional[float] = None,
+        poll_interval: float = 0.5,
+        finished_ttl: Optional[float] = None,
+        maintenance_interval: float = 30.0
+    ):
+        """
+        Args:
+            store: Job store to claim from
+            handler: Coroutine called as handler(job_id, job, worker_id); it
+                is responsible for completing or failing the job
+            concurrency: Jobs run at once; defaults to JOB_CONCURRENCY, then 2
+            visibility_timeout: Lease length in seconds; defaults to
+                JOB_VISIBILITY_TIMEOUT, then 60
+            poll_interval: Seconds between claims while the queue is empty
+            finished_ttl: Seconds finished jobs are kept; defaults to JOB_TTL,
+                then one day
+            maintenance_interval: Seconds between requeue/expiry sweeps
+        """
+        self.store = store
+        self.handler = handler
+        self.concurrency = concurrency or int(os.getenv("JOB_CONCURRENCY", "2"))
+        self.visibility_timeout = visibility_timeout or float(os.getenv("JOB_VISIBILITY_TIMEOUT", "60"))
+        self.poll_interval = poll_interval
+        self.finished_ttl = finished_ttl or float(os.getenv("JOB_TTL", "86400"))
+        self.maintenance_interval = maintenance_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = asyncio.Event()
+        self._tasks: list = []
+
+    def start(self):
+        """Start the slot and maintenance tasks on the running loop"""
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._slot()) for _ in range(self.concurrency)]
+        self._tasks.append(loop.create_task(self._maintenance()))
+
+    async def stop(self):
+        """Cancel running tasks; interrupted jobs are requeued once their leases lapse"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run(self):
+        """Run until cancelled"""
+        self.start()
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    def notify(self):
+        """Wake idle slots now instead of at the next poll (same-process enqueues)"""
+        self._wake.set()
+
+    async def _slot(self):
+        while True:
+            try:
+                job = await self.store.claim(self.worker_id, self.visibility_timeout)
+            except Exception:
+                logger.exception("Claiming a job failed")
+                job = None
+
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heartbeat = asyncio.create_task(self._heartbeat(job["job_id"]))
+            try:
+                await self.handler(job["job_id"], job, self.worker_id)
+            except Exception as e:
+                logger.exception("Job %s failed", job["job_id"])
+                await self.store.fail(job["job_id"], str(e), worker_id=self.worker_id)
+            finally:
+                heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str):
+        """Renew a job's lease at a third of the visibility timeout"""
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            try:
+                if not await self.store.extend_lease(job_id, self.worker_id, self.visibility_timeout):
+                    return
+            except Exception:
+                logger.exception("Renewing the lease on job %s failed", job_id)
+
+    async def _maintenance(self):
+        while True:
+            try:
+                await self.store.requeue_expired()
+                await self.store.expire_finished(self.finished_ttl)
+            except Exception:
+                logger.exception("Job store maintenance failed")
+            await asyncio.sleep(self.maintenance_interval)
@@ -0,0 +1,347 @@
+"""
+Part optimizer - merges touching look-alike blocks and drops hidden parts to cut instance counts
+"""
+import math
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.terrain import SurfaceSampler
+
+# Positions and sizes are compared on this grid, in studs (world files
+# round positions to 0.01)
+GRID = 0.01
+
+# Cell size of the hash grid used to find touching and enclosing parts
+HASH_CELL_SIZE = 64.0
+
+# Touching blocks are meshed on the grid of their own faces when a group
+# has up to this many blocks ((2n)^3 cells); larger groups merge runs of
+# blocks with matching faces instead
+MAX_MESHED_BLOCKS = 64
+
+# A part is buried when its top is this far under the lowest ground below it
+BURY_DEPTH = 0.5
+# Parts wider than this many heightmap cells are never tested against the terrain
+MAX_BURY_SAMPLES = 16
+
+# Fields that move or resize a part; everything else must match for two
+# blocks to merge
+PLACEMENT_FIELDS = ("position", "size", "rotation")
+
+
+def _axis_aligned(part: Dict[str, Any]) -> Tuple[bool, bool]:
+    """(no x/z rotation and a y rotation in quarter turns, quarter turn is odd)"""
+    rotation = part.get("rotation") or {}
+    if abs(rotation.get("x", 0)) > 1e-6 or abs(rotation.get("z", 0)) > 1e-6:
+        return False, False
+    turns = rotation.get("y", 0) / 90
+    if abs(turns - round(turns)) > 1e-6:
+        return False, False
+    return True, round(turns) % 2 == 1
+
+
+def _bounds(parts: List[Dict[str, Any]], origin: Tuple[float, float, float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    World-space bounding boxes of parts, in GRID units
+
+    Returns:
+        (low corners, high corners, solid box): solid marks axis-aligned
+        blocks, whose box is exactly the part
+    """
+    low = np.empty((len(parts), 3))
+    high = np.empty((len(parts), 3))
+    solid = np.zeros(len(parts), dtype=bool)
+    for i, part in enumerate(parts):
+        size, position = part.get("size", {}), part.get("position", {})
+        half = np.array([size.get(axis, 4) for axis in "xyz"], dtype=float) / 2
+        center = np.array([position.get(axis, 0) for axis in "xyz"], dtype=float) + origin
+        aligned, quarter = _axis_aligned(part)
+        if aligned:
+            if quarter:
+                half = half[[2, 1, 0]]
+            solid[i] = part.get("shape", "block") == "block"
+        else:
+            rotation = part.get("rotation") or {}
+            if abs(rotation.get("x", 0)) > 1e-6 or abs(rotation.get("z", 0)) > 1e-6:
+                half = np.full(3, float(np.linalg.norm(half)))
+            else:
+                angle = math.radians(rotation.get("y", 0))
+                c, s = abs(math.cos(angle)), abs(math.sin(angle))
+                half = np.array([c * half[0] + s * half[2], half[1], s * half[0] + c * half[2]])
+        low[i] = center - half
+        high[i] = center + half
+    return np.rint(low / GRID), np.rint(high / GRID), solid
+
+
+def _hash_cells(low: np.ndarray, high: np.ndarray) -> Dict[Tuple[int, int], np.ndarray]:
+    """Indices of the boxes overlapping each xz hash cell"""
+    cell = HASH_CELL_SIZE / GRID
+    first = np.floor(low[:, [0, 2]] / cell).astype(np.int64)
+    last = np.floor(high[:, [0, 2]] / cell).astype(np.int64)
+    cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for i in range(len(low)):
+        for cx in range(first[i, 0], last[i, 0] + 1):
+            for cz in range(first[i, 1], last[i, 1] + 1):
+                cells[(cx, cz)].append(i)
+    return {key: np.array(members) for key, members in cells.items()}
+
+
+def _enclosed(low: np.ndarray, high: np.ndarray, solid: np.ndarray) -> np.ndarray:
+    """
+    Parts inside another part's solid box
+
+    Of parts with identical boxes, the first one is kept.
+    """
+    hidden = np.zeros(len(low), dtype=bool)
+    blocks = np.flatnonzero(solid)
+    occluders = {key: blocks[members] for key, members in _hash_cells(low[blocks], high[blocks]).items()}
+    if not occluders:
+        return hidden
+
+    # A part's low corner lies in the hash cell of every box enclosing it
+    cell = HASH_CELL_SIZE / GRID
+    corner = np.floor(low[:, [0, 2]] / cell).astype(np.int64)
+    by_corner: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for i, (cx, cz) in enumerate(corner.tolist()):
+        by_corner[(cx, cz)].append(i)
+
+    for key, members in by_corner.items():
+        candidates = occluders.get(key)
+        if candidates is None:
+            continue
+        parts = np.array(members)
+        inside = (np.all(low[candidates][None] <= low[parts][:, None], axis=2)
+                  & np.all(high[parts][:, None] <= high[candidates][None], axis=2))
+        same = (np.all(low[candidates][None] == low[parts][:, None], axis=2)
+                & np.all(high[candidates][None] == high[parts][:, None], axis=2))
+        earlier = candidates[None] < parts[:, None]
+        hidden[parts] = np.any(inside & (~same | earlier), axis=1)
+    return hidden
+
+
+def _buried(low: np.ndarray, high: np.ndarray, surface: SurfaceSampler) -> np.ndarray:
+    """Parts whose top is under the ground everywhere below them"""
+    step = min(surface.cell_x, surface.cell_z)
+    low, high = low * GRID, high * GRID
+    # Enough samples per side that no heightmap cell under a part is skipped
+    samples = np.ceil(np.max(high[:, [0, 2]] - low[:, [0, 2]], axis=1) / step).astype(np.int64) + 1
+    tested = np.flatnonzero(samples <= MAX_BURY_SAMPLES)
+    hidden = np.zeros(len(low), dtype=bool)
+    if not len(tested):
+        return hidden
+
+    t = np.linspace(0, 1, int(samples[tested].max()))
+    x = low[tested, 0, None] + (high[tested, 0] - low[tested, 0])[:, None] * t
+    z = low[tested, 2, None] + (high[tested, 2] - low[tested, 2])[:, None] * t
+    ground = surface.heights_at(
+        np.broadcast_to(x[:, :, None], (len(tested), len(t), len(t))),
+        np.broadcast_to(z[:, None, :], (len(tested), len(t), len(t)))
+    )
+    hidden[tested] = high[tested, 1] < ground.min(axis=(1, 2)) - BURY_DEPTH
+    return hidden
+
+
+def _components(low: np.ndarray, high: np.ndarray) -> List[List[int]]:
+    """Groups of boxes connected by touching or overlapping"""
+    parent = list(range(len(low)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for members in _hash_cells(low, high).values():
+        if len(members) < 2:
+            continue
+        touching = (np.all(low[members][:, None] <= high[members][None], axis=2)
+                    & np.all(low[members][None] <= high[members][:, None], axis=2))
+        for a, b in np.argwhere(np.triu(touching, 1)).tolist():
+            parent[find(int(members[a]))] = find(int(members[b]))
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for i in range(len(low)):
+        groups[find(i)].append(i)
+    return list(groups.values())
+
+
+def _mesh(low: np.ndarray, high: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Cover the union of boxes with as few boxes as a greedy pass finds
+
+    The boxes' faces cut space into a grid; filled cells are swept in
+    order and each free one grows a box along x, then z, then y.
+    """
+    edges = [np.unique(np.concatenate([low[:, axis], high[:, axis]])) for axis in range(3)]
+    first = np.stack([np.searchsorted(edges[axis], low[:, axis]) for axis in range(3)], axis=1)
+    last = np.stack([np.searchsorted(edges[axis], high[:, axis]) for axis in range(3)], axis=1)
+    free = np.zeros([len(edge) - 1 for edge in edges], dtype=bool)
+    for (i0, j0, k0), (i1, j1, k1) in zip(first, last):
+        free[i0:i1, j0:j1, k0:k1] = True
+
+    boxes = []
+    nx, ny, nz = free.shape
+    for i, j, k in np.argwhere(free):
+        if not free[i, j, k]:
+            continue
+        i1 = i + 1
+        while i1 < nx and free[i1, j, k]:
+            i1 += 1
+        k1 = k + 1
+        while k1 < nz and free[i:i1, j, k1].all():
+            k1 += 1
+        j1 = j + 1
+        while j1 < ny and free[i:i1, j1, k:k1].all():
+            j1 += 1
+        free[i:i1, j:j1, k:k1] = False
+        boxes.append((np.array([edges[0][i], edges[1][j], edges[2][k]]),
+                      np.array([edges[0][i1], edges[1][j1], edges[2][k1]])))
+    return boxes
+
+
+def _merge_runs(low: np.ndarray, high: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Merge boxes whose faces match along one axis at a time, until none do
+
+    Cheaper than `_mesh` for large groups; boxes that only overlap partly
+    are left alone.
+    """
+    boxes = np.concatenate([low, high], axis=1)
+    merged = True
+    while merged and len(boxes) > 1:
+        merged = False
+        for axis in (0, 2, 1):
+            others = [a for a in range(3) if a != axis]
+            keys = [boxes[:, axis]] + [boxes[:, a + 3] for a in reversed(others)] + [boxes[:, a] for a in reversed(others)]
+            boxes = boxes[np.lexsort(keys)]
+            kept = [boxes[0].copy()]
+            for box in boxes[1:]:
+                last = kept[-1]
+                if (all(box[a] == last[a] and box[a + 3] == last[a + 3] for a in others)
+                        and box[axis] <= last[axis + 3]):
+                    last[axis + 3] = max(last[axis + 3], box[axis + 3])
+                    merged = True
+                else:
+                    kept.append(box.copy())
+            boxes = np.array(kept)
+    return [(box[:3], box[3:]) for box in boxes]
+
+
+def _merged_part(template: Dict[str, Any], low: np.ndarray, high: np.ndarray,
+                 origin: Tuple[float, float, float]) -> Dict[str, Any]:
+    """A copy of `template` resized to a box given in GRID units, unrotated"""
+    low, high = low * GRID, high * GRID
+    part = {key: value for key, value in template.items() if key not in PLACEMENT_FIELDS}
+    part["size"] = {axis: round(float(high[a] - low[a]), 2) for a, axis in enumerate("xyz")}
+    part["position"] = {axis: round(float((low[a] + high[a]) / 2 - origin[a]), 2) for a, axis in enumerate("xyz")}
+    return part
+
+
+def optimize_parts(parts: List[Dict[str, Any]], origin: Tuple[float, float, float] = (0.0, 0.0, 0.0),
+                   surface: Optional[SurfaceSampler] = None) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Drop hidden parts and merge touching blocks that look the same
+
+    A part is hidden when its bounding box lies inside an axis-aligned
+    block, or (with a terrain `surface`) it is buried under the ground.
+    The remaining axis-aligned blocks are grouped by every field but
+    position, size and rotation; touching blocks of a group are replaced
+    by fewer, larger blocks covering exactly the same space. Other parts
+    pass through unchanged.
+
+    Args:
+        parts: Part dicts, positions relative to `origin`
+        origin: World position the part positions are relative to (a model's)
+        surface: Terrain to test for buried parts
+
+    Returns:
+        (parts, counts): the optimized parts, in their original order with
+        merged blocks in the place of their first block, and the number of
+        parts "hidden" and "merged" away
+    """
+    counts = {"hidden": 0, "merged": 0}
+    if not parts:
+        return parts, counts
+    low, high, solid = _bounds(parts, origin)
+
+    hidden = _enclosed(low, high, solid)
+    if surface is not None:
+        hidden |= _buried(low, high, surface)
+    counts["hidden"] = int(hidden.sum())
+
+    groups: Dict[str, List[int]] = defaultdict(list)
+    for i, part in enumerate(parts):
+        if solid[i] and not hidden[i]:
+            appearance = {key: value for key, value in part.items() if key not in PLACEMENT_FIELDS}
+            groups[repr(sorted(appearance.items()))].append(i)
+
+    # Output slot of every kept input part; merged blocks take their first
+    # block's slot
+    replaced: Dict[int, List[Dict[str, Any]]] = {}
+    dropped = set(np.flatnonzero(hidden).tolist())
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        members = np.array(members)
+        for component in _components(low[members], high[members]):
+            if len(component) < 2:
+                continue
+            indices = members[component]
+            if len(indices) <= MAX_MESHED_BLOCKS:
+                boxes = _mesh(low[indices], high[indices])
+            else:
+                boxes = _merge_runs(low[indices], high[indices])
+            if len(boxes) >= len(indices):
+                continue
+            template = parts[int(indices[0])]
+            replaced[int(indices[0])] = [_merged_part(template, box_low, box_high, origin)
+                                         for box_low, box_high in boxes]
+            dropped.update(int(i) for i in indices[1:])
+            counts["merged"] += len(indices) - len(boxes)
+
+    optimized = []
+    for i, part in enumerate(parts):
+        if i in replaced:
+            optimized.extend(replaced[i])
+        elif i not in dropped:
+            optimized.append(part)
+    return optimized, counts
+
+
+def optimize_world(world: Dict[str, Any], surface: Optional[SurfaceSampler] = None) -> Dict[str, int]:
+    """
+    Run `optimize_parts` over a Roblox-format world in place
+
+    Each model is optimized on its own (its parts stay in the model); the
+    workspace parts are optimized together. Instanced objects are left as
+    they are but counted.
+
+    Args:
+        world: World in Roblox format
+        surface: Terrain to test for buried parts (None skips the test)
+
+    Returns:
+        Parts the plugin creates before and after ("parts_before",
+        "parts_after"), and how many were "hidden" and "merged" away
+    """
+    workspace = world.get("workspace", {})
+    instances = workspace.get("instances") or {}
+    instance_count = sum(len(group["rotations"]) for group in instances.get("groups", []))
+    models = workspace.get("models", [])
+    before = len(workspace.get("parts", [])) + sum(len(model.get("parts", [])) for model in models)
+
+    stats = {"hidden": 0, "merged": 0}
+    for model in models:
+        position = model.get("position", {})
+        origin = tuple(float(position.get(axis, 0)) for axis in "xyz")
+        model["parts"], counts = optimize_parts(model.get("parts", []), origin, surface)
+        for key in stats:
+            stats[key] += counts[key]
+    workspace["parts"], counts = optimize_parts(list(workspace.get("parts", [])), surface=surface)
+    for key in stats:
+        stats[key] += counts[key]
+
+    after = len(workspace["parts"]) + sum(len(model["parts"]) for model in models)
+    return {"parts_before": before + instance_count, "parts_after": after + instance_count, **stats}
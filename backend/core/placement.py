@@ -0,0 +1,328 @@
+"""
+Object placement - blue-noise scattering with collision checks against a spatial index
+"""
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.terrain import WATER_LEVEL
+
+Bounds = Tuple[float, float, float, float]
+AcceptFn = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+# Cell size of the world index, in studs; a little over the footprint of
+# the largest default object so most queries touch a 3x3 block of cells
+INDEX_CELL_SIZE = 16.0
+
+# Dart-throwing rounds per Poisson-disk pass; more rounds fill the domain
+# closer to the maximal packing
+SAMPLING_ROUNDS = 8
+
+# A maximal Poisson-disk set with radius r holds about 0.65 / r^2 points per
+# unit area; the spacing is picked a little below that so a pass
+# overshoots the requested count and is then thinned at random
+PACKING_DENSITY = 0.5
+
+
+class SpatialIndex:
+    """
+    Uniform hash grid of circular object footprints and rectangular
+    structure footprints
+
+    Footprints are added in batches and queried with whole arrays of
+    candidate positions, so checking n candidates costs O(n) NumPy work
+    regardless of how many objects the world already holds.
+    """
+
+    def __init__(self, cell_size: float = INDEX_CELL_SIZE):
+        self.cell_size = cell_size
+        self._x = np.empty(0)
+        self._z = np.empty(0)
+        self._r = np.empty(0)
+        self._rects: List[Tuple[float, float, float, float]] = []
+        # Cell list, rebuilt lazily after inserts: footprints sorted by cell key
+        self._keys: Optional[np.ndarray] = None
+        self._order: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._x) + len(self._rects)
+
+    def add_circles(self, x: np.ndarray, z: np.ndarray, radius: np.ndarray):
+        """Add object footprints (centers and radii, in studs)"""
+        x, z = np.asarray(x, dtype=float), np.asarray(z, dtype=float)
+        self._x = np.concatenate([self._x, x])
+        self._z = np.concatenate([self._z, z])
+        self._r = np.concatenate([self._r, np.broadcast_to(radius, x.shape).astype(float)])
+        self._keys = None
+
+    def add_rect(self, min_x: float, min_z: float, max_x: float, max_z: float):
+        """Add a structure footprint (axis-aligned, in studs)"""
+        self._rects.append((min_x, min_z, max_x, max_z))
+
+    def blocked(self, x: np.ndarray, z: np.ndarray, radius: float) -> np.ndarray:
+        """
+        Check candidate footprints against everything in the index
+
+        Args:
+            x: Candidate centers along x
+            z: Candidate centers along z
+            radius: Footprint radius of the candidates
+
+        Returns:
+            Boolean array, True where a candidate overlaps an existing footprint
+        """
+        hit = np.zeros(x.shape, dtype=bool)
+
+        for min_x, min_z, max_x, max_z in self._rects:
+            dx = np.maximum(0, np.maximum(min_x - x, x - max_x))
+            dz = np.maximum(0, np.maximum(min_z - z, z - max_z))
+            hit |= dx * dx + dz * dz < radius * radius
+
+        if len(self._x) == 0:
+            return hit
+        if self._keys is None:
+            self._build()
+
+        cx = np.floor(x / self.cell_size).astype(np.int64)
+        cz = np.floor(z / self.cell_size).astype(np.int64)
+        reach = int(math.ceil((radius + self._r.max()) / self.cell_size))
+        for dx in range(-reach, reach + 1):
+            for dz in range(-reach, reach + 1):
+                keys = _cell_key(cx + dx, cz + dz)
+                start = np.searchsorted(self._keys, keys, side="left")
+                stop = np.searchsorted(self._keys, keys, side="right")
+                # Walk each cell's footprints in lockstep across candidates
+                for offset in range(int((stop - start).max(initial=0))):
+                    live = start + offset < stop
+                    idx = self._order[np.minimum(start + offset, len(self._order) - 1)]
+                    gap = radius + self._r[idx]
+                    dist2 = (x - self._x[idx]) ** 2 + (z - self._z[idx]) ** 2
+                    hit |= live & (dist2 < gap * gap)
+        return hit
+
+    def _build(self):
+        """Sort footprints by cell so each cell is one contiguous run"""
+        keys = _cell_key(
+            np.floor(self._x / self.cell_size).astype(np.int64),
+            np.floor(self._z / self.cell_size).astype(np.int64)
+        )
+        self._order = np.argsort(keys, kind="stable")
+        self._keys = keys[self._order]
+
+
+def _cell_key(cx: np.ndarray, cz: np.ndarray) -> np.ndarray:
+    """Pack signed cell coordinates into one sortable int64"""
+    return (cx + 2**31) * 2**32 + (cz + 2**31)
+
+
+def poisson_disk(
+    rng: np.random.Generator,
+    bounds: Bounds,
+    spacing: float,
+    accept: Optional[AcceptFn] = None,
+    rounds: int = SAMPLING_ROUNDS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Blue-noise points inside a rectangle, no two closer than `spacing`
+
+    Grid-phase dart throwing: the domain is cut into cells of
+    spacing / sqrt(2), which hold at most one point each. Cells are visited
+    in nine interleaved phases; cells of one phase are at least `spacing`
+    apart, so every empty cell of a phase draws a candidate at once and
+    only has to be checked against the 5x5 block of cells around it. The
+    cost is O(cells) NumPy work per round.
+
+    Args:
+        rng: Random generator (the job's, so placement is reproducible)
+        bounds: (min_x, min_z, max_x, max_z) in studs
+        spacing: Minimum distance between points
+        accept: Optional mask function; candidates it returns False for
+            are dropped (water, structures, objects already placed)
+        rounds: Candidates drawn per cell
+
+    Returns:
+        (x, z) arrays of accepted points
+    """
+    min_x, min_z, max_x, max_z = bounds
+    cell = spacing / math.sqrt(2)
+    nx = max(1, int(math.ceil((max_x - min_x) / cell)))
+    nz = max(1, int(math.ceil((max_z - min_z) / cell)))
+
+    # Owner grid padded by two cells so neighbour lookups never go out of range
+    owner = np.full((nx + 4, nz + 4), -1, dtype=np.int64)
+    xs = np.zeros(nx * nz)
+    zs = np.zeros(nx * nz)
+    count = 0
+    spacing2 = spacing * spacing
+
+    gx, gz = np.meshgrid(np.arange(nx), np.arange(nz), indexing="ij")
+    phases = [
+        (gx[px::3, pz::3].ravel(), gz[px::3, pz::3].ravel())
+        for px in range(3) for pz in range(3)
+    ]
+    # Neighbour cells that can hold a point closer than `spacing`; the
+    # corners of the 5x5 block are always at least `spacing` away
+    neighbours = [(dx, dz) for dx in range(-2, 3) for dz in range(-2, 3)
+                  if abs(dx) + abs(dz) < 4 and (dx, dz) != (0, 0)]
+
+    for _ in range(rounds):
+        for cells_x, cells_z in phases:
+            empty = owner[cells_x + 2, cells_z + 2] < 0
+            cx, cz = cells_x[empty], cells_z[empty]
+            if len(cx) == 0:
+                continue
+            x = min_x + (cx + rng.random(len(cx))) * cell
+            z = min_z + (cz + rng.random(len(cz))) * cell
+            ok = (x < max_x) & (z < max_z)
+            for dx, dz in neighbours:
+                other = owner[cx + 2 + dx, cz + 2 + dz]
+                taken = other >= 0
+                dist2 = (x - xs[other]) ** 2 + (z - zs[other]) ** 2
+                ok &= ~(taken & (dist2 < spacing2))
+            if accept is not None and ok.any():
+                ok[ok] = accept(x[ok], z[ok])
+
+            accepted = np.count_nonzero(ok)
+            xs[count:count + accepted] = x[ok]
+            zs[count:count + accepted] = z[ok]
+            owner[cx[ok] + 2, cz[ok] + 2] = np.arange(count, count + accepted)
+            count += accepted
+
+    return xs[:count], zs[:count]
+
+
+def scatter(
+    rng: np.random.Generator,
+    bounds: Bounds,
+    count: int,
+    min_spacing: float,
+    accept: Optional[AcceptFn] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scatter up to `count` blue-noise points evenly over a rectangle
+
+    The spacing is stretched so one Poisson-disk pass over the whole
+    rectangle yields a little more than `count` points, which are then
+    thinned at random - a random subset of a Poisson-disk set keeps its
+    spacing. When masks reject too much of the area, the pass is repeated
+    with a tighter spacing, down to `min_spacing`; if even that cannot fit
+    `count` points, fewer are returned.
+    """
+    if count <= 0:
+        return np.empty(0), np.empty(0)
+    min_x, min_z, max_x, max_z = bounds
+    area = max(max_x - min_x, 0) * max(max_z - min_z, 0)
+    spacing = max(min_spacing, math.sqrt(PACKING_DENSITY * area / count))
+
+    while True:
+        x, z = poisson_disk(rng, bounds, spacing, accept)
+        if len(x) >= count or spacing <= min_spacing:
+            break
+        # Too much area masked out: shrink the spacing by the shortfall
+        spacing = max(min_spacing, spacing * math.sqrt(max(len(x), 1) / count) * 0.9)
+
+    if len(x) > count:
+        keep = np.sort(rng.choice(len(x), size=count, replace=False))
+        x, z = x[keep], z[keep]
+    return x, z
+
+
+def footprint_radius(size: Dict[str, float]) -> float:
+    """Radius of the circle covering an object's footprint at any rotation"""
+    return 0.5 * math.hypot(size.get("x", 0), size.get("z", 0))
+
+
+def structure_footprint(structure: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    """Axis-aligned bounds of a structure's parts on the ground, in studs"""
+    position = structure["position"]
+    parts = structure.get("parts") or [{"position": {"x": 0, "z": 0}, "size": {
+        "x": structure["size"].get("width", 0), "z": structure["size"].get("depth", 0)
+    }}]
+    min_x = min(p["position"]["x"] - p["size"]["x"] / 2 for p in parts)
+    max_x = max(p["position"]["x"] + p["size"]["x"] / 2 for p in parts)
+    min_z = min(p["position"]["z"] - p["size"]["z"] / 2 for p in parts)
+    max_z = max(p["position"]["z"] + p["size"]["z"] / 2 for p in parts)
+    return (position["x"] + min_x, position["z"] + min_z,
+            position["x"] + max_x, position["z"] + max_z)
+
+
+def land_mask(heights: np.ndarray, world_size: int, water_level: float = WATER_LEVEL) -> AcceptFn:
+    """
+    Mask function that rejects points over water
+
+    Heights are looked up at the nearest heightmap sample (row i along x,
+    column j along z, samples at cell centers).
+    """
+    rows, cols = heights.shape
+    dry = heights > water_level
+
+    def accept(x: np.ndarray, z: np.ndarray) -> np.ndarray:
+        i = np.clip(((x + world_size / 2) * rows / world_size).astype(np.int64), 0, rows - 1)
+        j = np.clip(((z + world_size / 2) * cols / world_size).astype(np.int64), 0, cols - 1)
+        return dry[i, j]
+
+    return accept
+
+
+class Placer:
+    """
+    Places every object group of one world against a shared spatial index
+
+    Structures are registered first; each object group is then scattered
+    with blue noise inside its spread square, clipped to the world, off the
+    water and clear of structures and previously placed groups.
+    """
+
+    def __init__(self, world_size: int, heights: Optional[np.ndarray] = None,
+                 cell_size: float = INDEX_CELL_SIZE):
+        """
+        Args:
+            world_size: World size in studs
+            heights: Terrain heightmap for the water mask (None places anywhere)
+            cell_size: Cell size of the spatial index
+        """
+        self.world_size = world_size
+        self.index = SpatialIndex(cell_size)
+        self.on_land = land_mask(heights, world_size) if heights is not None and heights.size else None
+
+    def add_structure(self, structure: Dict[str, Any]):
+        """Reserve a structure's footprint"""
+        self.index.add_rect(*structure_footprint(structure))
+
+    def place(self, rng: np.random.Generator, center: Tuple[float, float], half_extent: float,
+              count: int, radius: float, min_spacing: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Place one object group
+
+        Args:
+            rng: The job's random generator
+            center: (x, z) center of the group, in studs
+            half_extent: Half the side of the square the group spreads over
+            count: Objects wanted
+            radius: Footprint radius of one object
+            min_spacing: Minimum distance between objects of the group
+                (defaults to touching footprints)
+
+        Returns:
+            (x, z) arrays of up to `count` placed positions
+        """
+        half = self.world_size / 2
+        bounds = (
+            max(-half, center[0] - half_extent), max(-half, center[1] - half_extent),
+            min(half, center[0] + half_extent), min(half, center[1] + half_extent)
+        )
+        spacing = max(min_spacing or 0.0, 2 * radius, 1e-3)
+        if bounds[0] >= bounds[2] or bounds[1] >= bounds[3]:
+            # Degenerate group (no spread): a single spot, if it is free
+            bounds = (center[0], center[1], center[0] + 1e-3, center[1] + 1e-3)
+
+        def accept(x: np.ndarray, z: np.ndarray) -> np.ndarray:
+            ok = ~self.index.blocked(x, z, radius)
+            if self.on_land is not None:
+                ok &= self.on_land(x, z)
+            return ok
+
+        x, z = scatter(rng, bounds, count, spacing, accept)
+        self.index.add_circles(x, z, radius)
+        return x, z
@@ -0,0 +1,235 @@
+"""
+Progress broker - pushes job status changes to waiting clients instead of having them poll
+"""
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "failed")
+
+Snapshot = Dict[str, Any]
+Cursor = Tuple[Optional[str], Optional[int]]
+
+
+def cursor(snapshot: Snapshot) -> Cursor:
+    """The part of a status snapshot whose change wakes waiting clients"""
+    return snapshot.get("status"), snapshot.get("progress")
+
+
+class _Channel:
+    """Latest snapshot of one job plus the clients waiting on it"""
+
+    def __init__(self):
+        self.snapshot: Optional[Snapshot] = None
+        self.condition = asyncio.Condition()
+        self.subscribers = 0
+
+
+class ProgressBroker:
+    """
+    Fans job status snapshots out to long-poll, SSE and WebSocket clients
+
+    Jobs running in this process publish every stage transition, which
+    wakes local waiters at once. Jobs running in other processes (standalone
+    workers, other API workers) are picked up by one background poll of the
+    job store per watched job every `poll_interval` seconds - however many
+    clients are waiting - and only while someone is waiting.
+
+    Clients resume with a cursor (the last status and progress they saw)
+    rather than a server-side sequence number, so any API process can
+    answer any client.
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[Optional[Snapshot]]],
+                 poll_interval: Optional[float] = None):
+        """
+        Args:
+            fetch: Coroutine returning a job's status snapshot, or None if
+                the job does not exist
+            poll_interval: Seconds between job store polls for watched jobs;
+                defaults to PROGRESS_POLL_INTERVAL, then 0.5
+        """
+        self.fetch = fetch
+        self.poll_interval = poll_interval or float(os.getenv("PROGRESS_POLL_INTERVAL", "0.5"))
+        self._channels: Dict[str, _Channel] = {}
+        self._poller: Optional[asyncio.Task] = None
+
+    async def publish(self, job_id: str):
+        """Push a job's current state to local waiters (no-op when nobody waits)"""
+        channel = self._channels.get(job_id)
+        if channel is not None:
+            await self._refresh(job_id, channel)
+
+    async def wait_for_change(self, job_id: str, last: Optional[Cursor],
+                              timeout: float) -> Optional[Snapshot]:
+        """
+        Wait until a job's status or progress differs from `last`
+
+        Args:
+            job_id: Job to watch
+            last: (status, progress) the client already has; None waits for
+                the next change from now
+            timeout: Seconds to wait before returning the unchanged snapshot
+
+        Returns:
+            The latest snapshot (immediately if the job has already moved on
+            or finished), or None if the job does not exist
+        """
+        channel = self._subscribe(job_id)
+        try:
+            if channel.snapshot is None:
+                await self._refresh(job_id, channel)
+            if channel.snapshot is not None and last is None:
+                last = cursor(channel.snapshot)
+
+            def changed() -> bool:
+                snapshot = channel.snapshot
+                return (snapshot is None
+                        or snapshot.get("status") in FINISHED_STATUSES
+                        or cursor(snapshot) != last)
+
+            async with channel.condition:
+                try:
+                    await asyncio.wait_for(channel.condition.wait_for(changed), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                return channel.snapshot
+        finally:
+            self._unsubscribe(job_id, channel)
+
+    async def updates(self, job_id: str, keepalive: float = 15.0) -> AsyncIterator[Optional[Snapshot]]:
+        """
+        Iterate over a job's snapshots until it finishes
+
+        Yields the current snapshot first, then one per change; yields None
+        after `keepalive` seconds without a change so streams can send a
+        heartbeat. Ends after the final snapshot, or at once if the job
+        does not exist.
+        """
+        last: Optional[Cursor] = None
+        first = True
+        while True:
+            if first:
+                snapshot = await self.fetch(job_id)
+                first = False
+            else:
+                snapshot = await self.wait_for_change(job_id, last, keepalive)
+            if snapshot is None:
+                return
+            if cursor(snapshot) == last:
+                yield None
+                continue
+            last = cursor(snapshot)
+            yield snapshot
+            if snapshot.get("status") in FINISHED_STATUSES:
+                return
+
+    def _subscribe(self, job_id: str) -> _Channel:
+        channel = self._channels.get(job_id)
+        if channel is None:
+            channel = self._channels[job_id] = _Channel()
+        channel.subscribers += 1
+        if self._poller is None:
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+        return channel
+
+    def _unsubscribe(self, job_id: str, channel: _Channel):
+        channel.subscribers -= 1
+        if channel.subscribers == 0 and self._channels.get(job_id) is channel:
+            del self._channels[job_id]
+
+    async def _refresh(self, job_id: str, channel: _Channel):
+        """Fetch a job's snapshot and wake waiters if it changed"""
+        snapshot = await self.fetch(job_id)
+        async with channel.condition:
+            if snapshot != channel.snapshot:
+                channel.snapshot = snapshot
+                channel.condition.notify_all()
+
+    async def _poll(self):
+        """Refresh watched jobs from the store; stops when nobody is waiting"""
+        while self._channels:
+            await asyncio.sleep(self.poll_interval)
+            for job_id, channel in list(self._channels.items()):
+                try:
+                    await self._refresh(job_id, channel)
+                except Exception:
+                    logger.exception("Refreshing progress of job %s failed", job_id)
+        self._poller = None
+
+    async def close(self):
+        """Stop the background poll"""
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+
+# Typical wall seconds per pipeline stage, used until enough jobs have been
+# timed to weight stages by their measured mean
+DEFAULT_STAGE_WEIGHTS = {
+    "prompt": 2.0,
+    "cache": 0.05,
+    "generate": 1.0,
+    "models": 0.2,
+    "convert": 0.5,
+    "tiles": 2.0,
+    "save": 0.3
+}
+MIN_TIMED_JOBS = 5
+
+
+def stage_weights(durations: Callable[[str], Tuple[int, float]]) -> Dict[str, float]:
+    """
+    Weight of every stage: its mean measured duration once it has run
+    MIN_TIMED_JOBS times, its default weight before that
+
+    Args:
+        durations: Returns (observations, total seconds) of a stage
+    """
+    weights = {}
+    for stage, default in DEFAULT_STAGE_WEIGHTS.items():
+        count, total = durations(stage)
+        weights[stage] = max(total / count, 1e-3) if count >= MIN_TIMED_JOBS else default
+    return weights
+
+
+class StageProgress:
+    """
+    Progress of one job as the weighted share of its pipeline that is done
+
+    The plan starts with every stage the job may run; stages that turn out
+    not to be needed (a world cache hit, no models) are skipped, which only
+    moves progress forward. Reported progress never goes back and stays
+    below 100 until the job completes.
+    """
+
+    def __init__(self, stages: List[str], weights: Dict[str, float]):
+        self.stages = list(stages)
+        self.weights = weights
+        self.done: List[str] = []
+        self.last = 0
+
+    def skip(self, *stages: str):
+        """Drop stages the job will not run"""
+        self.stages = [stage for stage in self.stages if stage not in stages]
+
+    def finish(self, stage: str):
+        self.done.append(stage)
+
+    def progress(self, stage: Optional[str] = None, fraction: float = 0.0) -> int:
+        """
+        Percent done, counting `fraction` of `stage` if given
+
+        Args:
+            stage: Stage in progress
+            fraction: Share of that stage already done (0-1)
+        """
+        total = sum(self.weights[name] for name in self.stages)
+        done = sum(self.weights[name] for name in self.stages if name in self.done)
+        if stage is not None and stage in self.stages:
+            done += self.weights[stage] * fraction
+        self.last = max(self.last, min(99, int(100 * done / total))) if total else self.last
+        return self.last
@@ -1,18 +1,53 @@
 """
 Prompt processing module - converts natural language to world specifications
 """
+import asyncio
+import json
 import os
 from typing import Dict, Any, Optional
-from openai import OpenAI
+
+import httpx
+from openai import AsyncOpenAI
+
+from core.spec_cache import SpecCache
 
 class PromptProcessor:
     """Processes natural language prompts into structured world specifications"""
     
-    def __init__(self):
+    def __init__(self, max_concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                 spec_cache: Optional[SpecCache] = None):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
-        self.client = OpenAI(api_key=api_key)
+        
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        if timeout is None:
+            timeout = float(os.getenv("LLM_TIMEOUT", "30"))
+        self.timeout = timeout
+        
+        # One pooled HTTP client shared by every call keeps connections (and
+        # TLS sessions) alive between jobs; the semaphore bounds how many
+        # LLM requests are in flight at once
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency
+            ),
+            timeout=timeout
+        )
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=self._http_client,
+            timeout=timeout,
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "1"))
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.spec_cache = spec_cache if spec_cache is not None else SpecCache()
+    
+    async def aclose(self):
+        """Close pooled connections to the LLM API"""
+        await self.client.close()
     
     async def process(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
@@ -27,6 +62,18 @@ class PromptProcessor:
         """
         options = options or {}
         
+        try:
+            return await self.spec_cache.get_or_compute(
+                prompt, options, lambda: self._request_spec(prompt, options)
+            )
+        except Exception as e:
+            # Log error but continue with fallback (fallback specs are not cached)
+            print(f"GPT-4 API error: {e}. Using fallback parser.")
+            # Fallback to basic parsing if API fails
+            return self._fallback_parse(prompt, options)
+    
+    async def _request_spec(self, prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Ask the LLM for a world specification (raises on any API or parse error)"""
         system_prompt = """You are a world generation expert for Roblox. 
 Convert user descriptions into structured world specifications.
 
@@ -69,28 +116,28 @@ Additional requirements:
 
 Return only valid JSON, no additional text."""
         
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                response_format={"type": "json_object"}
+        # Awaiting the async client yields the event loop for the whole
+        # round trip, so status requests and other jobs keep running
+        async with self._semaphore:
+            response = await asyncio.wait_for(
+                self.client.chat.completions.create(
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.7,
+                    response_format={"type": "json_object"},
+                    timeout=self.timeout
+                ),
+                # Hard cap covering client-side retries as well
+                timeout=self.timeout * 2
             )
-            
-            import json
-            world_spec = json.loads(response.choices[0].message.content)
-            
-            # Validate and normalize the specification
-            return self._normalize_spec(world_spec)
-            
-        except Exception as e:
-            # Log error but continue with fallback
-            print(f"GPT-4 API error: {e}. Using fallback parser.")
-            # Fallback to basic parsing if API fails
-            return self._fallback_parse(prompt, options)
+        
+        world_spec = json.loads(response.choices[0].message.content)
+        
+        # Validate and normalize the specification
+        return self._normalize_spec(world_spec)
     
     def _normalize_spec(self, spec: Dict[str, Any]) -> Dict[str, Any]:
         """Normalize and validate world specification"""
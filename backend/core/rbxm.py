@@ -0,0 +1,377 @@
+"""
+Roblox model export - writes a Roblox-format world as a binary model (.rbxm) that Studio inserts directly
+"""
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.world_model import ObjectParts
+
+try:
+    import lz4.block
+except ImportError:  # optional: chunks are stored uncompressed without it
+    lz4 = None
+
+# File header: magic, signature, format version 0
+MAGIC = b"<roblox!\x89\xff\r\n\x1a\n\x00\x00"
+END_MARKER = b"</roblox>"
+
+# Property value types used here
+TYPE_STRING = 0x01
+TYPE_BOOL = 0x02
+TYPE_VECTOR3 = 0x0E
+TYPE_CFRAME = 0x10
+TYPE_ENUM = 0x12
+TYPE_REFERENT = 0x13
+TYPE_COLOR3UINT8 = 0x1A
+
+# Enum.Material values; names the table lacks fall back to Plastic, as in the plugin
+MATERIALS = {
+    "Plastic": 256, "SmoothPlastic": 272, "Neon": 288, "Wood": 512, "WoodPlanks": 528,
+    "Marble": 784, "Basalt": 788, "Slate": 800, "CrackedLava": 804, "Concrete": 816,
+    "Limestone": 820, "Granite": 832, "Pavement": 836, "Brick": 848, "Pebble": 864,
+    "Cobblestone": 880, "Rock": 896, "Sandstone": 912, "CorrodedMetal": 1040,
+    "DiamondPlate": 1056, "Foil": 1072, "Metal": 1088, "Grass": 1280, "LeafyGrass": 1284,
+    "Sand": 1296, "Fabric": 1312, "Snow": 1328, "Mud": 1344, "Ground": 1360, "Asphalt": 1376,
+    "Salt": 1392, "Ice": 1536, "Glacier": 1552, "Glass": 1568, "ForceField": 1584
+}
+DEFAULT_MATERIAL = "Plastic"
+# A new Part's color, for parts that do not set one
+DEFAULT_COLOR = (163, 162, 165)
+# Color channels and part sizes the plugin falls back to
+DEFAULT_CHANNEL = 200
+DEFAULT_SIZE = 4.0
+
+# CFrame rotation id 0: the 3x3 matrix follows, row-major, as little-endian floats
+RAW_ROTATION = np.dtype([("id", "u1"), ("matrix", "<f4", (9,))])
+
+
+class PartColumns:
+    """
+    Part properties as columns, appended a batch at a time
+
+    Names are indices into a palette, so a million parts of a few kinds
+    hold a few distinct strings. Orientations are degrees about x, y and
+    z, applied in Roblox's Y, X, Z order (like Part.Orientation); parent
+    is the index of the container (folder or model) a part goes in.
+    """
+
+    __slots__ = ("names", "_name_index", "_batches")
+
+    FIELDS = (("name", np.int32, ()), ("size", np.float32, (3,)), ("position", np.float64, (3,)),
+              ("orientation", np.float64, (3,)), ("material", np.uint32, ()),
+              ("color", np.uint8, (3,)), ("parent", np.int32, ()))
+
+    def __init__(self):
+        self.names: List[str] = []
+        self._name_index: Dict[str, int] = {}
+        self._batches: List[Tuple[np.ndarray, ...]] = []
+
+    def __len__(self) -> int:
+        return sum(len(batch[0]) for batch in self._batches)
+
+    def name_id(self, name: str) -> int:
+        """Palette index of a name, adding it on first use"""
+        index = self._name_index.get(name)
+        if index is None:
+            index = self._name_index[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def add(self, count: int, **values: Any):
+        """
+        Append `count` parts
+
+        Args:
+            count: Parts in the batch
+            **values: One value per field, either per part or shared by
+                the whole batch (broadcast)
+        """
+        if count:
+            self._batches.append(tuple(
+                np.broadcast_to(np.asarray(values[field], dtype=dtype), (count,) + shape)
+                for field, dtype, shape in self.FIELDS
+            ))
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Every field as one array, parts in insertion order"""
+        return {
+            field: (np.concatenate([batch[i] for batch in self._batches]) if self._batches
+                    else np.empty((0,) + shape, dtype=dtype))
+            for i, (field, dtype, shape) in enumerate(self.FIELDS)
+        }
+
+
+def material_id(name: Optional[str]) -> int:
+    """Enum.Material value of a material name"""
+    return MATERIALS.get(name, MATERIALS[DEFAULT_MATERIAL])
+
+
+def _value(data: Dict[str, Any], key: str, default: float) -> float:
+    """data[key], or `default` when it is missing or None"""
+    value = data.get(key)
+    return default if value is None else value
+
+
+def _color(color: Optional[Sequence[Any]]) -> Tuple[int, int, int]:
+    """RGB bytes of a [r, g, b] color; missing channels are the plugin's 200"""
+    if not color:
+        return DEFAULT_COLOR
+    channels = list(color)[:3] + [None] * (3 - len(color[:3]))
+    return tuple(int(min(max(DEFAULT_CHANNEL if c is None else c, 0), 255)) for c in channels)
+
+
+def _vectors(dicts: List[Optional[Dict[str, Any]]], default: float) -> np.ndarray:
+    """(n, 3) x, y and z of every dict; missing values are `default`"""
+    values = np.array([
+        (d.get("x"), d.get("y"), d.get("z")) if d else (None, None, None) for d in dicts
+    ], dtype=np.float64).reshape(-1, 3)
+    # None became NaN
+    return np.where(np.isnan(values), default, values)
+
+
+def _add_part_dicts(columns: PartColumns, parts: List[Dict[str, Any]],
+                    origin: Tuple[float, float, float], parent: int):
+    """Append part dicts (positions relative to `origin`), with the plugin's defaults"""
+    if not parts:
+        return
+    color_keys = [tuple(part["color"]) if part.get("color") else None for part in parts]
+    colors = {key: _color(key) for key in set(color_keys)}
+    columns.add(
+        len(parts),
+        name=[columns.name_id(part.get("name") or "Part") for part in parts],
+        size=_vectors([part.get("size") for part in parts], DEFAULT_SIZE),
+        position=_vectors([part.get("position") for part in parts], 0.0) + origin,
+        orientation=_vectors([part.get("rotation") for part in parts], 0.0),
+        material=[material_id(part.get("material")) for part in parts],
+        color=[colors[key] for key in color_keys],
+        parent=parent
+    )
+
+
+def _add_object_parts(columns: PartColumns, parts: ObjectParts, parent: int):
+    """Append an ObjectParts view straight from its table's columns"""
+    objects = parts.objects
+    if not len(objects):
+        return
+    kinds = objects.kinds
+    kind = objects.kind
+    rotations = objects.rotations
+    columns.add(
+        len(kind),
+        name=np.array([columns.name_id(k.type) for k in kinds], dtype=np.int32)[kind],
+        size=np.array([[k.size.get(axis, DEFAULT_SIZE) for axis in "xyz"] for k in kinds],
+                      dtype=np.float32)[kind],
+        position=objects.positions,
+        orientation=np.column_stack((np.zeros_like(rotations), rotations, np.zeros_like(rotations))),
+        material=np.array([material_id(k.material) for k in kinds], dtype=np.uint32)[kind],
+        color=np.array([_color(k.color) for k in kinds], dtype=np.uint8)[kind],
+        parent=parent
+    )
+
+
+def collect_world(world: Dict[str, Any], name: str = "GeneratedWorld") -> Tuple[List[Dict[str, Any]], PartColumns]:
+    """
+    The instance tree the plugin would build for a world, minus terrain
+
+    Args:
+        world: World in Roblox format
+        name: Name of the root folder
+
+    Returns:
+        (containers, parts): the root folder and one model per world model,
+        as {"class", "name", "parent", "primary"} dicts (parent and primary
+        part are indices, -1 for none), and the parts of all of them
+    """
+    workspace = world.get("workspace", {})
+    containers = [{"class": "Folder", "name": name, "parent": -1, "primary": -1}]
+    parts = PartColumns()
+
+    # Instanced objects: one part per instance, turned about y
+    instances = workspace.get("instances") or {}
+    prototypes = instances.get("prototypes", [])
+    for group in instances.get("groups", []):
+        prototype = prototypes[group["prototype"]]
+        rotations = np.asarray(group["rotations"], dtype=np.float64)
+        size = prototype.get("size") or {}
+        parts.add(
+            len(rotations),
+            name=parts.name_id(prototype.get("name") or "Part"),
+            size=[_value(size, axis, DEFAULT_SIZE) for axis in "xyz"],
+            position=np.asarray(group["positions"], dtype=np.float64).reshape(-1, 3),
+            orientation=np.column_stack((np.zeros_like(rotations), rotations, np.zeros_like(rotations))),
+            material=material_id(prototype.get("material")),
+            color=_color(prototype.get("color")),
+            parent=0
+        )
+
+    loose = workspace.get("parts") or []
+    if isinstance(loose, ObjectParts):
+        _add_object_parts(parts, loose, 0)
+    else:
+        _add_part_dicts(parts, list(loose), (0.0, 0.0, 0.0), 0)
+
+    # Model part positions are relative to the model's ground-level origin
+    for model in workspace.get("models", []):
+        position = model.get("position") or {}
+        origin = tuple(float(_value(position, axis, 0)) for axis in "xyz")
+        model_parts = model.get("parts") or []
+        containers.append({
+            "class": "Model",
+            "name": model.get("name") or "Model",
+            "parent": 0,
+            "primary": len(parts) if model_parts else -1
+        })
+        _add_part_dicts(parts, model_parts, origin, len(containers) - 1)
+    return containers, parts
+
+
+def rotation_matrices(orientation: np.ndarray) -> np.ndarray:
+    """
+    (n, 9) row-major rotation matrices of (n, 3) orientations in degrees
+
+    Ry * Rx * Rz multiplied out: turned about y, then x, then z, like
+    CFrame.fromOrientation (and Part.Orientation).
+    """
+    rx, ry, rz = np.radians(orientation).T
+    cx, sx, cy, sy, cz, sz = np.cos(rx), np.sin(rx), np.cos(ry), np.sin(ry), np.cos(rz), np.sin(rz)
+    matrices = np.empty((len(orientation), 9), dtype=np.float32)
+    matrices[:, 0] = cy * cz + sy * sx * sz
+    matrices[:, 1] = sy * sx * cz - cy * sz
+    matrices[:, 2] = sy * cx
+    matrices[:, 3] = cx * sz
+    matrices[:, 4] = cx * cz
+    matrices[:, 5] = -sx
+    matrices[:, 6] = cy * sx * sz - sy * cz
+    matrices[:, 7] = sy * sz + cy * sx * cz
+    matrices[:, 8] = cy * cx
+    return matrices
+
+
+def _interleave(values: np.ndarray) -> bytes:
+    """Big-endian values byte-interleaved: the first byte of every value, then the second..."""
+    width = values.dtype.itemsize
+    return np.ascontiguousarray(values).view(np.uint8).reshape(-1, width).T.tobytes()
+
+
+def _floats(values: np.ndarray) -> bytes:
+    """Float32 array: sign bit rotated to the bottom, big-endian, interleaved"""
+    bits = np.ascontiguousarray(values, dtype="<f4").view("<u4")
+    return _interleave(((bits << 1) | (bits >> 31)).astype(">u4"))
+
+
+def _ints(values: np.ndarray) -> bytes:
+    """Int32 array: zigzag-encoded, big-endian, interleaved"""
+    values = np.asarray(values, dtype=np.int32)
+    return _interleave(((values << 1) ^ (values >> 31)).view(np.uint32).astype(">u4"))
+
+
+def _referents(referents: np.ndarray) -> bytes:
+    """Referent array: each referent as the difference from the previous one, as int32s"""
+    referents = np.asarray(referents, dtype=np.int32)
+    return _ints(np.diff(referents, prepend=np.int32(0)))
+
+
+def _string(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return struct.pack("<I", len(data)) + data
+
+
+def _chunk(name: bytes, data: bytes) -> Iterator[bytes]:
+    """A chunk: 4-byte name, compressed and uncompressed lengths, reserved, then the data"""
+    if lz4 is not None:
+        compressed = lz4.block.compress(data, store_size=False)
+        if len(compressed) < len(data):
+            yield struct.pack("<4sIII", name, len(compressed), len(data), 0)
+            yield compressed
+            return
+    yield struct.pack("<4sIII", name, 0, len(data), 0)
+    yield data
+
+
+def _prop(class_id: int, name: str, type_id: int, values: bytes) -> Iterator[bytes]:
+    return _chunk(b"PROP", struct.pack("<I", class_id) + _string(name) + bytes((type_id,)) + values)
+
+
+def iter_rbxm(world: Dict[str, Any], name: str = "GeneratedWorld") -> Iterator[bytes]:
+    """
+    Encode a world as a Roblox binary model, a chunk at a time
+
+    The model holds what the plugin's JSON import builds: a folder with an
+    anchored Part per instance and per workspace part, and a Model per
+    world model. Terrain is not included; the plugin still writes it with
+    Terrain:WriteVoxels. Each property of a class is one chunk holding
+    a typed array for every instance, encoded from NumPy columns. Chunks
+    are LZ4-compressed when the lz4 package is installed.
+
+    Args:
+        world: World in Roblox format (parts may be an ObjectParts view)
+        name: Name of the root folder
+
+    Yields:
+        Bytes of the file, a chunk at a time (for StorageManager._write_atomic
+        or a StreamingResponse)
+    """
+    containers, part_columns = collect_world(world, name)
+    parts = part_columns.columns()
+    part_count = len(parts["parent"])
+
+    # Referents: containers first, then parts; class ids in class name order
+    refs = {
+        "Folder": np.array([i for i, c in enumerate(containers) if c["class"] == "Folder"], dtype=np.int32),
+        "Model": np.array([i for i, c in enumerate(containers) if c["class"] == "Model"], dtype=np.int32),
+        "Part": np.arange(len(containers), len(containers) + part_count, dtype=np.int32)
+    }
+    classes = [class_name for class_name in sorted(refs) if len(refs[class_name])]
+    class_ids = {class_name: i for i, class_name in enumerate(classes)}
+
+    yield MAGIC + struct.pack("<ii", len(classes), len(containers) + part_count) + bytes(8)
+    yield from _chunk(b"META", struct.pack("<I", 1) + _string("ExplicitAutoJoints") + _string("true"))
+
+    for class_name in classes:
+        yield from _chunk(b"INST", struct.pack("<I", class_ids[class_name]) + _string(class_name)
+                          + struct.pack("<BI", 0, len(refs[class_name])) + _referents(refs[class_name]))
+
+    for class_name in ("Folder", "Model"):
+        if class_name not in class_ids:
+            continue
+        members = [c for c in containers if c["class"] == class_name]
+        yield from _prop(class_ids[class_name], "Name", TYPE_STRING,
+                         b"".join(_string(c["name"]) for c in members))
+        if class_name == "Model":
+            primary = [c["primary"] + len(containers) if c["primary"] >= 0 else -1 for c in members]
+            yield from _prop(class_ids[class_name], "PrimaryPart", TYPE_REFERENT, _referents(primary))
+
+    if part_count:
+        class_id = class_ids["Part"]
+        names = [_string(part_name) for part_name in part_columns.names]
+        yield from _prop(class_id, "Name", TYPE_STRING, b"".join(map(names.__getitem__, parts["name"].tolist())))
+        yield from _prop(class_id, "Anchored", TYPE_BOOL, b"\x01" * part_count)
+        rotations = np.zeros(part_count, dtype=RAW_ROTATION)
+        rotations["matrix"] = rotation_matrices(parts["orientation"])
+        position = parts["position"]
+        yield from _prop(class_id, "CFrame", TYPE_CFRAME, rotations.tobytes() + b"".join(
+            _floats(position[:, axis]) for axis in range(3)
+        ))
+        del rotations
+        color = parts["color"]
+        yield from _prop(class_id, "Color3uint8", TYPE_COLOR3UINT8,
+                         b"".join(np.ascontiguousarray(color[:, channel]).tobytes() for channel in range(3)))
+        yield from _prop(class_id, "Material", TYPE_ENUM, _interleave(parts["material"].astype(">u4")))
+        # BasePart.Size is stored under its legacy name
+        yield from _prop(class_id, "size", TYPE_VECTOR3, b"".join(
+            _floats(parts["size"][:, axis]) for axis in range(3)
+        ))
+
+    # Parents, children listed in referent order; the folder is the root
+    parent_refs = np.concatenate((
+        np.array([c["parent"] for c in containers], dtype=np.int32),
+        parts["parent"]
+    ))
+    children = np.arange(len(parent_refs), dtype=np.int32)
+    yield from _chunk(b"PRNT", struct.pack("<BI", 0, len(children)) + _referents(children)
+                      + _referents(parent_refs))
+    # The end chunk is never compressed
+    yield struct.pack("<4sIII", b"END\x00", 0, len(END_MARKER), 0) + END_MARKER
+
@@ -0,0 +1,241 @@
+"""
+Retention - evicts stored worlds by age, per-user count and total size, and trims caches, in the background
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.storage import StorageManager
+
+logger = logging.getLogger(__name__)
+
+# Called as on_evict(job_id, reason) after a world's files are deleted
+EvictHandler = Callable[[str, str], Awaitable[None]]
+
+EVICTION_ORDERS = {"lru": "last_access", "download": "last_download"}
+
+# Namespaces under storage/cache held to the cache limits
+CACHE_TIERS = ("worlds", "specs", "tiles")
+
+
+class RetentionSweeper:
+    """
+    Periodically deletes stored worlds, cache entries and batch records
+    that are past their limits
+
+    Each sweep makes three passes over the world index: worlds saved more
+    than `max_age` seconds ago, then each user's worlds beyond
+    `max_per_user`, then the least recently used (or downloaded) worlds
+    until the total size of their files is back under `max_bytes`. Worlds
+    pinned by an in-flight download, or saved or read within `grace`
+    seconds, are skipped; deleting a file never breaks a response that
+    already has it open.
+
+    The cache tiers (finished worlds, prompt specs, terrain tiles) are then
+    held to the same age limit and, together, to `cache_max_bytes`, least
+    recently used first; batch records expire with `max_age` too.
+    """
+
+    def __init__(
+        self,
+        storage: StorageManager,
+        max_age: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        max_per_user: Optional[int] = None,
+        order: Optional[str] = None,
+        grace: Optional[float] = None,
+        interval: Optional[float] = None,
+        on_evict: Optional[EvictHandler] = None,
+        cache_max_bytes: Optional[int] = None
+    ):
+        """
+        Args:
+            storage: Storage whose worlds are swept
+            max_age: Seconds a world is kept after saving; defaults to
+                RETENTION_MAX_AGE, then JOB_TTL, then one day (0 disables)
+            max_bytes: Total bytes of world files kept (the world, its
+                model, compressed variants and chunks); defaults to
+                RETENTION_MAX_BYTES (0 disables)
+            max_per_user: Worlds kept per user; defaults to
+                RETENTION_MAX_PER_USER (0 disables). Worlds without a user
+                are only subject to the other limits.
+            order: "lru" (last access) or "download" (last download) decides
+                which worlds go first; defaults to RETENTION_ORDER, then "lru"
+            grace: Seconds after saving or reading during which a world is
+                never evicted; defaults to RETENTION_GRACE, then 600
+            interval: Seconds between sweeps; defaults to
+                RETENTION_INTERVAL, then 300
+            on_evict: Coroutine told about every eviction
+            cache_max_bytes: Total bytes kept in the cache tiers; defaults
+                to RETENTION_CACHE_MAX_BYTES, then `max_bytes` (0 disables)
+        """
+        self.storage = storage
+        self.max_age = max_age if max_age is not None else float(
+            os.getenv("RETENTION_MAX_AGE", os.getenv("JOB_TTL", "86400"))
+        )
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("RETENTION_MAX_BYTES", "0"))
+        self.cache_max_bytes = cache_max_bytes if cache_max_bytes is not None else int(
+            os.getenv("RETENTION_CACHE_MAX_BYTES", str(self.max_bytes))
+        )
+        self.max_per_user = max_per_user if max_per_user is not None else int(os.getenv("RETENTION_MAX_PER_USER", "0"))
+        order = order or os.getenv("RETENTION_ORDER", "lru")
+        if order not in EVICTION_ORDERS:
+            raise ValueError(f"Unknown retention order '{order}'")
+        self.order = order
+        self.grace = grace if grace is not None else float(os.getenv("RETENTION_GRACE", "600"))
+        self.interval = interval or float(os.getenv("RETENTION_INTERVAL", "300"))
+        self.on_evict = on_evict
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stats: Dict[str, Any] = {
+            "sweeps": 0,
+            "evicted": 0,
+            "bytes_reclaimed": 0,
+            "skipped_in_use": 0,
+            "by_reason": {"age": 0, "user_quota": 0, "bytes": 0},
+            "cache_evicted": 0,
+            "cache_bytes_reclaimed": 0,
+            "batches_expired": 0,
+            "last_sweep_at": None,
+            "last_sweep_seconds": None
+        }
+
+    def start(self):
+        """Start the sweep loop on the running loop"""
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        """Cancel the sweep loop"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run(self):
+        """Run until cancelled"""
+        self.start()
+        try:
+            await self._task
+        finally:
+            await self.stop()
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Retention sweep failed")
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self) -> Dict[str, int]:
+        """
+        Run one sweep now
+
+        Returns:
+            Worlds evicted and bytes reclaimed by this sweep, then the same
+            for the cache tiers and the batch records expired
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            now = time.time()
+            entries = await asyncio.to_thread(self.storage.index.entries, EVICTION_ORDERS[self.order])
+            live = {entry["job_id"]: entry for entry in entries}
+            evicted, reclaimed = 0, 0
+
+            for entry, reason in self._candidates(entries, live, now):
+                if entry["job_id"] not in live:
+                    continue
+                if self._in_use(entry, now):
+                    self._stats["skipped_in_use"] += 1
+                    continue
+                freed = await self.storage.evict_world(entry["job_id"])
+                del live[entry["job_id"]]
+                evicted += 1
+                reclaimed += freed
+                self._stats["by_reason"][reason] += 1
+                logger.info("Evicted world %s (%s, %d bytes)", entry["job_id"], reason, freed)
+                if self.on_evict is not None:
+                    try:
+                        await self.on_evict(entry["job_id"], reason)
+                    except Exception:
+                        logger.exception("Eviction handler failed for %s", entry["job_id"])
+
+            cache_evicted, cache_reclaimed, batches_expired = 0, 0, 0
+            if self.max_age > 0 or self.cache_max_bytes > 0:
+                cache_evicted, cache_reclaimed = await self.storage.trim_cache(
+                    *CACHE_TIERS, max_bytes=self.cache_max_bytes, max_age=self.max_age, grace=self.grace
+                )
+            if self.max_age > 0:
+                batches_expired = await self.storage.expire_batches(self.max_age)
+            if cache_evicted or batches_expired:
+                logger.info("Evicted %d cache entries (%d bytes) and %d batch records",
+                            cache_evicted, cache_reclaimed, batches_expired)
+
+            self._stats["sweeps"] += 1
+            self._stats["evicted"] += evicted
+            self._stats["bytes_reclaimed"] += reclaimed
+            self._stats["cache_evicted"] += cache_evicted
+            self._stats["cache_bytes_reclaimed"] += cache_reclaimed
+            self._stats["batches_expired"] += batches_expired
+            self._stats["last_sweep_at"] = now
+            self._stats["last_sweep_seconds"] = time.perf_counter() - started
+            return {"evicted": evicted, "bytes_reclaimed": reclaimed, "cache_evicted": cache_evicted,
+                    "cache_bytes_reclaimed": cache_reclaimed, "batches_expired": batches_expired}
+
+    def _candidates(self, entries: List[Dict[str, Any]], live: Dict[str, Dict[str, Any]], now: float):
+        """
+        Yield (entry, reason) for every world over a limit, in eviction order
+
+        `entries` is ordered least recently used first; `live` shrinks as
+        the caller evicts, so later passes see the effect of earlier ones.
+        """
+        if self.max_age > 0:
+            for entry in entries:
+                if entry["saved_at"] < now - self.max_age:
+                    yield entry, "age"
+
+        if self.max_per_user > 0:
+            by_user: Dict[str, List[Dict[str, Any]]] = {}
+            for entry in entries:
+                if entry["user_id"] is not None and entry["job_id"] in live:
+                    by_user.setdefault(entry["user_id"], []).append(entry)
+            for worlds in by_user.values():
+                excess = len(worlds) - self.max_per_user
+                for entry in worlds:
+                    if excess <= 0:
+                        break
+                    if entry["job_id"] in live and not self._in_use(entry, now):
+                        excess -= 1
+                    yield entry, "user_quota"
+
+        if self.max_bytes > 0:
+            total = sum(kept["bytes"] for kept in live.values())
+            for entry in entries:
+                if total <= self.max_bytes:
+                    break
+                if entry["job_id"] not in live:
+                    continue
+                yield entry, "bytes"
+                if entry["job_id"] not in live:
+                    total -= entry["bytes"]
+
+    def _in_use(self, entry: Dict[str, Any], now: float) -> bool:
+        """Pinned by a download in this process, or saved or read within the grace period"""
+        if self.storage.is_pinned(entry["job_id"]):
+            return True
+        last_used = max(entry["saved_at"], entry["last_access"] or 0)
+        return last_used > now - self.grace
+
+    def stats(self) -> Dict[str, Any]:
+        """Sweep counters, including the total bytes reclaimed from worlds and caches"""
+        return {
+            **self._stats,
+            "by_reason": dict(self._stats["by_reason"]),
+            "max_age": self.max_age,
+            "max_bytes": self.max_bytes,
+            "cache_max_bytes": self.cache_max_bytes,
+            "max_per_user": self.max_per_user,
+            "order": self.order
+        }
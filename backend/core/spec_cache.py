@@ -0,0 +1,154 @@
+"""
+Prompt-to-spec cache - reuses parsed world specifications for repeated prompts
+"""
+import asyncio
+import copy
+import re
+import time
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.cache import LRUCache, cache_key
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize prompt text so trivially different prompts share a key
+
+    Case, punctuation, Unicode compatibility forms and runs of whitespace
+    are folded: "Medieval castle, on a hill!" and "medieval castle on a
+    hill" normalize identically.
+    """
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class SpecRequestCancelled(RuntimeError):
+    """The caller computing a spec was cancelled before it finished"""
+
+
+class SpecCache:
+    """
+    Cache of world specifications keyed on (normalized prompt, style, complexity)
+
+    Entries live in an in-memory LRU tier and, when a StorageManager is
+    given, a persistent tier that survives restarts. Both honour the same
+    TTL. Concurrent lookups for a key that is already being computed wait
+    for that computation instead of starting their own.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: Optional[float] = 24 * 3600, storage=None):
+        self.memory = LRUCache(max_entries, ttl=ttl)
+        self.ttl = ttl
+        self.storage = storage
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.persistent_hits = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+
+    def key_for(self, prompt: str, options: Dict[str, Any]) -> str:
+        """Get the cache key for a prompt and its options"""
+        return cache_key(
+            "spec",
+            normalize_prompt(prompt),
+            options.get("style"),
+            options.get("complexity", "medium")
+        )
+
+    async def get_or_compute(
+        self,
+        prompt: str,
+        options: Dict[str, Any],
+        compute: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Get a cached spec, or compute, store and return it
+
+        Args:
+            prompt: Natural language prompt
+            options: Options forming part of the key (style, complexity)
+            compute: Coroutine factory producing the spec on a miss
+
+        Returns:
+            A private copy of the spec
+
+        Exceptions raised by `compute` propagate to every coalesced caller
+        and nothing is cached. If the computing caller is cancelled, its
+        waiters are not: one of them computes the spec instead.
+        """
+        key = self.key_for(prompt, options)
+
+        while True:
+            spec = self.memory.get(key)
+            if spec is None:
+                spec = await self._load_persistent(key)
+            if spec is not None:
+                return copy.deepcopy(spec)
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self.coalesced += 1
+            try:
+                return copy.deepcopy(await asyncio.shield(inflight))
+            except SpecRequestCancelled:
+                # The caller computing it went away; one of the waiters
+                # takes over on the next pass
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self.upstream_calls += 1
+            spec = await compute()
+            self.memory.set(key, spec)
+            await self._save_persistent(key, spec)
+            future.set_result(spec)
+        except asyncio.CancelledError:
+            # Cancelling the shared future would cancel every waiter too
+            future.set_exception(SpecRequestCancelled("spec request cancelled"))
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody else awaited is not logged
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+        return copy.deepcopy(spec)
+
+    async def _load_persistent(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look a key up in the persistent tier, promoting hits into memory"""
+        if self.storage is None:
+            return None
+        entry = await self.storage.load_cached_spec(key)
+        if entry is None:
+            return None
+        expires_at = entry.get("expires_at")
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        self.persistent_hits += 1
+        self.memory.set(key, entry["spec"])
+        return entry["spec"]
+
+    async def _save_persistent(self, key: str, spec: Dict[str, Any]):
+        """Write a spec to the persistent tier"""
+        if self.storage is None:
+            return
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        await self.storage.save_cached_spec(key, {"expires_at": expires_at, "spec": spec})
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache counters"""
+        return {
+            **self.memory.stats(),
+            "persistent_hits": self.persistent_hits,
+            "coalesced": self.coalesced,
+            "upstream_calls": self.upstream_calls
+        }
@@ -0,0 +1,327 @@
+"""
+Terrain engine - builds heightmaps from coherent noise with whole-array NumPy operations
+"""
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+
+from core.noise import fbm, ridged
+from utils.cache import cache_key
+
+# Heightmap samples are taken every 4 studs, capped at this many per side
+# (512 gives a 2048-stud world its full 4-stud resolution)
+DEFAULT_MAX_RESOLUTION = 512
+STUDS_PER_SAMPLE = 4
+
+# Size of the largest noise features, in studs
+FEATURE_SCALE = 256
+
+WATER_LEVEL = -10.0
+
+# Tiled mode: worlds above this size are generated as square tiles of
+# TILE_SAMPLES samples at the full 4-stud resolution
+TILED_THRESHOLD = 2048
+TILE_SAMPLES = 256
+
+
+class TerrainEngine:
+    """Generates terrain heightmaps for every supported terrain type"""
+
+    def __init__(self, max_resolution: int = DEFAULT_MAX_RESOLUTION):
+        self.max_resolution = max_resolution
+        self.builders = {
+            "mountain": self._build_mountain,
+            "valley": self._build_valley,
+            "plains": self._build_plains,
+            "island": self._build_island,
+            "desert": self._build_desert,
+            "forest": self._build_forest
+        }
+        # Upper bounds for types whose height range is fixed
+        self.fixed_max_heights = {
+            "plains": 5.0,
+            "forest": 15.0
+        }
+
+    def resolution_for(self, size: int) -> int:
+        """Get heightmap resolution (samples per side) for a world size"""
+        return max(1, min(size // STUDS_PER_SAMPLE, self.max_resolution))
+
+    def sample_grid(self, size: int, resolution: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get world (x, z) coordinates of every heightmap sample
+
+        Samples sit at cell centers of a `resolution` x `resolution` grid
+        covering [-size/2, size/2]; row i runs along x, column j along z.
+        The grid is returned open (shapes (n, 1) and (1, n)) so noise can
+        take its separable fast path; it broadcasts like a full meshgrid.
+        """
+        coords = self._axis(size, resolution, 0, resolution)
+        return np.meshgrid(coords, coords, indexing="ij", sparse=True)
+    
+    def _axis(self, size: int, resolution: int, start: int, stop: int) -> np.ndarray:
+        """World coordinates of samples [start, stop) along one axis"""
+        cell = size / resolution
+        return (np.arange(start, stop) + 0.5) * cell - size / 2
+
+    def generate(
+        self,
+        terrain_type: str,
+        size: int,
+        config: Dict[str, Any],
+        seed: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate terrain data for a world
+
+        Args:
+            terrain_type: One of the keys of `builders` (unknown types fall back to plains)
+            size: World size in studs
+            config: Terrain section of the world specification
+            seed: Noise seed (random if omitted)
+
+        Returns:
+            Dictionary with type, heightmap (a float64 ndarray, which pickles
+            as one buffer and is turned into nested lists only when the
+            world is written as JSON), resolution and max_height
+        """
+        if terrain_type not in self.builders:
+            terrain_type = "plains"
+        if seed is None:
+            seed = int(np.random.default_rng().integers(2**31))
+        resolution = self.resolution_for(size)
+
+        x, z = self.sample_grid(size, resolution)
+        heights = self.heights_at(terrain_type, x, z, size, config, seed)
+
+        return {
+            "type": terrain_type,
+            "heightmap": heights,
+            "resolution": resolution,
+            "max_height": self.fixed_max_heights.get(terrain_type, float(heights.max())),
+            "seed": seed
+        }
+    
+    def tile_layout(
+        self,
+        terrain_type: str,
+        size: int,
+        config: Dict[str, Any],
+        seed: int,
+        tile_samples: int = TILE_SAMPLES
+    ) -> Dict[str, Any]:
+        """
+        Describe the full-resolution tiling of a world's terrain
+        
+        The description holds everything `generate_tile` needs, so any tile
+        can be (re)generated on its own, in any process, at any time.
+        
+        Returns:
+            Dictionary with type, size, config, seed, resolution (samples
+            per side at 4 studs each), tile_samples, tiles_per_side and key
+            (content-addressed, shared by every world with this terrain)
+        """
+        if terrain_type not in self.builders:
+            terrain_type = "plains"
+        resolution = max(1, size // STUDS_PER_SAMPLE)
+        layout = {
+            "type": terrain_type,
+            "size": size,
+            "config": config,
+            "seed": seed,
+            "resolution": resolution,
+            "tile_samples": tile_samples,
+            "tiles_per_side": -(-resolution // tile_samples)
+        }
+        layout["key"] = cache_key("terrain-tiles", layout)
+        return layout
+    
+    def generate_tile(self, layout: Dict[str, Any], row: int, col: int) -> np.ndarray:
+        """
+        Generate one full-resolution tile
+        
+        Heights depend only on world position and the shared seed, so
+        neighbouring tiles meet seamlessly and tiles match the full map.
+        
+        Args:
+            layout: Result of `tile_layout`
+            row: Tile index along x
+            col: Tile index along z
+        
+        Returns:
+            Heights for up to tile_samples x tile_samples samples (edge tiles
+            are cut to the world)
+        """
+        size, resolution, tile = layout["size"], layout["resolution"], layout["tile_samples"]
+        xs = self._axis(size, resolution, row * tile, min((row + 1) * tile, resolution))
+        zs = self._axis(size, resolution, col * tile, min((col + 1) * tile, resolution))
+        x, z = np.meshgrid(xs, zs, indexing="ij", sparse=True)
+        return self.heights_at(layout["type"], x, z, size, layout["config"], layout["seed"])
+
+    def heights_at(self, terrain_type: str, x: np.ndarray, z: np.ndarray, size: int,
+                   config: Dict[str, Any], seed: int) -> np.ndarray:
+        """
+        Evaluate terrain height at arbitrary world coordinates
+
+        Heights depend only on world position, so any sub-grid of a world
+        matches the full heightmap exactly.
+        """
+        builder = self.builders.get(terrain_type, self._build_plains)
+        return builder(x, z, size, config, seed)
+
+    def _lattice(self, x: np.ndarray, z: np.ndarray, size: int,
+                 config: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, Optional[int]]:
+        """
+        Map world coordinates to noise lattice coordinates
+
+        The lattice spacing is stretched so a whole number of features spans
+        the world; with `tileable` set the noise wraps across opposite edges.
+        """
+        period = max(1, int(round(size / FEATURE_SCALE)))
+        scale = size / period
+        u = (x + size / 2) / scale
+        v = (z + size / 2) / scale
+        return u, v, (period if config.get("tileable") else None)
+
+    def _radial_distance(self, x: np.ndarray, z: np.ndarray, size: int) -> np.ndarray:
+        """Get distance from the world center, as a fraction of the half-size"""
+        return np.hypot(x, z) / (size / 2)
+
+    def _build_mountain(self, x: np.ndarray, z: np.ndarray, size: int,
+                        config: Dict[str, Any], seed: int) -> np.ndarray:
+        """Build a central massif with ridged crests and a warped outline"""
+        height_variation = config.get("height_variation", 0.5)
+        u, v, period = self._lattice(x, z, size, config)
+
+        # Falloff reaches zero just past the inscribed circle; warping the
+        # distance field keeps the massif from being a perfect cone
+        outline = fbm(u, v, octaves=2, seed=seed + 101, period=period) * 0.25
+        dist = self._radial_distance(x, z, size) / np.sqrt(2) + outline
+        base_height = np.maximum(0, 1 - dist * 1.5)
+        crests = ridged(u, v, octaves=5, seed=seed, period=period)
+
+        heights = (base_height * (0.6 + 0.6 * crests) + 0.1 * (crests - 0.5)) * height_variation * 100
+        return np.maximum(0, heights)
+
+    def _build_valley(self, x: np.ndarray, z: np.ndarray, size: int,
+                      config: Dict[str, Any], seed: int) -> np.ndarray:
+        """Build a winding valley running along z, low in the middle"""
+        u, v, period = self._lattice(x, z, size, config)
+
+        # Shift the valley floor sideways along its length so it meanders
+        meander = fbm(v * 0.5, 0.0, octaves=2, seed=seed + 7) * size * 0.15
+        profile = np.minimum(np.abs(x - meander) / (size / 2), 1.0)
+
+        heights = profile * 30 + fbm(u, v, octaves=4, seed=seed, period=period) * 5
+        return np.maximum(0, heights)
+
+    def _build_plains(self, x: np.ndarray, z: np.ndarray, size: int,
+                      config: Dict[str, Any], seed: int) -> np.ndarray:
+        """Build flat plains with gentle rolling variation"""
+        u, v, period = self._lattice(x, z, size, config)
+        return np.clip((fbm(u, v, octaves=4, seed=seed, period=period) + 1) * 2.5, 0, 5)
+
+    def _build_island(self, x: np.ndarray, z: np.ndarray, size: int,
+                      config: Dict[str, Any], seed: int) -> np.ndarray:
+        """Build an island with a noisy coastline surrounded by water"""
+        u, v, period = self._lattice(x, z, size, config)
+
+        coast = fbm(u, v, octaves=3, seed=seed + 17, period=period) * 0.15
+        dist = self._radial_distance(x, z, size) + coast
+
+        land = (1 - dist) * 40 + fbm(u * 2, v * 2, octaves=4, seed=seed, period=period) * 2
+        return np.where(dist < 1, np.maximum(0, land), WATER_LEVEL)
+
+    def _build_desert(self, x: np.ndarray, z: np.ndarray, size: int,
+                      config: Dict[str, Any], seed: int) -> np.ndarray:
+        """Build rolling sand dunes"""
+        u, v, period = self._lattice(x, z, size, config)
+
+        # Warp the dune grid so crests curve instead of lining up
+        warp = fbm(u, v, octaves=2, seed=seed + 31, period=period) * 40
+        dunes = np.sin((x + warp) * 0.025) * np.cos((z - warp) * 0.025) * 15
+
+        return 10 + dunes + fbm(u * 4, v * 4, octaves=3, seed=seed, period=period) * 2
+
+    def _build_forest(self, x: np.ndarray, z: np.ndarray, size: int,
+                      config: Dict[str, Any], seed: int) -> np.ndarray:
+        """Build gently uneven forest floor"""
+        u, v, period = self._lattice(x, z, size, config)
+        return np.clip(10 + fbm(u * 2, v * 2, octaves=5, seed=seed, period=period) * 5, 5, 15)
+
+
+def decimate_heights(heights: np.ndarray, step: int) -> np.ndarray:
+    """
+    Coarsen a heightmap by averaging step x step blocks of samples
+
+    Partial blocks at the far edges are padded with their edge samples, so
+    the result has ceil(rows / step) x ceil(cols / step) samples.
+    """
+    if step <= 1:
+        return heights
+    rows, cols = heights.shape
+    padded = np.pad(heights, ((0, -rows % step), (0, -cols % step)), mode="edge")
+    blocks = padded.reshape(padded.shape[0] // step, step, padded.shape[1] // step, step)
+    return blocks.mean(axis=(1, 3))
+
+
+class SurfaceSampler:
+    """
+    Bilinear terrain heights and surface normals at arbitrary world positions
+
+    Heights are interpolated between the four surrounding heightmap
+    samples (row i along x, column j along z, samples at cell centers) and
+    clamped at the world edges. Every call takes whole arrays of points.
+    """
+
+    def __init__(self, heights: np.ndarray, size: int):
+        """
+        Args:
+            heights: Heightmap covering the world
+            size: World size in studs
+        """
+        self.heights = np.asarray(heights, dtype=float)
+        self.size = size
+        rows, cols = self.heights.shape
+        self.cell_x = size / rows
+        self.cell_z = size / cols
+
+    def sample(self, x: np.ndarray, z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sample the terrain surface
+
+        Args:
+            x: World x coordinates
+            z: World z coordinates (same shape as x)
+
+        Returns:
+            (heights, normals): heights with the shape of x, and unit
+            normals with a trailing (x, y, z) axis
+        """
+        rows, cols = self.heights.shape
+        u = np.clip((np.asarray(x, dtype=float) + self.size / 2) / self.cell_x - 0.5, 0, rows - 1)
+        v = np.clip((np.asarray(z, dtype=float) + self.size / 2) / self.cell_z - 0.5, 0, cols - 1)
+        i0 = u.astype(np.int64)
+        j0 = v.astype(np.int64)
+        i1 = np.minimum(i0 + 1, rows - 1)
+        j1 = np.minimum(j0 + 1, cols - 1)
+        fu = u - i0
+        fv = v - j0
+
+        h00 = self.heights[i0, j0]
+        h10 = self.heights[i1, j0]
+        h01 = self.heights[i0, j1]
+        h11 = self.heights[i1, j1]
+
+        heights = (h00 * (1 - fu) * (1 - fv) + h10 * fu * (1 - fv)
+                   + h01 * (1 - fu) * fv + h11 * fu * fv)
+
+        # Partial derivatives of the bilinear patch give the surface normal
+        dh_dx = ((h10 - h00) * (1 - fv) + (h11 - h01) * fv) / self.cell_x
+        dh_dz = ((h01 - h00) * (1 - fu) + (h11 - h10) * fu) / self.cell_z
+        normals = np.stack([-dh_dx, np.ones_like(dh_dx), -dh_dz], axis=-1)
+        normals /= np.linalg.norm(normals, axis=-1, keepdims=True)
+        return heights, normals
+
+    def heights_at(self, x: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Interpolated heights only (see `sample`)"""
+        return self.sample(x, z)[0]
@@ -0,0 +1,237 @@
+"""
+Voxelizer - turns heightmaps into run-length encoded Roblox terrain voxel regions
+"""
+import base64
+import math
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from core.terrain import WATER_LEVEL, SurfaceSampler
+
+ENCODING = "rle8"
+
+# Roblox terrain voxels are 4-stud cubes on a grid aligned to the origin
+VOXEL_SIZE = 4
+# Bottom of the terrain, in studs (a multiple of VOXEL_SIZE; the plugin's
+# FillBlock fallback uses the same floor)
+TERRAIN_FLOOR = -20
+
+# Regions are REGION_VOXELS x REGION_VOXELS columns (256 studs) and as tall
+# as their highest column, well under WriteVoxels' 4M voxel limit
+REGION_VOXELS = 64
+
+# Material indices of the run data; the plugin maps names to Enum.Material
+MATERIALS = ["Air", "Water", "Sand", "Grass", "Rock", "Snow"]
+AIR, WATER, SAND, GRASS, ROCK, SNOW = range(len(MATERIALS))
+
+# Surface rules per terrain type: base material, normal y below which the
+# surface is rock (0.94 is about 20 degrees), height above which it is snow
+SURFACE_RULES = {
+    "mountain": {"base": GRASS, "rock_normal": 0.94, "snow_height": 48.0},
+    "valley": {"base": GRASS, "rock_normal": 0.94, "snow_height": None},
+    "plains": {"base": GRASS, "rock_normal": 0.94, "snow_height": None},
+    "island": {"base": GRASS, "rock_normal": 0.94, "snow_height": None},
+    "desert": {"base": SAND, "rock_normal": 0.82, "snow_height": None},
+    "forest": {"base": GRASS, "rock_normal": 0.94, "snow_height": None}
+}
+# Surfaces up to this far above the water are beach sand
+BEACH_HEIGHT = 2.0
+# Voxels more than this many studs below the surface are rock
+SURFACE_DEPTH = 8.0
+# Terrain builders clamp the sea floor to the water line; ground at or
+# below it is lowered this far so the sea holds water
+SEA_DEPTH = 4.0
+
+# A run is material (u8), occupancy (u8, 255 = full) and length (u16 LE)
+RUN_DTYPE = np.dtype([("material", "u1"), ("occupancy", "u1"), ("length", "<u2")])
+MAX_RUN = 65535
+
+
+def grid_origin(size: int) -> int:
+    """Voxel-aligned corner of a world `size` studs across centered on the origin"""
+    return int(math.floor(-size / 2 / VOXEL_SIZE)) * VOXEL_SIZE
+
+
+def surface_materials(heights: np.ndarray, terrain_type: str) -> np.ndarray:
+    """
+    Material of each column's surface, from its height and slope
+
+    Args:
+        heights: Surface heights of 4-stud voxel columns (row i along x)
+        terrain_type: Terrain type choosing the rules
+
+    Returns:
+        uint8 material indices with the shape of `heights`
+    """
+    rules = SURFACE_RULES.get(terrain_type, SURFACE_RULES["plains"])
+    if min(heights.shape) > 1:
+        dh_dx, dh_dz = np.gradient(heights, VOXEL_SIZE)
+    else:
+        dh_dx = dh_dz = np.zeros_like(heights)
+    normal_y = 1 / np.sqrt(1 + dh_dx ** 2 + dh_dz ** 2)
+
+    materials = np.full(heights.shape, rules["base"], dtype=np.uint8)
+    materials[heights <= WATER_LEVEL + BEACH_HEIGHT] = SAND
+    if rules["snow_height"] is not None:
+        materials[heights >= rules["snow_height"]] = SNOW
+    materials[normal_y < rules["rock_normal"]] = ROCK
+    return materials
+
+
+def encode_runs(materials: np.ndarray, occupancy: np.ndarray) -> np.ndarray:
+    """
+    Run-length encode flat material and occupancy arrays together
+
+    Returns:
+        RUN_DTYPE array; runs longer than MAX_RUN are split
+    """
+    keys = materials.astype(np.uint16) << 8 | occupancy
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    lengths = np.diff(starts, append=keys.size)
+
+    # Split long runs into MAX_RUN pieces plus a remainder
+    pieces = -(-lengths // MAX_RUN)
+    split_lengths = np.full(int(pieces.sum()), MAX_RUN, dtype=np.int64)
+    split_lengths[np.cumsum(pieces) - 1] = lengths - (pieces - 1) * MAX_RUN
+
+    runs = np.empty(split_lengths.size, dtype=RUN_DTYPE)
+    first = np.repeat(starts, pieces)
+    runs["material"] = materials[first]
+    runs["occupancy"] = occupancy[first]
+    runs["length"] = split_lengths
+    return runs
+
+
+def decode_runs(region: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Decode a region back to (x, y, z) material and occupancy arrays
+
+    Returns:
+        {"materials": uint8 indices, "occupancy": float 0-1}, each shaped
+        like the region's size
+    """
+    data = base64.b64decode(region["data"])
+    if region.get("compression") == "zlib":
+        data = zlib.decompress(data)
+    runs = np.frombuffer(data, dtype=RUN_DTYPE)
+    nx, ny, nz = region["size"]
+    # Runs are in x, z, y order (y fastest)
+    materials = np.repeat(runs["material"], runs["length"]).reshape(nx, nz, ny).transpose(0, 2, 1)
+    occupancy = np.repeat(runs["occupancy"], runs["length"]).reshape(nx, nz, ny).transpose(0, 2, 1)
+    return {"materials": materials, "occupancy": occupancy / 255.0}
+
+
+def _region(heights: np.ndarray, surface: np.ndarray, origin_x: int, origin_z: int,
+            level: int) -> Dict[str, Any]:
+    """Voxelize one region of columns whose corner is (origin_x, origin_z)"""
+    top = max(float(heights.max()), WATER_LEVEL)
+    ny = max(1, int(math.ceil((top - TERRAIN_FLOOR) / VOXEL_SIZE)))
+    bottoms = TERRAIN_FLOOR + VOXEL_SIZE * np.arange(ny, dtype=float)
+
+    # (x, z, y) so runs follow columns
+    column = heights[:, :, None]
+    solid = np.clip((column - bottoms) / VOXEL_SIZE, 0, 1)
+    water = np.clip((WATER_LEVEL - bottoms) / VOXEL_SIZE, 0, 1)
+    depth = column - (bottoms + VOXEL_SIZE)
+
+    materials = np.where(depth > SURFACE_DEPTH, ROCK, surface[:, :, None]).astype(np.uint8)
+    occupancy = solid
+    # Voxels with any ground keep the ground material; those above it are
+    # water up to the water line
+    flooded = (solid == 0) & (water > 0)
+    materials[flooded] = WATER
+    occupancy = np.where(flooded, water, occupancy)
+
+    quantized = np.rint(occupancy * 255).astype(np.uint8)
+    materials[quantized == 0] = AIR
+    runs = encode_runs(materials.ravel(), quantized.ravel())
+    data = runs.tobytes()
+    return {
+        "origin": [origin_x, TERRAIN_FLOOR, origin_z],
+        "size": [int(heights.shape[0]), ny, int(heights.shape[1])],
+        "runs": int(runs.size),
+        "bytes": len(data),
+        "compression": "zlib",
+        "data": base64.b64encode(zlib.compress(data, level)).decode("ascii")
+    }
+
+
+def voxelize_columns(heights: np.ndarray, origin_x: int, origin_z: int, terrain_type: str,
+                     region_voxels: int = REGION_VOXELS, level: int = 6) -> Dict[str, Any]:
+    """
+    Voxelize a grid of 4-stud voxel columns
+
+    Ground fills each column from TERRAIN_FLOOR to its surface height;
+    the voxel holding the surface is partially occupied. Ground at or
+    below WATER_LEVEL is lowered by SEA_DEPTH and flooded up to the water
+    line. Runs are in x, z, y order, so most columns are three or four
+    runs (rock, surface, water, air).
+
+    Args:
+        heights: Surface height of each column, row i along x starting at
+            origin_x, column j along z starting at origin_z
+        origin_x: World x of the grid's corner (a multiple of VOXEL_SIZE)
+        origin_z: World z of the grid's corner (a multiple of VOXEL_SIZE)
+        terrain_type: Terrain type choosing the surface materials
+        region_voxels: Columns per region side
+        level: zlib compression level
+
+    Returns:
+        Dictionary with encoding, voxel_size, materials (palette names) and
+        regions, each with origin (studs), size (voxels, x y z), runs,
+        bytes (uncompressed), compression and data
+    """
+    if origin_x % VOXEL_SIZE or origin_z % VOXEL_SIZE:
+        raise ValueError(f"Voxel grid origin ({origin_x}, {origin_z}) is not aligned to {VOXEL_SIZE} studs")
+    heights = np.asarray(heights, dtype=float)
+    surface = surface_materials(heights, terrain_type)
+    heights = np.where(heights <= WATER_LEVEL, heights - SEA_DEPTH, heights)
+
+    regions: List[Dict[str, Any]] = []
+    rows, cols = heights.shape
+    for i in range(0, rows, region_voxels):
+        for j in range(0, cols, region_voxels):
+            block = (slice(i, i + region_voxels), slice(j, j + region_voxels))
+            regions.append(_region(heights[block], surface[block], origin_x + i * VOXEL_SIZE,
+                                   origin_z + j * VOXEL_SIZE, level))
+    return {
+        "encoding": ENCODING,
+        "voxel_size": VOXEL_SIZE,
+        "materials": list(MATERIALS),
+        "regions": regions
+    }
+
+
+def voxelize_heightmap(heights: np.ndarray, size: int, terrain_type: str,
+                       region_voxels: int = REGION_VOXELS, level: int = 6) -> Dict[str, Any]:
+    """
+    Voxelize a whole world's heightmap
+
+    The heightmap is resampled (bilinearly) at the center of every voxel
+    column covering the world; at the full 4-stud resolution of worlds up
+    to 2048 studs the columns are the heightmap samples themselves.
+
+    Args:
+        heights: World heightmap (row i along x, samples at cell centers)
+        size: World size in studs
+
+    Returns:
+        See `voxelize_columns`
+    """
+    heights = np.asarray(heights, dtype=float)
+    origin = grid_origin(size)
+    columns = int(math.ceil((size / 2 - origin) / VOXEL_SIZE))
+    if heights.shape != (columns, columns) or origin != -size / 2:
+        centers = origin + VOXEL_SIZE * (np.arange(columns) + 0.5)
+        x, z = np.meshgrid(centers, centers, indexing="ij")
+        heights = SurfaceSampler(heights, size).heights_at(x, z)
+    return voxelize_columns(heights, origin, origin, terrain_type, region_voxels, level)
+
+
+def region_voxel_count(voxels: Optional[Dict[str, Any]]) -> int:
+    """Total voxels in an encoded voxel grid"""
+    if not voxels:
+        return 0
+    return sum(math.prod(region["size"]) for region in voxels["regions"])
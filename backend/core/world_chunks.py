@@ -0,0 +1,307 @@
+"""
+World chunking - splits a Roblox-format world into spatial cells of independently fetchable pieces
+"""
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.heightmap_codec import as_array, encode_heightmap, is_encoded
+from core.terrain import decimate_heights
+
+# Terrain tiles are square blocks of heightmap samples; one tile per cell
+DEFAULT_TILE_SAMPLES = 64
+DEFAULT_MODELS_PER_CHUNK = 50
+DEFAULT_PARTS_PER_CHUNK = 250
+# Instances are two short arrays each, so far more fit in a chunk than parts
+DEFAULT_INSTANCES_PER_CHUNK = 2000
+
+# Terrain fields carried by chunks rather than the manifest header
+BULK_TERRAIN_KEYS = ("heightmap", "voxels")
+
+# Cell size for worlds without terrain, in studs
+DEFAULT_CELL_SIZE = 256
+
+# Level 0 is full detail; level k halves the terrain resolution k times and
+# keeps only objects whose largest dimension reaches LOD_MIN_OBJECT_SIZE[k]
+DEFAULT_LOD_LEVELS = 3
+LOD_MIN_OBJECT_SIZE = (0, 4, 12, 24)
+
+
+def object_lod(size: Dict[str, float], lod_levels: int = DEFAULT_LOD_LEVELS) -> int:
+    """Coarsest level of detail an object of this size still shows at"""
+    largest = max(size.get("x", 0), size.get("y", 0), size.get("z", 0))
+    lod = 0
+    for level in range(1, lod_levels):
+        if largest >= LOD_MIN_OBJECT_SIZE[min(level, len(LOD_MIN_OBJECT_SIZE) - 1)]:
+            lod = level
+    return lod
+
+
+def split_world(
+    world: Dict[str, Any],
+    tile_samples: int = DEFAULT_TILE_SAMPLES,
+    models_per_chunk: int = DEFAULT_MODELS_PER_CHUNK,
+    parts_per_chunk: int = DEFAULT_PARTS_PER_CHUNK,
+    instances_per_chunk: int = DEFAULT_INSTANCES_PER_CHUNK,
+    lod_levels: int = DEFAULT_LOD_LEVELS
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Split a world into a manifest and a list of chunks grouped by spatial cell
+
+    The world is cut into square cells, one terrain tile each (row i along
+    x, column j along z). Every chunk belongs to one cell and carries a
+    level of detail ("lod"):
+
+    - terrain chunks exist once per level; level k averages 2^k x 2^k
+      blocks of samples ("step"), and a client imports exactly one of them.
+      Level 0 chunks also carry the terrain voxel regions centered in
+      their cell, when the world has them
+    - object chunks (models, instances, parts) are tagged with the coarsest
+      level their objects still show at; importing a cell at level k takes
+      every object chunk with lod >= k, so small objects drop out at
+      distance. Models (structures) show at every level.
+
+    Chunks are ordered cell by cell (row-major), so importing the level 0
+    terrain and every object chunk in order still gives the whole world;
+    streaming clients take cells nearest the camera first from the
+    manifest's cell list. For tiled terrain, the terrain chunks only
+    reference tiles (a "tile" [row, col] pair) and the caller serves them
+    from the tile store.
+
+    Args:
+        world: World data in Roblox format
+        tile_samples: Heightmap samples per cell side (tiled terrain uses
+            its own tile size)
+        models_per_chunk: Models per "models" chunk
+        parts_per_chunk: Parts per "parts" chunk
+        instances_per_chunk: Instances per "instances" chunk
+        lod_levels: Levels of detail per cell
+
+    Returns:
+        (manifest, chunks); the manifest holds metadata, the terrain
+        header, the instance prototypes, the cell grid (cell size in studs,
+        cells per side, and per cell its bounds and chunk indices) and one
+        entry per chunk (index, kind, count, cell, lod) for the caller to
+        complete with sizes once chunks are written
+    """
+    workspace = world.get("workspace", {})
+    world_size = world.get("metadata", {}).get("size")
+
+    terrain = workspace.get("terrain")
+    terrain_header = None
+    layout = None
+    heights: Optional[np.ndarray] = None
+    resolution = None
+    if terrain and terrain.get("heightmap") is not None and len(terrain["heightmap"]):
+        heights = as_array(terrain["heightmap"])
+    if terrain and terrain.get("tiles"):
+        # Tiled worlds: cells follow the full-resolution tiles; the preview
+        # heightmap only gives the cells' height range
+        layout = terrain["tiles"]
+        terrain_header = {k: v for k, v in terrain.items() if k not in BULK_TERRAIN_KEYS}
+        terrain_header["resolution"] = layout["resolution"]
+        terrain_header["scale"] = layout["size"] / layout["resolution"]
+        world_size = layout["size"]
+        resolution = layout["resolution"]
+        cell_samples = layout["tile_samples"]
+    elif heights is not None:
+        terrain_header = {k: v for k, v in terrain.items() if k not in BULK_TERRAIN_KEYS}
+        resolution = heights.shape[0]
+        world_size = world_size or resolution * terrain.get("scale", 4)
+        cell_samples = tile_samples
+
+    world_size = world_size or DEFAULT_CELL_SIZE
+    if resolution:
+        cell_size = cell_samples * world_size / resolution
+        cells_per_side = -(-resolution // cell_samples)
+    else:
+        cell_size = min(DEFAULT_CELL_SIZE, world_size)
+        cells_per_side = max(1, math.ceil(world_size / cell_size))
+    cell_count = cells_per_side * cells_per_side
+
+    def cell_of(x: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Row-major cell index of world positions"""
+        row = np.clip(((x + world_size / 2) // cell_size).astype(np.int64), 0, cells_per_side - 1)
+        col = np.clip(((z + world_size / 2) // cell_size).astype(np.int64), 0, cells_per_side - 1)
+        return row * cells_per_side + col
+
+    cell_chunks: List[List[Dict[str, Any]]] = [[] for _ in range(cell_count)]
+    # Lowest and highest point of everything in each cell
+    low = np.full(cell_count, np.inf)
+    high = np.full(cell_count, -np.inf)
+
+    def extend(cells: np.ndarray, bottom: np.ndarray, top: np.ndarray):
+        np.minimum.at(low, cells, bottom)
+        np.maximum.at(high, cells, top)
+
+    if terrain_header is not None:
+        encoded = is_encoded(terrain.get("heightmap"))
+        # Voxel regions go to the full-detail chunk of the cell holding their center
+        voxels = terrain.get("voxels") if not layout else None
+        cell_regions: Dict[int, List[Dict[str, Any]]] = {}
+        if voxels:
+            regions = voxels["regions"]
+            corners = np.array([region["origin"] for region in regions], dtype=float)
+            extents = np.array([region["size"] for region in regions], dtype=float) * voxels["voxel_size"]
+            centers = corners + extents / 2
+            for cell, members in _by_cell(cell_of(centers[:, 0], centers[:, 2])):
+                cell_regions[cell] = [regions[i] for i in members]
+        for cell in range(cell_count):
+            row, col = divmod(cell, cells_per_side)
+            first_row, first_col = row * cell_samples, col * cell_samples
+            rows = min(cell_samples, resolution - first_row)
+            cols = min(cell_samples, resolution - first_col)
+            if heights is not None:
+                block = _preview_block(heights, resolution, first_row, first_col, rows, cols)
+                extend(np.array([cell]), np.array([block.min()]), np.array([block.max()]))
+            for lod in range(lod_levels):
+                step = 2 ** lod
+                chunk = {"kind": "terrain", "row": first_row, "col": first_col, "lod": lod, "step": step}
+                if layout:
+                    chunk["tile"] = [row, col]
+                    chunk["samples"] = -(-rows // step) * -(-cols // step)
+                else:
+                    block = decimate_heights(heights[first_row:first_row + rows, first_col:first_col + cols], step)
+                    chunk["heightmap"] = encode_heightmap(block) if encoded else block.tolist()
+                    if lod == 0 and voxels:
+                        chunk["voxels"] = {**voxels, "regions": cell_regions.get(cell, [])}
+                cell_chunks[cell].append(chunk)
+
+    models = workspace.get("models", [])
+    if models:
+        positions = np.array([[m["position"].get(axis, 0) for axis in "xyz"] for m in models], dtype=float)
+        tops = np.array([
+            max((p["position"].get("y", 0) + p["size"].get("y", 0) / 2 for p in m.get("parts", [])), default=0)
+            for m in models
+        ])
+        cells = cell_of(positions[:, 0], positions[:, 2])
+        extend(cells, positions[:, 1], positions[:, 1] + tops)
+        for cell, members in _by_cell(cells):
+            for start in range(0, len(members), models_per_chunk):
+                cell_chunks[cell].append({
+                    "kind": "models",
+                    "lod": lod_levels - 1,
+                    "items": [models[i] for i in members[start:start + models_per_chunk]]
+                })
+
+    # Instances of one group share a prototype, so a chunk has one level
+    instances = workspace.get("instances") or {"prototypes": [], "groups": []}
+    for group in instances["groups"]:
+        if not group["rotations"]:
+            continue
+        size = instances["prototypes"][group["prototype"]]["size"]
+        lod = object_lod(size, lod_levels)
+        positions = np.asarray(group["positions"], dtype=float).reshape(-1, 3)
+        rotations = np.asarray(group["rotations"], dtype=float)
+        cells = cell_of(positions[:, 0], positions[:, 2])
+        extend(cells, positions[:, 1] - size.get("y", 0) / 2, positions[:, 1] + size.get("y", 0) / 2)
+        for cell, members in _by_cell(cells):
+            for start in range(0, len(members), instances_per_chunk):
+                batch = members[start:start + instances_per_chunk]
+                cell_chunks[cell].append({
+                    "kind": "instances",
+                    "lod": lod,
+                    "prototype": group["prototype"],
+                    "positions": positions[batch].ravel().tolist(),
+                    "rotations": rotations[batch].tolist()
+                })
+
+    parts = workspace.get("parts", [])
+    if parts:
+        positions = np.array([[p["position"].get(axis, 0) for axis in "xyz"] for p in parts], dtype=float)
+        half_heights = np.array([p["size"].get("y", 0) / 2 for p in parts], dtype=float)
+        lods = np.array([object_lod(p["size"], lod_levels) for p in parts])
+        cells = cell_of(positions[:, 0], positions[:, 2])
+        extend(cells, positions[:, 1] - half_heights, positions[:, 1] + half_heights)
+        # Coarsest level first within a cell
+        for cell, members in _by_cell(cells * lod_levels + (lod_levels - 1 - lods)):
+            cell, lod = divmod(cell, lod_levels)
+            for start in range(0, len(members), parts_per_chunk):
+                cell_chunks[cell].append({
+                    "kind": "parts",
+                    "lod": lod_levels - 1 - lod,
+                    "items": [parts[i] for i in members[start:start + parts_per_chunk]]
+                })
+
+    chunks: List[Dict[str, Any]] = []
+    cells_manifest = []
+    for cell, members in enumerate(cell_chunks):
+        if not members:
+            continue
+        row, col = divmod(cell, cells_per_side)
+        for chunk in members:
+            chunk["cell"] = [row, col]
+            chunk["index"] = len(chunks)
+            chunks.append(chunk)
+        min_x = row * cell_size - world_size / 2
+        min_z = col * cell_size - world_size / 2
+        bottom, top = (float(low[cell]), float(high[cell])) if np.isfinite(low[cell]) else (0.0, 0.0)
+        cells_manifest.append({
+            "cell": [row, col],
+            "bounds": {
+                "min": [min_x, bottom, min_z],
+                "max": [min(min_x + cell_size, world_size / 2), top, min(min_z + cell_size, world_size / 2)]
+            },
+            "chunks": [chunk["index"] for chunk in members]
+        })
+
+    manifest = {
+        "version": world.get("version"),
+        "metadata": world.get("metadata", {}),
+        "terrain": terrain_header,
+        "prototypes": instances["prototypes"],
+        "cell_size": cell_size,
+        "cells_per_side": cells_per_side,
+        "lod_levels": lod_levels,
+        "cells": cells_manifest,
+        "chunk_count": len(chunks),
+        "chunks": [_entry(chunk) for chunk in chunks]
+    }
+    return manifest, chunks
+
+
+def _by_cell(cells: np.ndarray) -> List[Tuple[int, List[int]]]:
+    """Group item indices by cell, keeping their original order within a cell"""
+    order = np.argsort(cells, kind="stable")
+    keys, starts = np.unique(cells[order], return_index=True)
+    groups = np.split(order, starts[1:])
+    return [(int(key), group.tolist()) for key, group in zip(keys, groups)]
+
+
+def _preview_block(heights: np.ndarray, resolution: int, first_row: int, first_col: int,
+                   rows: int, cols: int) -> np.ndarray:
+    """Samples of a (possibly coarser) heightmap covering a block of the full-resolution grid"""
+    ratio = heights.shape[0] / resolution
+    row_start, col_start = int(first_row * ratio), int(first_col * ratio)
+    row_stop = max(row_start + 1, int(math.ceil((first_row + rows) * ratio)))
+    col_stop = max(col_start + 1, int(math.ceil((first_col + cols) * ratio)))
+    return heights[row_start:row_stop, col_start:col_stop]
+
+
+def _entry(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """Manifest entry for a chunk"""
+    entry = {
+        "index": chunk["index"],
+        "kind": chunk["kind"],
+        "count": _count(chunk),
+        "cell": chunk["cell"],
+        "lod": chunk["lod"]
+    }
+    if "tile" in chunk:
+        entry["tile"] = chunk["tile"]
+    return entry
+
+
+def _count(chunk: Dict[str, Any]) -> int:
+    """Number of items (or heightmap samples) a chunk carries"""
+    if "tile" in chunk:
+        return chunk["samples"]
+    if chunk["kind"] == "terrain":
+        heightmap = chunk["heightmap"]
+        if is_encoded(heightmap):
+            return heightmap["shape"][0] * heightmap["shape"][1]
+        return len(heightmap) * len(heightmap[0]) if heightmap else 0
+    if chunk["kind"] == "instances":
+        return len(chunk["rotations"])
+    return len(chunk["items"])
@@ -1,16 +1,67 @@
 """
 World generation engine - creates world data from specifications
 """
+import os
 import numpy as np
-from typing import Dict, Any, List, Tuple
-import random
-import math
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
+from core.terrain import SurfaceSampler, TerrainEngine
+from core.heightmap_codec import encode_heightmap
+from core.part_optimizer import optimize_world
+from core.placement import Placer, footprint_radius, structure_footprint
+from core.voxels import voxelize_heightmap
+from core.world_model import ObjectKind, ObjectParts, ObjectTable, as_object_table
+
+HEIGHTMAP_ENCODINGS = ("int16", "float")
+OBJECT_OUTPUTS = ("instanced", "parts")
+
+
+def new_seed() -> int:
+    """Pick a fresh random seed for a world that did not request one"""
+    return int(np.random.default_rng().integers(2**32))
+
+
+def _terrain_seed(rng: Optional[np.random.Generator]) -> Optional[int]:
+    """Draw the terrain noise seed from the job's generator"""
+    return int(rng.integers(2**31)) if rng is not None else None
+
+
 class WorldGenerator:
     """Generates world data from structured specifications"""
     
-    def __init__(self):
+    def __init__(self, heightmap_encoding: Optional[str] = None,
+                 object_output: Optional[str] = None,
+                 terrain_voxels: Optional[bool] = None):
+        """
+        Args:
+            heightmap_encoding: How heightmaps are written in Roblox format:
+                "int16" (quantized, delta + zlib, base64) or "float" (nested
+                lists); defaults to HEIGHTMAP_ENCODING, then "int16"
+            object_output: How objects are written in Roblox format:
+                "instanced" (shared prototypes plus per-instance position and
+                rotation arrays) or "parts" (one full part dict each);
+                defaults to OBJECT_OUTPUT, then "instanced"
+            terrain_voxels: Also write terrain as run-length encoded voxel
+                regions for Terrain:WriteVoxels; defaults to TERRAIN_VOXELS,
+                then true
+        """
+        heightmap_encoding = heightmap_encoding or os.getenv("HEIGHTMAP_ENCODING", "int16")
+        if heightmap_encoding not in HEIGHTMAP_ENCODINGS:
+            raise ValueError(
+                f"Unknown heightmap encoding '{heightmap_encoding}', expected one of {HEIGHTMAP_ENCODINGS}"
+            )
+        self.heightmap_encoding = heightmap_encoding
+        object_output = object_output or os.getenv("OBJECT_OUTPUT", "instanced")
+        if object_output not in OBJECT_OUTPUTS:
+            raise ValueError(
+                f"Unknown object output '{object_output}', expected one of {OBJECT_OUTPUTS}"
+            )
+        self.object_output = object_output
+        if terrain_voxels is None:
+            terrain_voxels = os.getenv("TERRAIN_VOXELS", "true").lower() == "true"
+        self.terrain_voxels = terrain_voxels
+        self.terrain_engine = TerrainEngine()
         self.terrain_generators = {
             "mountain": self._generate_mountain_terrain,
             "valley": self._generate_valley_terrain,
@@ -20,24 +71,46 @@ class WorldGenerator:
             "forest": self._generate_forest_terrain
         }
     
+    def output_settings(self) -> Dict[str, Any]:
+        """Settings that change the Roblox-format output (part of world cache keys)"""
+        return {
+            "heightmap_encoding": self.heightmap_encoding,
+            "object_output": self.object_output,
+            "terrain_voxels": self.terrain_voxels
+        }
+    
     async def generate(self, spec: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate world data from specification (see `generate_sync`)"""
+        return self.generate_sync(spec, options)
+    
+    def generate_sync(self, spec: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate world data from specification
         
+        This is pure CPU work, so it can run in an executor worker.
+        
         Args:
             spec: World specification from prompt processor
-            options: Generation options (size, includes, etc.)
+            options: Generation options (size, includes, seed, etc.)
         
         Returns:
             Dictionary containing complete world data
         """
         world_size = options.get("size", 512)
         
+        # Every random choice below comes from this per-job generator, so the
+        # same spec, options and seed always produce the same world
+        seed = options.get("seed")
+        if seed is None:
+            seed = new_seed()
+        rng = np.random.default_rng(seed)
+        
         world_data = {
             "size": world_size,
+            "seed": seed,
             "terrain": None,
             "structures": [],
-            "objects": [],
+            "objects": ObjectTable(),
             "atmosphere": spec.get("atmosphere", {}),
             "theme": spec.get("theme", "generic")
         }
@@ -48,153 +121,84 @@ class WorldGenerator:
             generator = self.terrain_generators.get(terrain_type, self._generate_plains_terrain)
             world_data["terrain"] = generator(
                 world_size,
-                spec.get("terrain", {})
+                spec.get("terrain", {}),
+                rng
             )
+            
+            # Tiled mode: the heightmap above is a capped-resolution preview;
+            # full-resolution tiles are generated separately from this layout
+            if options.get("terrain_mode") == "tiled":
+                terrain = world_data["terrain"]
+                terrain["tiles"] = self.terrain_engine.tile_layout(
+                    terrain["type"],
+                    world_size,
+                    spec.get("terrain", {}),
+                    terrain["seed"]
+                )
+        
+        # Objects are placed against one spatial index holding the structure
+        # footprints and every object placed so far, off the water
+        terrain = world_data["terrain"]
+        placer = Placer(world_size, terrain["heightmap"] if terrain else None)
+        # ...and stood on the ground
+        surface = SurfaceSampler(terrain["heightmap"], world_size) if terrain else None
         
         # Generate structures
         if options.get("include_structures", True):
             for struct_spec in spec.get("structures", []):
-                structure = self._generate_structure(struct_spec, world_size)
+                structure = self._generate_structure(struct_spec, world_size, surface)
                 if structure:
                     world_data["structures"].append(structure)
+                    placer.add_structure(structure)
         
         # Generate objects
         if options.get("include_objects", True):
             for obj_spec in spec.get("objects", []):
-                objects = self._generate_objects(obj_spec, world_size)
-                world_data["objects"].extend(objects)
+                world_data["objects"].extend(
+                    self._generate_objects(obj_spec, world_size, rng, placer, surface)
+                )
         
         return world_data
     
-    def _generate_mountain_terrain(self, size: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_mountain_terrain(self, size: int, config: Dict[str, Any],
+                                   rng: Optional[np.random.Generator] = None) -> Dict[str, Any]:
         """Generate mountain terrain"""
-        height_variation = config.get("height_variation", 0.5)
-        resolution = min(size // 4, 128)
-        
-        # Create heightmap using Perlin-like noise
-        heights = np.zeros((resolution, resolution))
-        center_x, center_y = resolution // 2, resolution // 2
-        
-        for i in range(resolution):
-            for j in range(resolution):
-                # Distance from center
-                dist = math.sqrt((i - center_x)**2 + (j - center_y)**2)
-                max_dist = math.sqrt(center_x**2 + center_y**2)
-                
-                # Base height (higher in center)
-                base_height = max(0, 1 - (dist / max_dist) * 1.5)
-                
-                # Add noise
-                noise = random.uniform(-0.2, 0.2)
-                
-                # Combine
-                height = (base_height + noise) * height_variation * 100
-                heights[i][j] = max(0, height)
-        
-        return {
-            "type": "mountain",
-            "heightmap": heights.tolist(),
-            "resolution": resolution,
-            "max_height": float(np.max(heights))
-        }
+        return self.terrain_engine.generate("mountain", size, config, _terrain_seed(rng))
     
-    def _generate_valley_terrain(self, size: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_valley_terrain(self, size: int, config: Dict[str, Any],
+                                 rng: Optional[np.random.Generator] = None) -> Dict[str, Any]:
         """Generate valley terrain"""
-        resolution = min(size // 4, 128)
-        heights = np.zeros((resolution, resolution))
-        
-        for i in range(resolution):
-            for j in range(resolution):
-                # Valley shape (lower in center, higher on edges)
-                center_dist = abs(i - resolution // 2) / (resolution // 2)
-                height = center_dist * 30 + random.uniform(-5, 5)
-                heights[i][j] = max(0, height)
-        
-        return {
-            "type": "valley",
-            "heightmap": heights.tolist(),
-            "resolution": resolution,
-            "max_height": float(np.max(heights))
-        }
+        return self.terrain_engine.generate("valley", size, config, _terrain_seed(rng))
     
-    def _generate_plains_terrain(self, size: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_plains_terrain(self, size: int, config: Dict[str, Any],
+                                 rng: Optional[np.random.Generator] = None) -> Dict[str, Any]:
         """Generate flat plains terrain"""
-        resolution = min(size // 4, 128)
-        heights = np.zeros((resolution, resolution))
-        
-        # Slight random variation
-        for i in range(resolution):
-            for j in range(resolution):
-                heights[i][j] = random.uniform(0, 5)
-        
-        return {
-            "type": "plains",
-            "heightmap": heights.tolist(),
-            "resolution": resolution,
-            "max_height": 5.0
-        }
+        return self.terrain_engine.generate("plains", size, config, _terrain_seed(rng))
     
-    def _generate_island_terrain(self, size: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_island_terrain(self, size: int, config: Dict[str, Any],
+                                 rng: Optional[np.random.Generator] = None) -> Dict[str, Any]:
         """Generate island terrain"""
-        resolution = min(size // 4, 128)
-        heights = np.zeros((resolution, resolution))
-        center_x, center_y = resolution // 2, resolution // 2
-        
-        for i in range(resolution):
-            for j in range(resolution):
-                dist = math.sqrt((i - center_x)**2 + (j - center_y)**2)
-                max_dist = resolution // 2
-                
-                # Island shape (circular, higher in center)
-                if dist < max_dist:
-                    height = (1 - dist / max_dist) * 40 + random.uniform(-2, 2)
-                    heights[i][j] = max(0, height)
-                else:
-                    heights[i][j] = -10  # Water level
-        
-        return {
-            "type": "island",
-            "heightmap": heights.tolist(),
-            "resolution": resolution,
-            "max_height": float(np.max(heights))
-        }
+        return self.terrain_engine.generate("island", size, config, _terrain_seed(rng))
     
-    def _generate_desert_terrain(self, size: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_desert_terrain(self, size: int, config: Dict[str, Any],
+                                 rng: Optional[np.random.Generator] = None) -> Dict[str, Any]:
         """Generate desert terrain with dunes"""
-        resolution = min(size // 4, 128)
-        heights = np.zeros((resolution, resolution))
-        
-        for i in range(resolution):
-            for j in range(resolution):
-                # Dune pattern
-                dune_height = math.sin(i * 0.1) * math.cos(j * 0.1) * 15
-                heights[i][j] = 10 + dune_height + random.uniform(-2, 2)
-        
-        return {
-            "type": "desert",
-            "heightmap": heights.tolist(),
-            "resolution": resolution,
-            "max_height": float(np.max(heights))
-        }
+        return self.terrain_engine.generate("desert", size, config, _terrain_seed(rng))
     
-    def _generate_forest_terrain(self, size: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_forest_terrain(self, size: int, config: Dict[str, Any],
+                                 rng: Optional[np.random.Generator] = None) -> Dict[str, Any]:
         """Generate forest terrain"""
-        resolution = min(size // 4, 128)
-        heights = np.zeros((resolution, resolution))
-        
-        for i in range(resolution):
-            for j in range(resolution):
-                heights[i][j] = random.uniform(5, 15)
-        
-        return {
-            "type": "forest",
-            "heightmap": heights.tolist(),
-            "resolution": resolution,
-            "max_height": 15.0
-        }
+        return self.terrain_engine.generate("forest", size, config, _terrain_seed(rng))
     
-    def _generate_structure(self, spec: Dict[str, Any], world_size: int) -> Dict[str, Any]:
-        """Generate a structure from specification"""
+    def _generate_structure(self, spec: Dict[str, Any], world_size: int,
+                            surface: Optional[SurfaceSampler] = None) -> Dict[str, Any]:
+        """
+        Generate a structure from specification
+        
+        The structure's origin is its ground-level center. With a terrain
+        `surface` it sits at the lowest ground under its footprint, so no
+        corner overhangs a slope; `position.y` lifts it above that.
+        """
         struct_type = spec.get("type", "building")
         position = spec.get("position", {"x": 0.5, "y": 0.0, "z": 0.5})
         size = spec.get("size", {"width": 20, "height": 30, "depth": 20})
@@ -205,13 +209,20 @@ class WorldGenerator:
         z = int(position["z"] * world_size - world_size // 2)
         y = int(position.get("y", 0) * 50)
         
-        return {
+        structure = {
             "type": struct_type,
             "position": {"x": x, "y": y, "z": z},
             "size": size,
             "style": style,
             "parts": self._generate_structure_parts(struct_type, size, style)
         }
+        if surface is not None:
+            min_x, min_z, max_x, max_z = structure_footprint(structure)
+            corners_x = np.array([min_x, max_x, min_x, max_x, x])
+            corners_z = np.array([min_z, min_z, max_z, max_z, z])
+            ground = float(surface.heights_at(corners_x, corners_z).min())
+            structure["position"]["y"] = round(ground + y, 2)
+        return structure
     
     def _generate_structure_parts(self, struct_type: str, size: Dict[str, int], style: str) -> List[Dict[str, Any]]:
         """Generate individual parts for a structure"""
@@ -239,7 +250,7 @@ class WorldGenerator:
             # Main building
             parts.append({
                 "shape": "block",
-                "size": size,
+                "size": {"x": size["width"], "y": size["height"], "z": size["depth"]},
                 "position": {"x": 0, "y": size["height"] // 2, "z": 0},
                 "material": "Wood",
                 "color": [139, 90, 43]
@@ -256,7 +267,7 @@ class WorldGenerator:
             # Generic building
             parts.append({
                 "shape": "block",
-                "size": size,
+                "size": {"x": size["width"], "y": size["height"], "z": size["depth"]},
                 "position": {"x": 0, "y": size["height"] // 2, "z": 0},
                 "material": "Plastic",
                 "color": [200, 200, 200]
@@ -264,34 +275,53 @@ class WorldGenerator:
         
         return parts
     
-    def _generate_objects(self, spec: Dict[str, Any], world_size: int) -> List[Dict[str, Any]]:
-        """Generate multiple objects from specification"""
+    def _generate_objects(self, spec: Dict[str, Any], world_size: int,
+                          rng: Optional[np.random.Generator] = None,
+                          placer: Optional[Placer] = None,
+                          surface: Optional[SurfaceSampler] = None) -> ObjectTable:
+        """
+        Generate multiple objects from specification, as a table of one kind
+        
+        Objects are scattered with blue noise inside the spread square, so
+        they keep at least `min_spacing` studs apart (default: footprints
+        just touching) and stay clear of whatever `placer` already holds.
+        Crowded or mostly flooded areas yield fewer than `count` objects.
+        
+        Positions are part centers. With a terrain `surface`, each object
+        stands on the interpolated ground and is sunk by the rise of the
+        slope across its footprint, so its downhill edge does not float.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        placer = placer if placer is not None else Placer(world_size)
         obj_type = spec.get("type", "tree")
         position = spec.get("position", {"x": 0.5, "y": 0.0, "z": 0.5})
         count = spec.get("count", 10)
         spread = spec.get("spread", 0.2)
+        size = self._get_object_size(obj_type)
         
-        objects = []
         center_x = int(position["x"] * world_size - world_size // 2)
         center_z = int(position["z"] * world_size - world_size // 2)
-        
-        for _ in range(count):
-            # Random position within spread
-            offset_x = random.uniform(-spread, spread) * world_size
-            offset_z = random.uniform(-spread, spread) * world_size
-            
-            obj = {
-                "type": obj_type,
-                "position": {
-                    "x": int(center_x + offset_x),
-                    "y": 0,
-                    "z": int(center_z + offset_z)
-                },
-                "size": self._get_object_size(obj_type),
-                "rotation": random.uniform(0, 360)
-            }
-            objects.append(obj)
-        
+        xs, zs = placer.place(
+            rng,
+            (center_x, center_z),
+            spread * world_size,
+            count,
+            footprint_radius(size),
+            spec.get("min_spacing")
+        )
+        rotations = rng.uniform(0, 360, len(xs))
+        
+        ys = np.full(len(xs), size["y"] / 2)
+        if surface is not None and len(xs):
+            ground, normals = surface.sample(xs, zs)
+            slope = np.hypot(normals[:, 0], normals[:, 2]) / normals[:, 1]
+            sink = np.minimum(footprint_radius(size) * slope, size["y"] / 2)
+            ys = ground + size["y"] / 2 - sink
+        
+        objects = ObjectTable()
+        kind = ObjectKind(obj_type, size, self._get_material_for_object(obj_type),
+                          self._get_color_for_object(obj_type))
+        objects.add(kind, np.stack([xs, ys, zs], axis=1), rotations)
         return objects
     
     def _get_object_size(self, obj_type: str) -> Dict[str, int]:
@@ -304,12 +334,29 @@ class WorldGenerator:
         }
         return sizes.get(obj_type, {"x": 2, "y": 2, "z": 2})
     
-    async def to_roblox_format(self, world_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Convert world data to Roblox-compatible format"""
+    async def to_roblox_format(self, world_data: Dict[str, Any],
+                               optimize_parts: bool = False) -> Dict[str, Any]:
+        """Convert world data to Roblox-compatible format (see `to_roblox_format_sync`)"""
+        return self.to_roblox_format_sync(world_data, optimize_parts)
+    
+    def to_roblox_format_sync(self, world_data: Dict[str, Any],
+                              optimize_parts: bool = False) -> Dict[str, Any]:
+        """
+        Convert world data to Roblox-compatible format
+        
+        With `optimize_parts`, touching blocks that look alike are merged
+        and hidden parts dropped (see core.part_optimizer); the part counts
+        before and after go in metadata["optimization"].
+        
+        With part output, workspace["parts"] is an ObjectParts view over
+        the objects rather than a list (until optimized); it serializes the
+        same.
+        """
         roblox_world = {
             "version": "1.0",
             "metadata": {
                 "size": world_data["size"],
+                "seed": world_data.get("seed"),
                 "theme": world_data.get("theme", "generic"),
                 "generated_at": str(datetime.now())
             },
@@ -319,6 +366,8 @@ class WorldGenerator:
                 "models": []
             }
         }
+        if self.object_output == "instanced":
+            roblox_world["workspace"]["instances"] = {"prototypes": [], "groups": []}
         
         # Convert terrain
         if world_data.get("terrain"):
@@ -337,35 +386,78 @@ class WorldGenerator:
             roblox_world["workspace"]["models"].append(model)
         
         # Convert objects
-        for obj in world_data.get("objects", []):
-            part = {
-                "name": obj["type"],
-                "shape": "block",
-                "size": obj["size"],
-                "position": obj["position"],
-                "rotation": {"x": 0, "y": obj.get("rotation", 0), "z": 0},
-                "material": self._get_material_for_object(obj["type"]),
-                "color": self._get_color_for_object(obj["type"])
-            }
-            roblox_world["workspace"]["parts"].append(part)
+        objects = as_object_table(
+            world_data.get("objects"), self._get_material_for_object, self._get_color_for_object
+        )
+        if self.object_output == "instanced":
+            roblox_world["workspace"]["instances"] = self._instance_objects(objects)
+        else:
+            # Part dicts are built as the world is written out
+            roblox_world["workspace"]["parts"] = ObjectParts(objects)
+        
+        if optimize_parts:
+            # Tiled worlds only have a preview heightmap, too coarse to bury parts under
+            terrain = world_data.get("terrain")
+            surface = None
+            if terrain and not terrain.get("tiles") and len(terrain.get("heightmap", [])):
+                surface = SurfaceSampler(terrain["heightmap"], world_data["size"])
+            roblox_world["metadata"]["optimization"] = optimize_world(roblox_world, surface)
         
         return roblox_world
     
+    def _instance_objects(self, objects: ObjectTable) -> Dict[str, Any]:
+        """
+        Group objects by their shared part properties
+        
+        Each object kind is one prototype, so the groups come straight from
+        the table's columns.
+        
+        Returns:
+            {"prototypes": [...], "groups": [...]}; each prototype holds the
+            name, shape, size, material and color of a part, and each group lists the instances of
+            one prototype as flat arrays: positions [x0, y0, z0, x1, ...]
+            and y rotations in degrees
+        """
+        prototypes: List[Dict[str, Any]] = []
+        groups: List[Dict[str, Any]] = []
+        for kind, rows in objects.by_kind():
+            groups.append({
+                "prototype": len(prototypes),
+                "positions": objects.positions[rows].ravel().tolist(),
+                "rotations": np.round(objects.rotations[rows], 2).tolist()
+            })
+            prototypes.append({
+                "name": kind.type,
+                "shape": "block",
+                "size": dict(kind.size),
+                "material": kind.material,
+                "color": list(kind.color)
+            })
+        return {"prototypes": prototypes, "groups": groups}
+    
     def _convert_terrain(self, terrain: Dict[str, Any], world_size: int) -> Dict[str, Any]:
         """Convert terrain data to Roblox format"""
         heightmap = terrain.get("heightmap", [])
         resolution = terrain.get("resolution", 64)
+        if self.heightmap_encoding == "int16" and len(heightmap):
+            heightmap = encode_heightmap(heightmap)
         
         # Scale heightmap to world size
         scale = world_size / resolution
         
-        return {
+        converted = {
             "type": terrain.get("type", "plains"),
             "heightmap": heightmap,
             "resolution": resolution,
             "scale": scale,
             "max_height": terrain.get("max_height", 50)
         }
+        if terrain.get("tiles"):
+            # Tiles carry their own voxels; the heightmap here is a preview
+            converted["tiles"] = terrain["tiles"]
+        elif self.terrain_voxels and len(terrain.get("heightmap", [])):
+            converted["voxels"] = voxelize_heightmap(terrain["heightmap"], world_size, converted["type"])
+        return converted
     
     def _get_material_for_object(self, obj_type: str) -> str:
         """Get Roblox material for object type"""
@@ -0,0 +1,205 @@
+"""
+World model - columnar storage for placed objects, so large worlds are a few arrays rather than a dict per object
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+class ObjectKind:
+    """Properties every object of one kind shares: type name, size, material and color"""
+
+    __slots__ = ("type", "size", "material", "color")
+
+    def __init__(self, type: str, size: Dict[str, float], material: str, color: List[int]):
+        self.type = type
+        self.size = size
+        self.material = material
+        self.color = color
+
+    def key(self) -> Tuple[Any, ...]:
+        return (self.type, tuple(sorted(self.size.items())), self.material, tuple(self.color))
+
+
+class ObjectTable:
+    """
+    Placed objects as parallel arrays over a palette of kinds
+
+    Row i is an object of kind `kinds[kind[i]]` centered at positions[i]
+    (x, y, z, rounded to 0.01 studs) and turned rotations[i] degrees about
+    y. Objects are added a batch at a time and stay in insertion order.
+    The arrays pickle as single buffers, so a table crosses the executor's
+    process boundary cheaply; dicts are only built by `to_dicts`.
+    """
+
+    __slots__ = ("kinds", "_kind_index", "_batches", "_kind", "_positions", "_rotations")
+
+    def __init__(self):
+        self.kinds: List[ObjectKind] = []
+        self._kind_index: Dict[Tuple[Any, ...], int] = {}
+        # Appended batches, concatenated on first read
+        self._batches: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._kind = np.empty(0, dtype=np.int32)
+        self._positions = np.empty((0, 3))
+        self._rotations = np.empty(0)
+
+    def __len__(self) -> int:
+        return len(self._kind) + sum(len(batch[0]) for batch in self._batches)
+
+    def kind_id(self, kind: ObjectKind) -> int:
+        """Palette index of a kind, adding it on first use"""
+        key = kind.key()
+        index = self._kind_index.get(key)
+        if index is None:
+            index = self._kind_index[key] = len(self.kinds)
+            self.kinds.append(kind)
+        return index
+
+    def add(self, kind: ObjectKind, positions: np.ndarray, rotations: np.ndarray):
+        """
+        Append objects of one kind
+
+        Args:
+            kind: Shared properties of the objects
+            positions: (n, 3) centers
+            rotations: (n,) y rotations in degrees
+        """
+        positions = np.round(np.asarray(positions, dtype=float).reshape(-1, 3), 2)
+        rotations = np.asarray(rotations, dtype=float).reshape(-1)
+        if len(positions) != len(rotations):
+            raise ValueError(f"{len(positions)} positions but {len(rotations)} rotations")
+        if not len(positions):
+            return
+        kind_ids = np.full(len(positions), self.kind_id(kind), dtype=np.int32)
+        self._batches.append((kind_ids, positions, rotations))
+
+    def extend(self, other: "ObjectTable"):
+        """Append every object of another table"""
+        remap = np.array([self.kind_id(kind) for kind in other.kinds], dtype=np.int32)
+        if len(other):
+            self._batches.append((remap[other.kind], other.positions, other.rotations))
+
+    def _compact(self):
+        if self._batches:
+            kinds, positions, rotations = zip(*self._batches)
+            self._kind = np.concatenate((self._kind,) + kinds)
+            self._positions = np.concatenate((self._positions,) + positions)
+            self._rotations = np.concatenate((self._rotations,) + rotations)
+            self._batches = []
+
+    @property
+    def kind(self) -> np.ndarray:
+        """(n,) palette index of every object"""
+        self._compact()
+        return self._kind
+
+    @property
+    def positions(self) -> np.ndarray:
+        """(n, 3) object centers"""
+        self._compact()
+        return self._positions
+
+    @property
+    def rotations(self) -> np.ndarray:
+        """(n,) y rotations in degrees"""
+        self._compact()
+        return self._rotations
+
+    def by_kind(self) -> Iterator[Tuple[ObjectKind, np.ndarray]]:
+        """(kind, row indices in insertion order) for every kind with objects, in palette order"""
+        kind = self.kind
+        order = np.argsort(kind, kind="stable")
+        ids, starts = np.unique(kind[order], return_index=True)
+        for kind_id, rows in zip(ids.tolist(), np.split(order, starts[1:])):
+            yield self.kinds[kind_id], rows
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """One {"type", "position", "size", "rotation"} dict per object"""
+        kinds = self.kinds
+        return [
+            {
+                "type": kinds[kind_id].type,
+                "position": {"x": x, "y": y, "z": z},
+                "size": dict(kinds[kind_id].size),
+                "rotation": rotation
+            }
+            for kind_id, (x, y, z), rotation in zip(
+                self.kind.tolist(), self.positions.tolist(), self.rotations.tolist()
+            )
+        ]
+
+    @classmethod
+    def from_dicts(cls, objects: List[Dict[str, Any]], material_for, color_for) -> "ObjectTable":
+        """
+        Build a table from object dicts
+
+        Args:
+            objects: {"type", "position", "size", "rotation"} dicts
+            material_for: Material of an object type
+            color_for: Color of an object type
+        """
+        table = cls()
+        for obj in objects:
+            kind = ObjectKind(obj["type"], dict(obj["size"]), material_for(obj["type"]), color_for(obj["type"]))
+            position = obj["position"]
+            table.add(kind, [[position["x"], position["y"], position["z"]]], [obj.get("rotation", 0)])
+        return table
+
+    def __getstate__(self) -> Dict[str, Any]:
+        self._compact()
+        return {"kinds": self.kinds, "kind": self._kind, "positions": self._positions,
+                "rotations": self._rotations}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.kinds = state["kinds"]
+        self._kind_index = {kind.key(): i for i, kind in enumerate(self.kinds)}
+        self._batches = []
+        self._kind = state["kind"]
+        self._positions = state["positions"]
+        self._rotations = state["rotations"]
+
+
+class ObjectParts:
+    """
+    A table's objects as Roblox part dicts, built as they are iterated
+
+    Stands in for the list of part dicts: it has a length and can be
+    iterated any number of times, but only a batch of dicts exists at a
+    time, so a world can be written out (utils.serialization.iter_json)
+    without a dict per object in memory. Changes to the yielded dicts are
+    not kept; take a list first to edit parts.
+    """
+
+    __slots__ = ("objects", "batch_size")
+
+    def __init__(self, objects: ObjectTable, batch_size: int = 4096):
+        self.objects = objects
+        self.batch_size = batch_size
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        kinds = self.objects.kinds
+        kind, positions, rotations = self.objects.kind, self.objects.positions, self.objects.rotations
+        for start in range(0, len(kind), self.batch_size):
+            stop = start + self.batch_size
+            for kind_id, (x, y, z), rotation in zip(
+                kind[start:stop].tolist(), positions[start:stop].tolist(), rotations[start:stop].tolist()
+            ):
+                yield {
+                    "name": kinds[kind_id].type,
+                    "shape": "block",
+                    "size": dict(kinds[kind_id].size),
+                    "position": {"x": x, "y": y, "z": z},
+                    "rotation": {"x": 0, "y": rotation, "z": 0},
+                    "material": kinds[kind_id].material,
+                    "color": list(kinds[kind_id].color)
+                }
+
+
+def as_object_table(objects: Optional[Any], material_for, color_for) -> ObjectTable:
+    """World data objects as a table, whether stored as a table or a list of dicts"""
+    if isinstance(objects, ObjectTable):
+        return objects
+    return ObjectTable.from_dicts(objects or [], material_for, color_for)
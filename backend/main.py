@@ -1,11 +1,13 @@
 """
 FastAPI backend server for Roblox World Generator
 """
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Annotated, Optional, Dict, Any, List, Tuple
+import asyncio
 import os
 import uuid
 import json
@@ -17,9 +19,23 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from core.prompt_processor import PromptProcessor
-from core.world_generator import WorldGenerator
+from core.spec_cache import SpecCache
+from core.world_generator import WorldGenerator, new_seed
 from core.model_processor import ModelProcessor
+from core.executor import GenerationExecutor, generate_stage, convert_stage, terrain_tile_stage
+from core.terrain import TILED_THRESHOLD
 from utils.storage import StorageManager
+from utils.cache import WorldCache
+from utils.job_store import create_job_store, COMPLETED, FAILED, PROCESSING, QUEUED
+from core.job_worker import JobWorker
+from core.world_chunks import split_world
+from core.rbxm import iter_rbxm
+from core.progress import ProgressBroker, StageProgress, stage_weights
+from core.retention import RetentionSweeper
+from utils.archive import zip_stream
+from utils.http_files import serve_file
+from utils.metrics import REGISTRY, Counter, Gauge, Histogram, StageTimer
+from utils.serialization import loads_json
 
 app = FastAPI(title="Roblox World Generator API", version="1.0.0")
 
@@ -33,23 +49,141 @@ app.add_middleware(
 )
 
 # Initialize components
-prompt_processor = PromptProcessor()
-world_generator = WorldGenerator()
-model_processor = ModelProcessor()
 storage = StorageManager()
+spec_cache = SpecCache(
+    max_entries=int(os.getenv("SPEC_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("SPEC_CACHE_TTL", "86400")),
+    storage=storage if os.getenv("SPEC_CACHE_PERSIST", "true").lower() == "true" else None
+)
+prompt_processor = PromptProcessor(spec_cache=spec_cache)
+model_processor = ModelProcessor()
+world_cache = WorldCache(
+    storage,
+    max_entries=int(os.getenv("WORLD_CACHE_SIZE", "16")),
+    # Executor workers build their generators from the same environment
+    output=WorldGenerator().output_settings()
+)
+generation_executor = GenerationExecutor()
 
-# In-memory job storage (use Redis in production)
-jobs: Dict[str, Dict[str, Any]] = {}
+# Jobs live in a shared store (SQLite file or Redis) so any API process can
+# answer for them and any worker process can run them
+job_store = create_job_store()
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "5"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
 
+# Run jobs inside the API process too; disable when dedicated workers
+# (python worker.py) are started
+job_worker: Optional[JobWorker] = None
+EMBEDDED_WORKER = os.getenv("EMBEDDED_WORKER", "true").lower() == "true"
 
-class GenerationRequest(BaseModel):
-    prompt: str = Field(..., description="Text description of the world to generate")
-    world_size: int = Field(512, ge=128, le=2048, description="World size in studs")
+
+async def _world_evicted(job_id: str, reason: str):
+    """Mark a job whose world the retention sweeper deleted"""
+    await job_store.update(job_id, file_path=None, evicted_at=datetime.now().isoformat(),
+                           evicted_reason=reason)
+
+
+# Deletes stored worlds past their age, per-user or total size limits and
+# trims the caches; one API process per storage directory should run it
+retention = RetentionSweeper(storage, on_evict=_world_evicted)
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "true").lower() == "true"
+
+# Pipeline metrics of this process, exposed on /metrics; standalone workers
+# record their own
+STAGE_SECONDS = Histogram("worldgen_stage_seconds", "Wall time of each generation stage", ["stage"])
+STAGE_CPU_SECONDS = Histogram(
+    "worldgen_stage_cpu_seconds",
+    "CPU time of each generation stage in executor workers and worker threads",
+    ["stage"]
+)
+WORLD_BYTES = Histogram(
+    "worldgen_world_bytes", "Size of saved world files",
+    buckets=[4 ** k * 1024 for k in range(1, 11)]
+)
+JOBS_FINISHED = Counter("worldgen_jobs_finished_total", "Job attempts run in this process by outcome", ["outcome"])
+JOBS_IN_FLIGHT = Gauge("worldgen_jobs_in_flight", "Jobs running in this process")
+JOBS = Gauge("worldgen_jobs", "Jobs in the shared store by status (queued = queue depth)", ["status"])
+CACHE_EVENTS = Counter("worldgen_cache_events_total", "Cache counters (hits, misses, evictions, ...)", ["cache", "event"])
+CACHE_HIT_RATIO = Gauge("worldgen_cache_hit_ratio", "Share of cache lookups answered without recomputing", ["cache"])
+RETENTION_EVICTED = Counter("worldgen_retention_evicted_total", "Worlds deleted by the retention sweeper", ["reason"])
+RETENTION_RECLAIMED = Counter("worldgen_retention_bytes_reclaimed_total", "Bytes freed by the retention sweeper")
+STORED_WORLDS = Gauge("worldgen_stored_worlds", "Worlds in the world index")
+STORED_BYTES = Gauge("worldgen_stored_bytes", "Total size of the files of indexed worlds")
+
+
+def _stage_durations(stage: str) -> Tuple[int, float]:
+    """(jobs timed, total wall seconds) of a stage in this process"""
+    series = STAGE_SECONDS.labels(stage=stage)
+    return series.count, series.sum
+
+
+def _status_snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job record"""
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "progress": job.get("progress", 0),
+        "seed": job.get("seed"),
+        "cached": job.get("cached", False),
+        "attempts": job.get("attempts", 0),
+        "batch_id": job.get("batch_id"),
+        "created_at": job.get("created_at"),
+        "completed_at": job.get("completed_at"),
+        "failed_at": job.get("failed_at"),
+        "evicted_at": job.get("evicted_at"),
+        "optimization": job.get("optimization"),
+        "error": job.get("error")
+    }
+
+
+async def _job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """Get a job's status snapshot, or None if there is no such job"""
+    job = await job_store.get(job_id)
+    return _status_snapshot(job) if job is not None else None
+
+
+# Long-poll, SSE and WebSocket clients wait on the broker instead of polling
+# /api/status
+progress_broker = ProgressBroker(_job_status)
+
+
+class GenerationOptions(BaseModel):
+    world_size: int = Field(512, ge=128, le=16384, description="World size in studs")
     complexity: str = Field("medium", pattern="^(low|medium|high)$")
     style: Optional[str] = Field(None, description="Art style (e.g., 'medieval', 'modern', 'fantasy')")
     include_terrain: bool = True
     include_structures: bool = True
     include_objects: bool = True
+    terrain_mode: str = Field(
+        "auto", pattern="^(auto|single|tiled)$",
+        description="tiled generates full-resolution terrain tiles; auto tiles worlds above 2048 studs"
+    )
+    user_id: Optional[str] = Field(
+        None, max_length=128,
+        description="Owner of the world, for per-user retention limits"
+    )
+    optimize_parts: bool = Field(
+        False,
+        description="Merge touching blocks that look alike and drop hidden parts to cut the part count"
+    )
+
+
+class GenerationRequest(GenerationOptions):
+    prompt: str = Field(..., description="Text description of the world to generate")
+    seed: Optional[int] = Field(
+        None, ge=0, lt=2**32,
+        description="Random seed; the same prompt, options and seed reproduce the same world"
+    )
+
+
+class BatchGenerationRequest(GenerationOptions):
+    prompts: List[str] = Field(..., min_length=1, description="Prompts to generate; each is parsed once")
+    seeds: Optional[List[Annotated[int, Field(ge=0, lt=2**32)]]] = Field(
+        None, min_length=1,
+        description="Seeds generated for every prompt; defaults to `count` random seeds"
+    )
+    count: int = Field(1, ge=1, description="Random seeds per prompt when `seeds` is not given")
 
 
 class GenerationResponse(BaseModel):
@@ -58,6 +192,36 @@ class GenerationResponse(BaseModel):
     message: str
 
 
+class BatchGenerationResponse(BaseModel):
+    batch_id: str
+    job_ids: List[str]
+    status: str
+    message: str
+
+
+@app.on_event("startup")
+async def startup():
+    global job_worker
+    await generation_executor.warm_up()
+    if EMBEDDED_WORKER:
+        job_worker = JobWorker(job_store, process_generation)
+        job_worker.start()
+    if RETENTION_ENABLED:
+        retention.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if job_worker is not None:
+        await job_worker.stop()
+    await retention.stop()
+    await progress_broker.close()
+    await prompt_processor.aclose()
+    generation_executor.shutdown()
+    await job_store.close()
+    storage.close()
+
+
 @app.get("/")
 async def root():
     return {
@@ -68,24 +232,18 @@ async def root():
 
 
 @app.post("/api/generate", response_model=GenerationResponse)
-async def generate_world(request: GenerationRequest, background_tasks: BackgroundTasks):
+async def generate_world(request: GenerationRequest):
     """Generate a Roblox world from a text prompt"""
     job_id = str(uuid.uuid4())
     
-    # Initialize job
-    jobs[job_id] = {
-        "status": "queued",
+    # Queue the job; a worker (embedded or standalone) picks it up
+    await job_store.create(job_id, {
         "progress": 0,
         "created_at": datetime.now().isoformat(),
         "request": request.dict()
-    }
-    
-    # Start generation in background
-    background_tasks.add_task(
-        process_generation,
-        job_id,
-        request
-    )
+    }, max_attempts=JOB_MAX_ATTEMPTS)
+    if job_worker is not None:
+        job_worker.notify()
     
     return GenerationResponse(
         job_id=job_id,
@@ -94,120 +252,652 @@ async def generate_world(request: GenerationRequest, background_tasks: Backgroun
     )
 
 
-async def process_generation(job_id: str, request: GenerationRequest):
-    """Background task to process world generation"""
+@app.post("/api/generate/batch", response_model=BatchGenerationResponse)
+async def generate_batch(request: BatchGenerationRequest):
+    """
+    Generate every combination of several prompts and seeds
+    
+    Each distinct prompt is parsed into a spec once, before the items are
+    queued, and every seed of that prompt is generated from the same spec.
+    Items are ordinary jobs, so they spread over all workers and show up
+    in /api/status; /api/batch/{batch_id} aggregates them.
+    """
+    seeds = request.seeds or [new_seed() for _ in range(request.count)]
+    if len(request.prompts) * len(seeds) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can hold at most {BATCH_MAX_ITEMS} worlds (prompts x seeds)"
+        )
+    
+    options = request.dict(exclude={"prompts", "seeds", "count"})
+    prompts = list(dict.fromkeys(request.prompts))
+    specs = await asyncio.gather(*(
+        prompt_processor.process(prompt, {"style": request.style, "complexity": request.complexity})
+        for prompt in prompts
+    ))
+    spec_for = dict(zip(prompts, specs))
+    
+    batch_id = str(uuid.uuid4())
+    created_at = datetime.now().isoformat()
+    items = [
+        {"job_id": str(uuid.uuid4()), "prompt": prompt, "seed": seed}
+        for prompt in request.prompts
+        for seed in seeds
+    ]
+    await storage.save_batch(batch_id, {
+        "batch_id": batch_id,
+        "created_at": created_at,
+        "options": options,
+        "items": items
+    })
+    for item in items:
+        await job_store.create(item["job_id"], {
+            "progress": 0,
+            "created_at": created_at,
+            "request": {**options, "prompt": item["prompt"], "seed": item["seed"]},
+            "spec": spec_for[item["prompt"]],
+            "batch_id": batch_id
+        }, max_attempts=JOB_MAX_ATTEMPTS)
+    if job_worker is not None:
+        job_worker.notify()
+    
+    return BatchGenerationResponse(
+        batch_id=batch_id,
+        job_ids=[item["job_id"] for item in items],
+        status="queued",
+        message=f"Generation of {len(items)} worlds started"
+    )
+
+
+async def _report(job_id: str, **fields: Any):
+    """Record a stage transition and push it to clients watching the job"""
+    await job_store.update(job_id, **fields)
+    await progress_broker.publish(job_id)
+
+
+async def process_generation(job_id: str, job: Dict[str, Any], worker_id: Optional[str] = None):
+    """
+    Run one claimed generation job
+
+    Each stage is timed (wall and CPU) into the stage histograms and the
+    job's `timings`, and progress is the weighted share of finished stages.
+
+    Args:
+        job_id: Job identifier
+        job: Job record from the store (its "request" holds the GenerationRequest)
+        worker_id: Worker holding the job's lease; results from a worker
+            that lost its lease are discarded
+    """
+    timer = StageTimer(STAGE_SECONDS, STAGE_CPU_SECONDS)
+    JOBS_IN_FLIGHT.inc()
     try:
-        jobs[job_id]["status"] = "processing"
-        jobs[job_id]["progress"] = 10
+        request = GenerationRequest(**job["request"])
+        terrain_mode = request.terrain_mode
+        if terrain_mode == "auto":
+            terrain_mode = "tiled" if request.world_size > TILED_THRESHOLD else "single"
+        stages = ["prompt", "cache", "generate", "models", "convert", "save"]
+        if terrain_mode == "tiled" and request.include_terrain:
+            stages.insert(-1, "tiles")
+        plan = StageProgress(stages, stage_weights(_stage_durations))
+        await _report(job_id, progress=plan.progress(), error=None, timings=None)
         
-        # Step 1: Process prompt
-        jobs[job_id]["progress"] = 20
-        world_spec = await prompt_processor.process(request.prompt, {
-            "style": request.style,
-            "complexity": request.complexity
-        })
+        # Step 1: Process prompt (batch items arrive with their shared spec)
+        with timer.stage("prompt"):
+            world_spec = job.get("spec")
+            if world_spec is None:
+                world_spec = await prompt_processor.process(request.prompt, {
+                    "style": request.style,
+                    "complexity": request.complexity
+                })
+        plan.finish("prompt")
         
-        # Step 2: Generate world structure
-        jobs[job_id]["progress"] = 40
-        world_data = await world_generator.generate(world_spec, {
+        # Step 2: Generate world structure (or reuse a cached world)
+        # A retried job keeps the seed its first attempt picked
+        seed = request.seed if request.seed is not None else job.get("seed", new_seed())
+        generation_options = {
             "size": request.world_size,
             "include_terrain": request.include_terrain,
             "include_structures": request.include_structures,
-            "include_objects": request.include_objects
-        })
+            "include_objects": request.include_objects,
+            "terrain_mode": terrain_mode,
+            "optimize_parts": request.optimize_parts
+        }
+        with timer.stage("cache"):
+            cache_key = world_cache.key_for(world_spec, generation_options, seed)
+            roblox_world = await world_cache.get(cache_key)
+        plan.finish("cache")
+        if roblox_world is not None:
+            plan.skip("generate", "models", "convert")
+        await _report(job_id, progress=plan.progress(), seed=seed, cached=roblox_world is not None,
+                      timings=timer.stages)
         
-        # Step 3: Process 3D models if needed
-        jobs[job_id]["progress"] = 60
-        if world_data.get("models"):
-            processed_models = await model_processor.process_models(
-                world_data["models"]
-            )
-            world_data["models"] = processed_models
+        if roblox_world is None:
+            # CPU-bound stages run in the executor so the event loop stays free
+            with timer.stage("generate"):
+                world_data = await generation_executor.run(
+                    generate_stage, world_spec, {**generation_options, "seed": seed}
+                )
+            plan.finish("generate")
+            
+            # Step 3: Process 3D models if needed
+            if world_data.get("models"):
+                await _report(job_id, progress=plan.progress(), timings=timer.stages)
+                with timer.stage("models"):
+                    processed_models = await model_processor.process_models(
+                        world_data["models"]
+                    )
+                world_data["models"] = processed_models
+                plan.finish("models")
+            else:
+                plan.skip("models")
+            
+            # Step 4: Convert to Roblox format
+            await _report(job_id, progress=plan.progress(), timings=timer.stages)
+            with timer.stage("convert"):
+                roblox_world = await generation_executor.run(
+                    convert_stage, world_data, request.optimize_parts
+                )
+                await world_cache.put(cache_key, roblox_world)
+            plan.finish("convert")
         
-        # Step 4: Convert to Roblox format
-        jobs[job_id]["progress"] = 80
-        roblox_world = await world_generator.to_roblox_format(world_data)
+        # Full-resolution terrain tiles (tiled mode); tiles already in the
+        # tile store, e.g. from a cached world, are reused
+        terrain = roblox_world["workspace"].get("terrain") or {}
+        if terrain.get("tiles"):
+            await _report(job_id, progress=plan.progress(), timings=timer.stages)
+            with timer.stage("tiles"):
+                await _generate_terrain_tiles(job_id, terrain["tiles"], plan)
+            plan.finish("tiles")
+        else:
+            plan.skip("tiles")
         
         # Step 5: Save world file
-        jobs[job_id]["progress"] = 90
-        file_path = await storage.save_world(job_id, roblox_world)
+        await _report(job_id, progress=plan.progress(), timings=timer.stages)
+        with timer.stage("save"):
+            file_path = await storage.save_world(job_id, roblox_world, user_id=request.user_id)
+        world_bytes = os.path.getsize(file_path)
+        WORLD_BYTES.observe(world_bytes)
         
-        jobs[job_id]["status"] = "completed"
-        jobs[job_id]["progress"] = 100
-        jobs[job_id]["file_path"] = file_path
-        jobs[job_id]["completed_at"] = datetime.now().isoformat()
+        await job_store.complete(
+            job_id,
+            worker_id=worker_id,
+            progress=100,
+            file_path=file_path,
+            world_bytes=world_bytes,
+            optimization=roblox_world["metadata"].get("optimization"),
+            timings=timer.stages,
+            completed_at=datetime.now().isoformat()
+        )
+        JOBS_FINISHED.labels(outcome="completed").inc()
+        await progress_broker.publish(job_id)
         
     except Exception as e:
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
-        jobs[job_id]["failed_at"] = datetime.now().isoformat()
+        # Requeued for another attempt until the job runs out of them
+        JOBS_FINISHED.labels(outcome="failed").inc()
+        await job_store.fail(job_id, str(e), worker_id=worker_id, retry_delay=JOB_RETRY_DELAY)
+        await progress_broker.publish(job_id)
+    finally:
+        JOBS_IN_FLIGHT.dec()
+
+
+async def _terrain_tile(layout: Dict[str, Any], row: int, col: int, lod: int = 0) -> Path:
+    """Get a terrain tile's file at a level of detail, generating the tile if it is missing"""
+    tile_path = storage.terrain_tile_path(layout["key"], row, col, lod)
+    if not tile_path.exists():
+        tile = await generation_executor.run(terrain_tile_stage, layout, row, col, lod)
+        await asyncio.to_thread(storage.save_terrain_tile, layout["key"], row, col, tile, lod)
+    return tile_path
+
+
+async def _generate_terrain_tiles(job_id: str, layout: Dict[str, Any], plan: StageProgress):
+    """Generate every tile of a tiled terrain in parallel on the executor"""
+    coords = [(row, col) for row in range(layout["tiles_per_side"])
+              for col in range(layout["tiles_per_side"])]
+    done = 0
+    
+    async def generate(row: int, col: int):
+        nonlocal done
+        await _terrain_tile(layout, row, col)
+        done += 1
+        last = plan.last
+        progress = plan.progress("tiles", done / len(coords))
+        if progress != last:
+            await _report(job_id, progress=progress)
+    
+    await asyncio.gather(*(generate(row, col) for row, col in coords))
 
 
 @app.get("/api/status/{job_id}")
-async def get_status(job_id: str):
-    """Get the status of a generation job"""
-    if job_id not in jobs:
+async def get_status(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Long-poll: seconds to wait for a change"),
+    status: Optional[str] = Query(None, description="Long-poll cursor: last status seen"),
+    progress: Optional[int] = Query(None, description="Long-poll cursor: last progress seen"),
+    timings: bool = Query(False, description="Include wall and CPU seconds per pipeline stage")
+):
+    """
+    Get the status of a generation job
+    
+    With `wait`, the request is held until the status or progress differs
+    from the `status`/`progress` cursor (or from the current state if no
+    cursor is given), the job finishes, or `wait` seconds pass.
+    """
+    if wait > 0:
+        last = (status, progress) if status is not None and progress is not None else None
+        snapshot = await progress_broker.wait_for_change(job_id, last, wait)
+    else:
+        snapshot = await _job_status(job_id)
+    
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if timings:
+        job = await job_store.get(job_id) or {}
+        snapshot = {**snapshot, "timings": job.get("timings"), "world_bytes": job.get("world_bytes")}
+    return snapshot
+
+
+@app.get("/api/progress/{job_id}/stream")
+async def progress_stream(job_id: str, request: Request):
+    """Stream a job's status as server-sent events until it finishes"""
+    if await job_store.get(job_id) is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs[job_id]
-    return {
-        "job_id": job_id,
-        "status": job["status"],
-        "progress": job.get("progress", 0),
-        "created_at": job.get("created_at"),
-        "completed_at": job.get("completed_at"),
-        "failed_at": job.get("failed_at"),
-        "error": job.get("error")
-    }
+    async def events():
+        yield "retry: 2000\n\n"
+        async for snapshot in progress_broker.updates(job_id):
+            if await request.is_disconnected():
+                break
+            if snapshot is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
-@app.get("/api/download/{job_id}")
-async def download_world(job_id: str):
-    """Download the generated world file"""
-    if job_id not in jobs:
+@app.websocket("/api/progress/{job_id}/ws")
+async def progress_socket(websocket: WebSocket, job_id: str):
+    """Send a job's status snapshots over a WebSocket until it finishes"""
+    await websocket.accept()
+    if await job_store.get(job_id) is None:
+        await websocket.close(code=4404, reason="Job not found")
+        return
+    
+    try:
+        async for snapshot in progress_broker.updates(job_id):
+            if snapshot is not None:
+                await websocket.send_json(snapshot)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+async def _completed_world(job_id: str) -> Path:
+    """Get the world file of a completed job, or raise the matching HTTP error"""
+    job = await job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs[job_id]
-    if job["status"] != "completed":
+    if job["status"] != COMPLETED:
         raise HTTPException(
             status_code=400,
             detail=f"Job not completed. Current status: {job['status']}"
         )
     
+    if job.get("evicted_at"):
+        raise HTTPException(status_code=410, detail="World was deleted by the retention policy")
+    
     file_path = job.get("file_path")
     if not file_path or not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="World file not found")
+    return Path(file_path)
+
+
+async def _serve_world_file(request: Request, job_id: str, path: Path,
+                            download: bool = False, **options: Any):
+    """
+    Serve one file of a stored world, pinned against retention until sent
+    
+    Args:
+        request: Incoming request
+        job_id: World the file belongs to
+        path: File to serve
+        download: The world or its manifest (not a single chunk) is fetched
+        **options: Passed on to serve_file
+    """
+    storage.pin(job_id)
+    try:
+        await storage.touch_world(job_id, download=download)
+        release = BackgroundTask(_release_world_file, job_id, download)
+        return await serve_file(request, path, background=release, **options)
+    except FileNotFoundError:
+        storage.unpin(job_id)
+        raise HTTPException(status_code=404, detail="World file not found")
+    except BaseException:
+        storage.unpin(job_id)
+        raise
+
+
+async def _release_world_file(job_id: str, download: bool):
+    """Unpin a world once a file is sent; whole downloads may have built a compressed variant"""
+    storage.unpin(job_id)
+    if download:
+        await storage.refresh_world_bytes(job_id)
+
+
+def _build_world_chunks(job_id: str, world_path: Path):
+    """Split a saved world into chunk files (runs in a thread)"""
+    world = loads_json(world_path.read_bytes())
+    manifest, chunks = split_world(world)
+    manifest["job_id"] = job_id
+    
+    layout = (manifest["terrain"] or {}).get("tiles")
+    for entry in manifest["chunks"]:
+        if "tile" in entry:
+            tile_path = storage.terrain_tile_path(layout["key"], *entry["tile"], entry.get("lod", 0))
+            if tile_path.exists():
+                entry["bytes"] = tile_path.stat().st_size
+    storage.save_world_chunks(job_id, manifest, chunks)
+
+
+async def _world_manifest(job_id: str) -> Path:
+    """Get a world's chunk manifest, chunking the world on first use"""
+    world_path = await _completed_world(job_id)
+    manifest_path = storage.manifest_path(job_id)
+    try:
+        if (not manifest_path.exists()
+                or manifest_path.stat().st_mtime_ns < world_path.stat().st_mtime_ns):
+            await asyncio.to_thread(_build_world_chunks, job_id, world_path)
+    except FileNotFoundError:
+        # Evicted while the manifest was being built
+        raise HTTPException(status_code=404, detail="World file not found")
+    return manifest_path
+
+
+def _build_world_model(job_id: str, world_path: Path):
+    """Export a saved world as a Roblox binary model (runs in a thread)"""
+    world = loads_json(world_path.read_bytes())
+    storage.save_world_model(job_id, iter_rbxm(world))
+
+
+async def _world_model(job_id: str) -> Path:
+    """Get a world's .rbxm export, exporting the world on first use"""
+    world_path = await _completed_world(job_id)
+    model_path = storage.model_path(job_id)
+    try:
+        if (not model_path.exists()
+                or model_path.stat().st_mtime_ns < world_path.stat().st_mtime_ns):
+            await asyncio.to_thread(_build_world_model, job_id, world_path)
+    except FileNotFoundError:
+        # Evicted while the model was being exported
+        raise HTTPException(status_code=404, detail="World file not found")
+    return model_path
+
+
+@app.api_route("/api/download/{job_id}", methods=["GET", "HEAD"])
+async def download_world(job_id: str, request: Request):
+    """
+    Download the generated world file
     
-    return FileResponse(
-        file_path,
+    Streams a gzip (or zstd) variant when the client accepts one, and
+    supports ETag revalidation and Range requests for resuming.
+    """
+    world_path = await _completed_world(job_id)
+    return await _serve_world_file(
+        request,
+        job_id,
+        world_path,
+        download=True,
         media_type="application/json",
-        filename=f"world_{job_id}.rbxlx"
+        filename=f"world_{job_id}.json"
+    )
+
+
+@app.api_route("/api/download/{job_id}/rbxm", methods=["GET", "HEAD"])
+async def download_world_model(job_id: str, request: Request):
+    """
+    Download the world as a Roblox binary model (.rbxm)
+    
+    Studio inserts the file directly, with no plugin import: a folder of
+    anchored parts and models. Terrain is not included (the plugin's
+    import writes it). Exported on first request and kept with the world.
+    """
+    model_path = await _world_model(job_id)
+    return await _serve_world_file(
+        request,
+        job_id,
+        model_path,
+        download=True,
+        media_type="application/octet-stream",
+        filename=f"world_{job_id}.rbxm"
+    )
+
+
+@app.get("/api/download/{job_id}/manifest")
+async def download_manifest(job_id: str, request: Request):
+    """Get the spatial cells and ordered chunk list of a generated world"""
+    manifest_path = await _world_manifest(job_id)
+    return await _serve_world_file(request, job_id, manifest_path, download=True,
+                                   media_type="application/json")
+
+
+@app.api_route("/api/download/{job_id}/chunks/{index}", methods=["GET", "HEAD"])
+async def download_chunk(job_id: str, index: int, request: Request):
+    """Download one chunk of a generated world"""
+    manifest_path = await _world_manifest(job_id)
+    chunk_path = storage.chunk_path(job_id, index)
+    
+    if index >= 0 and not chunk_path.exists():
+        # Terrain chunks of tiled worlds live in the tile store and are
+        # regenerated on demand if they have been evicted
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="World file not found")
+        if index < len(manifest["chunks"]) and "tile" in manifest["chunks"][index]:
+            entry = manifest["chunks"][index]
+            row, col = entry["tile"]
+            chunk_path = await _terrain_tile(manifest["terrain"]["tiles"], row, col, entry.get("lod", 0))
+    if index < 0 or not chunk_path.exists():
+        raise HTTPException(status_code=404, detail="Chunk not found")
+    return await _serve_world_file(request, job_id, chunk_path, media_type="application/json")
+
+
+async def _batch_items(batch_id: str) -> List[Dict[str, Any]]:
+    """A batch's items, each with its job record (None once the job has expired)"""
+    batch = await storage.load_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    jobs = await asyncio.gather(*(job_store.get(item["job_id"]) for item in batch["items"]))
+    return [{**item, "index": index, "job": job} for index, (item, job) in enumerate(zip(batch["items"], jobs))]
+
+
+def _batch_item_status(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of one batch item"""
+    job = item["job"] or {}
+    status = job.get("status", "expired")
+    return {
+        "index": item["index"],
+        "job_id": item["job_id"],
+        "prompt": item["prompt"],
+        "seed": item["seed"],
+        "status": status,
+        "progress": job.get("progress", 0),
+        "error": job.get("error"),
+        "download_url": f"/api/download/{item['job_id']}" if status == COMPLETED else None
+    }
+
+
+@app.get("/api/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """
+    Get the aggregate status of a batch and of each of its worlds
+    
+    Progress is the mean over items, counting finished (and expired) items
+    as done. The batch is completed when every item is, failed when none
+    completed, and partial when items both completed and failed.
+    """
+    items = [_batch_item_status(item) for item in await _batch_items(batch_id)]
+    counts: Dict[str, int] = {}
+    for item in items:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    
+    if counts.get(QUEUED, 0) + counts.get(PROCESSING, 0) > 0:
+        status = QUEUED if counts.get(QUEUED, 0) == len(items) else PROCESSING
+    elif counts.get(COMPLETED, 0) == len(items):
+        status = COMPLETED
+    else:
+        status = FAILED if counts.get(COMPLETED, 0) == 0 else "partial"
+    progress = sum(
+        item["progress"] if item["status"] in (QUEUED, PROCESSING) else 100 for item in items
+    ) / len(items)
+    
+    return {
+        "batch_id": batch_id,
+        "status": status,
+        "progress": round(progress),
+        "total": len(items),
+        "counts": counts,
+        "items": items
+    }
+
+
+@app.get("/api/batch/{batch_id}/download")
+async def download_batch(batch_id: str):
+    """
+    Download a batch's completed worlds as one zip archive
+    
+    The archive is streamed as it is compressed and includes batch.json,
+    listing every item with its status; worlds that are not finished yet
+    are left out, so the archive can be fetched again later.
+    """
+    items = await _batch_items(batch_id)
+    members = []
+    for item in items:
+        job = item["job"] or {}
+        if job.get("status") == COMPLETED and job.get("file_path"):
+            members.append((item["job_id"], f"world_{item['job_id']}.json", Path(job["file_path"])))
+    if not members:
+        raise HTTPException(status_code=400, detail="No completed worlds in this batch yet")
+    
+    summary = json.dumps({
+        "batch_id": batch_id,
+        "items": [_batch_item_status(item) for item in items]
+    }, indent=2).encode()
+    for job_id, _, _ in members:
+        storage.pin(job_id)
+        await storage.touch_world(job_id, download=True)
+    
+    def release():
+        for job_id, _, _ in members:
+            storage.unpin(job_id)
+    
+    return StreamingResponse(
+        zip_stream([(name, path) for _, name, path in members], extra=[("batch.json", summary)]),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="batch_{batch_id}.zip"'},
+        background=BackgroundTask(release)
+    )
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Get hit/miss counters for the prompt-to-spec and world caches"""
+    return {
+        "spec_cache": spec_cache.stats(),
+        "world_cache": world_cache.stats()
+    }
+
+
+@app.get("/api/worlds")
+async def list_worlds(limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0)):
+    """List stored worlds, newest first, from the world index"""
+    worlds = await storage.list_worlds(limit, offset)
+    totals = await storage.world_totals()
+    
+    return {
+        "worlds": worlds,
+        "total": totals["worlds"],
+        "total_bytes": totals["bytes"]
+    }
+
+
+@app.get("/api/storage/stats")
+async def storage_stats():
+    """Get stored world totals and retention counters (evictions, bytes reclaimed)"""
+    return {
+        **await storage.world_totals(),
+        "retention": retention.stats()
+    }
+
+
+async def _collect_metrics():
+    """Refresh the metrics that mirror state kept elsewhere (store, caches, retention)"""
+    for status, count in (await job_store.counts()).items():
+        JOBS.labels(status=status).set(count)
+    
+    spec_stats = spec_cache.stats()
+    world_stats = world_cache.stats()
+    for cache, stats in (("spec", spec_stats), ("world", world_stats)):
+        for event, value in stats.items():
+            if event != "entries":
+                CACHE_EVENTS.labels(cache=cache, event=event).set(value)
+    # Spec lookups are answered from memory, disk or an in-flight request;
+    # only upstream calls recompute. World lookups recompute on a miss in
+    # both tiers.
+    lookups = spec_stats["hits"] + spec_stats["misses"]
+    CACHE_HIT_RATIO.labels(cache="spec").set(1 - spec_stats["upstream_calls"] / lookups if lookups else 0)
+    lookups = world_stats["hits"] + world_stats["misses"]
+    CACHE_HIT_RATIO.labels(cache="world").set(
+        (world_stats["hits"] + world_stats["disk_hits"]) / lookups if lookups else 0
     )
+    
+    retention_stats = retention.stats()
+    for reason, count in retention_stats["by_reason"].items():
+        RETENTION_EVICTED.labels(reason=reason).set(count)
+    RETENTION_RECLAIMED.labels().set(retention_stats["bytes_reclaimed"] + retention_stats["cache_bytes_reclaimed"])
+    totals = await storage.world_totals()
+    STORED_WORLDS.set(totals["worlds"])
+    STORED_BYTES.set(totals["bytes"])
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage timings, world sizes, cache hit rates, queue depth and retention"""
+    await _collect_metrics()
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/api/jobs")
 async def list_jobs(limit: int = 10):
     """List recent generation jobs"""
-    recent_jobs = sorted(
-        jobs.items(),
-        key=lambda x: x[1].get("created_at", ""),
-        reverse=True
-    )[:limit]
+    recent_jobs = await job_store.list_recent(limit)
     
     return {
         "jobs": [
             {
-                "job_id": job_id,
+                "job_id": job["job_id"],
                 "status": job["status"],
                 "progress": job.get("progress", 0),
                 "created_at": job.get("created_at"),
                 "prompt": job.get("request", {}).get("prompt", "")[:100]
             }
-            for job_id, job in recent_jobs
+            for job in recent_jobs
         ]
     }
 
 
+@app.get("/api/queue/stats")
+async def queue_stats():
+    """Get job counts per status"""
+    return await job_store.counts()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,45 @@
+"""
+Test setup - makes the backend modules importable however pytest is started
+"""
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+# Environment of an API under test: in-memory jobs, generation in threads,
+# no background sweeps and no reachable LLM unless a test provides one
+API_ENV = {
+    "OPENAI_API_KEY": "test",
+    "OPENAI_BASE_URL": "http://127.0.0.1:9/v1",
+    "LLM_MAX_RETRIES": "0",
+    "JOB_STORE_URL": "memory://",
+    "GENERATION_EXECUTOR": "thread",
+    "SPEC_CACHE_PERSIST": "false",
+    "RETENTION_ENABLED": "false"
+}
+
+
+@pytest.fixture
+def load_main(tmp_path, monkeypatch):
+    """
+    Import a fresh main module with its storage in tmp_path
+
+    Called with environment overrides; main reads its settings at import.
+    """
+    def load(**env: str):
+        monkeypatch.chdir(tmp_path)
+        for name, value in {**API_ENV, **env}.items():
+            monkeypatch.setenv(name, value)
+        # main registers its metrics on import; give each import a clean registry
+        from utils import metrics
+        monkeypatch.setattr(metrics.REGISTRY, "_metrics", {})
+        sys.modules.pop("main", None)
+        return importlib.import_module("main")
+
+    yield load
+    sys.modules.pop("main", None)
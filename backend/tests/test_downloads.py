@@ -0,0 +1,46 @@
+"""
+World downloads - concurrent first requests for a compressed variant all get it
+"""
+import asyncio
+import gzip
+
+import httpx
+
+from utils.serialization import loads_json
+
+REQUESTS = 8
+WORLD = {"version": "1.0", "metadata": {}, "workspace": {
+    "parts": [{"name": f"part_{i}", "position": {"x": i, "y": 0, "z": 0}} for i in range(20000)]
+}}
+
+
+def test_concurrent_first_gzip_downloads_all_succeed(load_main):
+    api = load_main(EMBEDDED_WORKER="false", WORLD_COMPRESSION="none")
+
+    async def scenario():
+        await api.startup()
+        try:
+            file_path = await api.storage.save_world("job", WORLD)
+            await api.job_store.create("job", {})
+            await api.job_store.claim("worker", 60)
+            await api.job_store.complete("job", "worker", file_path=file_path)
+
+            transport = httpx.ASGITransport(app=api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                # No variant exists yet: every request builds one
+                return await asyncio.gather(*(
+                    client.get("/api/download/job", headers={"Accept-Encoding": "gzip"})
+                    for _ in range(REQUESTS)
+                ))
+        finally:
+            await api.shutdown()
+
+    responses = asyncio.run(scenario())
+    assert [response.status_code for response in responses] == [200] * REQUESTS
+    # httpx decodes the gzip coding; the variant on disk must be gzip too
+    assert all(response.headers["content-encoding"] == "gzip" for response in responses)
+    assert len({response.content for response in responses}) == 1
+    assert loads_json(responses[0].content)["workspace"]["parts"][-1]["name"] == "part_19999"
+    variants = list(api.storage.worlds_path.glob("world_job.json.*"))
+    assert [variant.name for variant in variants] == ["world_job.json.gz"]
+    assert gzip.decompress(variants[0].read_bytes()) == responses[0].content
@@ -0,0 +1,127 @@
+"""
+Job stores - every backend hands each job to one worker and keeps its counts
+
+The Redis store runs against fakeredis, and is skipped where it is not installed.
+"""
+import asyncio
+import time
+
+import pytest
+
+from utils.job_store import (COMPLETED, FAILED, PROCESSING, QUEUED, MemoryJobStore,
+                             RedisJobStore, SQLiteJobStore)
+
+
+def _memory(tmp_path):
+    return MemoryJobStore()
+
+
+def _sqlite(tmp_path):
+    return SQLiteJobStore(str(tmp_path / "jobs.db"))
+
+
+def _redis(tmp_path):
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisJobStore(fakeredis.aioredis.FakeRedis())
+
+
+STORES = [_memory, _sqlite, _redis]
+
+
+@pytest.fixture(params=STORES, ids=lambda factory: factory.__name__.strip("_"))
+def make_store(request, tmp_path):
+    return lambda: request.param(tmp_path)
+
+
+def test_concurrent_claims_hand_out_each_job_once(make_store):
+    async def scenario():
+        store = make_store()
+        for i in range(20):
+            await store.create(f"job{i}", {"n": i})
+        claimed = await asyncio.gather(*(store.claim(f"worker{i}", 60) for i in range(30)))
+        counts = await store.counts()
+        await store.close()
+        return [job["job_id"] for job in claimed if job is not None], counts
+
+    job_ids, counts = asyncio.run(scenario())
+    assert sorted(job_ids) == sorted(f"job{i}" for i in range(20))
+    assert counts == {QUEUED: 0, PROCESSING: 20, COMPLETED: 0, FAILED: 0}
+
+
+def test_counts_follow_every_transition(make_store):
+    async def scenario():
+        store = make_store()
+        for i in range(4):
+            await store.create(f"job{i}", {}, max_attempts=1)
+        done = await store.claim("worker", 60)
+        broken = await store.claim("worker", 60)
+        await store.claim("worker", 0.0)
+        assert await store.complete(done["job_id"], "worker", file_path="world.json")
+        assert await store.fail(broken["job_id"], "boom", "worker") == FAILED
+        assert not await store.complete(broken["job_id"], "someone else")
+        time.sleep(0.01)
+        assert await store.requeue_expired() == 1
+        counts = await store.counts()
+        completed = await store.get(done["job_id"])
+        assert await store.expire_finished(0) == 3
+        after = await store.counts()
+        await store.close()
+        return counts, completed, after
+
+    counts, completed, after = asyncio.run(scenario())
+    assert counts == {QUEUED: 1, PROCESSING: 0, COMPLETED: 1, FAILED: 2}
+    assert completed["status"] == COMPLETED and completed["file_path"] == "world.json"
+    assert after == {QUEUED: 1, PROCESSING: 0, COMPLETED: 0, FAILED: 0}
+
+
+def test_failed_attempt_is_retried_until_attempts_run_out(make_store):
+    async def scenario():
+        store = make_store()
+        await store.create("job", {}, max_attempts=2)
+        statuses = []
+        for _ in range(2):
+            job = await store.claim("worker", 60)
+            statuses.append(await store.fail(job["job_id"], "boom", "worker"))
+        job = await store.get("job")
+        await store.close()
+        return statuses, job
+
+    statuses, job = asyncio.run(scenario())
+    assert statuses == [QUEUED, FAILED]
+    assert job["attempts"] == 2 and job["error"] == "boom"
+
+
+def test_only_the_current_lease_holder_renews(make_store):
+    async def scenario():
+        store = make_store()
+        await store.create("job", {}, max_attempts=3)
+        await store.claim("first", 0.0)
+        time.sleep(0.01)
+        assert await store.requeue_expired() == 1
+        await store.claim("second", 60)
+        renewed = (await store.extend_lease("job", "first", 60),
+                   await store.extend_lease("job", "second", 60))
+        await store.close()
+        return renewed
+
+    assert asyncio.run(scenario()) == (False, True)
+
+
+def test_update_does_not_recreate_a_deleted_job(make_store):
+    async def scenario():
+        store = make_store()
+        await store.create("job", {}, max_attempts=1)
+        job = await store.claim("worker", 60)
+        await store.complete(job["job_id"], "worker")
+        await store.expire_finished(0)
+        await store.update("job", progress=50)
+        missing = await store.get("job")
+        await store.update("never", progress=50)
+        never = await store.get("never")
+        counts = await store.counts()
+        await store.close()
+        return missing, never, counts
+
+    missing, never, counts = asyncio.run(scenario())
+    assert missing is None and never is None
+    assert counts == {QUEUED: 0, PROCESSING: 0, COMPLETED: 0, FAILED: 0}
@@ -0,0 +1,191 @@
+"""
+Part optimizer - merged blocks cover exactly the space of the blocks they replace, hidden parts go, and the pass is opt-in
+
+Occupancy is compared on a one-stud voxel grid: every test layout puts
+block faces on whole studs, so a block fills whole voxels.
+"""
+from typing import Any, Dict, List, Set, Tuple
+
+import numpy as np
+import pytest
+
+import core.part_optimizer as part_optimizer
+from core.part_optimizer import MAX_MESHED_BLOCKS, optimize_parts
+from core.terrain import SurfaceSampler
+from core.world_generator import WorldGenerator
+from utils.serialization import dumps_json
+
+SPEC = {
+    "terrain": {"type": "mountain", "height_variation": 0.5, "features": []},
+    "structures": [
+        {"type": "castle", "position": {"x": 0.5, "y": 0.0, "z": 0.5},
+         "size": {"width": 40, "height": 60, "depth": 40}, "style": "medieval"},
+        {"type": "house", "position": {"x": 0.2, "y": 0.0, "z": 0.7},
+         "size": {"width": 16, "height": 20, "depth": 16}, "style": "medieval"}
+    ],
+    "objects": [{"type": "tree", "count": 20, "position": {"x": 0.5, "y": 0.0, "z": 0.5}, "spread": 0.4}],
+    "atmosphere": {"lighting": "bright", "weather": "clear", "color_scheme": ["#87CEEB"]},
+    "theme": "test"
+}
+
+
+def _block(low: Tuple[int, int, int], size: Tuple[int, int, int], material: str = "Brick") -> Dict[str, Any]:
+    return {
+        "shape": "block",
+        "size": dict(zip("xyz", map(float, size))),
+        "position": {axis: low[a] + size[a] / 2 for a, axis in enumerate("xyz")},
+        "material": material,
+        "color": [180, 180, 180]
+    }
+
+
+def _voxels(parts: List[Dict[str, Any]]) -> Dict[str, Set[Tuple[int, int, int]]]:
+    """One-stud cells filled by each material's unrotated blocks, and by all of them ("all")"""
+    filled: Dict[str, Set[Tuple[int, int, int]]] = {}
+    for part in parts:
+        assert not part.get("rotation")
+        low = [round(part["position"][axis] - part["size"][axis] / 2) for axis in "xyz"]
+        high = [round(part["position"][axis] + part["size"][axis] / 2) for axis in "xyz"]
+        cells = {(x, y, z) for x in range(low[0], high[0])
+                 for y in range(low[1], high[1]) for z in range(low[2], high[2])}
+        filled.setdefault(part["material"], set()).update(cells)
+        filled.setdefault("all", set()).update(cells)
+    return filled
+
+
+def _check_same_space(optimized: List[Dict[str, Any]], parts: List[Dict[str, Any]]):
+    """
+    The optimized blocks fill exactly the space the input blocks did
+
+    Blocks hidden inside a block of another material give up their cells
+    to it, so each material may only lose cells.
+    """
+    after, before = _voxels(optimized), _voxels(parts)
+    assert after["all"] == before["all"]
+    for material, cells in after.items():
+        assert cells <= before[material]
+
+
+def _random_layout(rng: np.random.Generator, extent: int, larger: int) -> List[Dict[str, Any]]:
+    """
+    Unit blocks in most cells of a cube, and some larger blocks over them,
+    of two materials at random
+    """
+    materials = ["Brick", "Slate"]
+    parts = [_block(tuple(cell), (1, 1, 1), materials[rng.random() < 0.2])
+             for cell in np.argwhere(rng.random((extent,) * 3) < 0.6)]
+    parts += [_block(tuple(rng.integers(0, extent, 3)), tuple(rng.integers(1, 4, 3)), materials[rng.random() < 0.2])
+              for _ in range(larger)]
+    return parts
+
+
+@pytest.fixture
+def merge_paths(monkeypatch):
+    """Counts calls of the two merge strategies"""
+    calls = {"_mesh": 0, "_merge_runs": 0}
+    for name in calls:
+        original = getattr(part_optimizer, name)
+
+        def counted(low, high, name=name, original=original):
+            calls[name] += 1
+            return original(low, high)
+
+        monkeypatch.setattr(part_optimizer, name, counted)
+    return calls
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_meshed_groups_fill_the_same_space(seed, merge_paths):
+    parts = _random_layout(np.random.default_rng(seed), 4, 6)
+    optimized, counts = optimize_parts(parts)
+    assert merge_paths["_mesh"] and not merge_paths["_merge_runs"]
+    assert counts["merged"] > 0
+    assert len(optimized) == len(parts) - counts["merged"] - counts["hidden"]
+    _check_same_space(optimized, parts)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_merged_runs_fill_the_same_space(seed, merge_paths):
+    parts = _random_layout(np.random.default_rng(seed), 12, 40)
+    optimized, counts = optimize_parts(parts)
+    assert merge_paths["_merge_runs"]
+    assert counts["merged"] > MAX_MESHED_BLOCKS
+    assert len(optimized) == len(parts) - counts["merged"] - counts["hidden"]
+    _check_same_space(optimized, parts)
+
+
+def test_positions_stay_relative_to_the_model():
+    parts = [_block((0, 0, 0), (2, 1, 1)), _block((2, 0, 0), (2, 1, 1))]
+    optimized, counts = optimize_parts(parts, origin=(100.0, 20.0, -50.0))
+    assert counts == {"hidden": 0, "merged": 1}
+    assert optimized == [{**parts[0], "size": {"x": 4.0, "y": 1.0, "z": 1.0},
+                          "position": {"x": 2.0, "y": 0.5, "z": 0.5}}]
+
+
+def test_parts_inside_a_block_are_dropped():
+    room = _block((0, 0, 0), (16, 16, 16), "Concrete")
+    inside = [
+        _block((2, 2, 2), (2, 2, 2), "Wood"),
+        {**_block((4, 4, 4), (2, 4, 2), "Wood"), "rotation": {"x": 0, "y": 35, "z": 0}},
+        {**_block((8, 0, 8), (3, 3, 3), "Glass"), "shape": "ball"},
+        _block((0, 0, 0), (16, 16, 16), "Concrete")
+    ]
+    outside = [
+        _block((15, 2, 2), (2, 2, 2), "Wood"),
+        {**_block((12, 12, 12), (4, 4, 4), "Wood"), "rotation": {"x": 45, "y": 0, "z": 0}}
+    ]
+    optimized, counts = optimize_parts([room] + inside + outside)
+    assert counts == {"hidden": len(inside), "merged": 0}
+    assert optimized == [room] + outside
+
+
+def test_balls_hide_nothing():
+    ball = {**_block((0, 0, 0), (16, 16, 16)), "shape": "ball"}
+    inside = _block((6, 6, 6), (2, 2, 2), "Wood")
+    assert optimize_parts([ball, inside]) == ([ball, inside], {"hidden": 0, "merged": 0})
+
+
+def test_parts_under_the_ground_are_dropped():
+    # 64-stud world at 10 studs high, with a pit down to 0 around the middle
+    heights = np.full((16, 16), 10.0)
+    heights[6:10, 6:10] = 0.0
+    surface = SurfaceSampler(heights, 64)
+    buried = _block((-28, 2, -28), (4, 4, 4), "Rock")
+    poking_out = _block((-20, 6, -28), (4, 4, 4), "Rock")
+    in_the_pit = _block((-2, 2, -2), (4, 4, 4), "Rock")
+    partly_over_the_pit = _block((-12, 2, -2), (8, 4, 4), "Wood")
+    parts = [buried, poking_out, in_the_pit, partly_over_the_pit]
+    optimized, counts = optimize_parts(parts, surface=surface)
+    assert counts == {"hidden": 1, "merged": 0}
+    assert optimized == [poking_out, in_the_pit, partly_over_the_pit]
+    # Without a surface, nothing is buried
+    assert optimize_parts(parts) == (parts, {"hidden": 0, "merged": 0})
+
+
+@pytest.mark.parametrize("object_output", ["parts", "instanced"])
+def test_conversion_is_unchanged_without_the_flag(object_output, monkeypatch):
+    generator = WorldGenerator(object_output=object_output, terrain_voxels=False)
+    world_data = generator.generate_sync(SPEC, {"size": 256, "seed": 5})
+    # A wall of unit blocks high above the terrain, which the pass merges into one
+    world_data["structures"].append({
+        "type": "wall", "position": {"x": 10, "y": 500, "z": 10},
+        "parts": [_block((x, y, 0), (1, 1, 1)) for x in range(8) for y in range(4)]
+    })
+    expected = generator.to_roblox_format_sync(world_data)
+    expected["metadata"]["generated_at"] = "now"
+    expected_json = dumps_json(expected)
+
+    optimized = generator.to_roblox_format_sync(world_data, optimize_parts=True)
+    stats = optimized["metadata"]["optimization"]
+    assert stats["merged"] >= 31
+    # Optimizing left the structures' parts, shared with earlier conversions, alone
+    assert dumps_json(expected) == expected_json
+
+    def fail(*args, **kwargs):
+        raise AssertionError("optimize_world ran with the flag off")
+
+    monkeypatch.setattr("core.world_generator.optimize_world", fail)
+    plain = generator.to_roblox_format_sync(world_data, optimize_parts=False)
+    assert "optimization" not in plain["metadata"]
+    plain["metadata"]["generated_at"] = "now"
+    assert dumps_json(plain) == expected_json
@@ -0,0 +1,91 @@
+"""
+Roblox model export - .rbxm files read back by a reference reader match the plugin's JSON import
+
+The reader (benchmarks.rbxm_reader) is written from the binary file
+format description and shares no code with core.rbxm. Every part must
+come back with the name, parent, size, CFrame, material and color the
+plugin's JSON import gives it, and every model with its first part as
+PrimaryPart.
+"""
+from typing import Any, Dict
+
+import numpy as np
+import pytest
+
+from benchmarks.rbxm_reader import check_round_trip, read_rbxm, rotated_model
+from core.rbxm import iter_rbxm
+from core.world_generator import WorldGenerator
+from core.world_model import ObjectParts
+from utils.serialization import dumps_json, loads_json
+
+SPEC = {
+    "terrain": {"type": "forest", "height_variation": 0.4, "features": []},
+    "structures": [
+        {"type": "castle", "position": {"x": 0.5, "y": 0.0, "z": 0.5},
+         "size": {"width": 40, "height": 60, "depth": 40}, "style": "medieval"},
+        {"type": "house", "position": {"x": 0.2, "y": 0.0, "z": 0.7},
+         "size": {"width": 16, "height": 20, "depth": 16}, "style": "medieval"}
+    ],
+    "objects": [{"type": obj_type, "count": 30, "position": {"x": 0.5, "y": 0.0, "z": 0.5}, "spread": 0.4}
+                for obj_type in ("tree", "rock", "decoration")],
+    "atmosphere": {"lighting": "bright", "weather": "clear", "color_scheme": ["#87CEEB"]},
+    "theme": "test"
+}
+
+
+def _world(object_output: str) -> Dict[str, Any]:
+    """A generated world with structures, objects, a rotated model and an empty one"""
+    generator = WorldGenerator(object_output=object_output, terrain_voxels=False)
+    world = generator.to_roblox_format_sync(generator.generate_sync(SPEC, {"size": 256, "seed": 3}))
+    world["workspace"]["models"].append(rotated_model(np.random.default_rng(1), 30))
+    world["workspace"]["models"].append({"name": "empty", "parts": [], "position": {"x": 0, "y": 0, "z": 0}})
+    return world
+
+
+def _export(world: Dict[str, Any]) -> bytes:
+    return b"".join(iter_rbxm(world))
+
+
+def test_object_parts_view_round_trips():
+    world = _world("parts")
+    assert isinstance(world["workspace"]["parts"], ObjectParts)
+    assert len(world["workspace"]["parts"]) > 0
+    data = _export(world)
+    loaded = loads_json(dumps_json(world))
+    check_round_trip(loaded, data)
+    # The view exports exactly what the saved (and reloaded) world does
+    assert _export(loaded) == data
+
+
+@pytest.mark.parametrize("object_output", ["instanced", "parts"])
+def test_json_loaded_world_round_trips(object_output):
+    loaded = loads_json(dumps_json(_world(object_output)))
+    if object_output == "instanced":
+        assert loaded["workspace"]["instances"]["groups"]
+    check_round_trip(loaded, _export(loaded))
+
+
+def test_models_get_their_first_part_as_primary_part():
+    part = {"size": {"x": 2, "y": 2, "z": 2}, "position": {"x": 0, "y": 1, "z": 0}}
+    world = {"workspace": {"parts": [part], "models": [
+        {"name": "tower", "parts": [{**part, "name": "base"}, {**part, "name": "top"}],
+         "position": {"x": 5, "y": 0, "z": 5}},
+        {"name": "empty", "parts": [], "position": {"x": 0, "y": 0, "z": 0}},
+        {"name": "shed", "parts": [{**part, "name": "wall"}], "position": {"x": -5, "y": 0, "z": 0}}
+    ]}}
+    data = _export(world)
+    check_round_trip(world, data)
+
+    instances = read_rbxm(data)
+    by_name = {inst["properties"]["Name"]: ref for ref, inst in instances.items()}
+    primaries = {inst["properties"]["Name"]: inst["properties"]["PrimaryPart"]
+                 for inst in instances.values() if inst["class"] == "Model"}
+    assert primaries == {"tower": by_name["base"], "empty": -1, "shed": by_name["wall"]}
+
+
+def test_mismatch_fails_the_check():
+    world = loads_json(dumps_json(_world("parts")))
+    data = _export(world)
+    world["workspace"]["models"][0]["parts"][0]["color"] = [1, 2, 3]
+    with pytest.raises(AssertionError, match="color"):
+        check_round_trip(world, data)
@@ -0,0 +1,92 @@
+"""
+Retention - sweeps count every file a world owns and hold the caches to the same limits
+"""
+import asyncio
+import os
+import time
+
+from core.retention import RetentionSweeper
+from utils.storage import StorageManager
+
+WORLD = {"version": "1.0", "metadata": {}, "workspace": {"parts": [{"Name": "Part"}] * 200}}
+OLD = time.time() - 7200
+
+
+def _age(path, mtime=OLD):
+    for child in [path, *(path.rglob("*") if path.is_dir() else [])]:
+        os.utime(child, (mtime, mtime))
+
+
+def test_index_counts_every_file_of_a_world(tmp_path):
+    async def scenario():
+        storage = StorageManager(str(tmp_path), world_format="compact", compression="gzip")
+        await storage.save_world("a", WORLD)
+        saved = storage.index.get("a")["bytes"]
+        storage.save_world_model("a", [b"x" * 5000])
+        storage.save_world_chunks("a", {"chunks": [{}]}, [{"index": 0, "data": "y" * 3000}])
+        grown = storage.index.get("a")["bytes"]
+        freed = await storage.evict_world("a")
+        storage.close()
+        return saved, grown, freed
+
+    saved, grown, freed = asyncio.run(scenario())
+    assert saved > 0
+    assert grown >= saved + 5000 + 3000
+    assert freed == grown
+
+
+def test_byte_limit_covers_models_and_chunks(tmp_path):
+    async def scenario():
+        storage = StorageManager(str(tmp_path), world_format="compact")
+        for job_id in ("old", "new"):
+            await storage.save_world(job_id, WORLD)
+        world_bytes = storage.index.get("old")["bytes"]
+        # The model alone pushes the total over a limit the two JSON files fit in
+        storage.save_world_model("old", [b"x" * 10 * world_bytes])
+        storage.index.touch("new")
+        sweeper = RetentionSweeper(storage, max_age=0, max_bytes=3 * world_bytes, grace=0,
+                                   cache_max_bytes=0)
+        result = await sweeper.sweep()
+        left = [entry["job_id"] for entry in storage.index.entries()]
+        storage.close()
+        return result, left
+
+    result, left = asyncio.run(scenario())
+    assert result["evicted"] == 1
+    assert left == ["new"]
+    assert not (tmp_path / "worlds" / "world_old.rbxm").exists()
+
+
+def test_sweep_trims_cache_tiers_and_batches(tmp_path):
+    async def scenario():
+        storage = StorageManager(str(tmp_path))
+        await storage.save_cached_world("stale", WORLD)
+        await storage.save_cached_world("fresh", WORLD)
+        await storage.save_cached_spec("stale", {"spec": {}})
+        storage.save_terrain_tile("stale", 0, 0, {"heights": [0] * 100})
+        storage.save_terrain_tile("fresh", 0, 0, {"heights": [0] * 100})
+        await storage.save_batch("stale", {"items": []})
+        await storage.save_batch("fresh", {"items": []})
+        for path in (storage.cache_root / "worlds" / "stale.json", storage.cache_root / "specs" / "stale.json",
+                     storage.cache_root / "tiles" / "stale", storage.batches_path / "stale.json"):
+            _age(path)
+
+        sweeper = RetentionSweeper(storage, max_age=3600, max_bytes=0, grace=0)
+        result = await sweeper.sweep()
+        left = {tier: sorted(os.listdir(storage.cache_root / tier)) for tier in ("worlds", "specs", "tiles")}
+        left["batches"] = sorted(os.listdir(storage.batches_path))
+
+        # A byte limit shared by the tiers drops the least recently used entry
+        world_bytes = (storage.cache_root / "worlds" / "fresh.json").stat().st_size
+        _age(storage.cache_root / "tiles" / "fresh")
+        sized = RetentionSweeper(storage, max_age=0, max_bytes=0, grace=0, cache_max_bytes=world_bytes)
+        trimmed = await sized.sweep()
+        tiles = os.listdir(storage.cache_root / "tiles")
+        storage.close()
+        return result, sweeper.stats(), left, trimmed, tiles
+
+    result, stats, left, trimmed, tiles = asyncio.run(scenario())
+    assert result["cache_evicted"] == 3 and result["batches_expired"] == 1
+    assert stats["cache_bytes_reclaimed"] == result["cache_bytes_reclaimed"] > 0
+    assert left == {"worlds": ["fresh.json"], "specs": [], "tiles": ["fresh"], "batches": ["fresh.json"]}
+    assert trimmed["cache_evicted"] == 1 and tiles == []
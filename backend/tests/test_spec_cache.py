@@ -0,0 +1,57 @@
+"""
+Spec cache - coalesced lookups survive the computing caller going away
+"""
+import asyncio
+
+import pytest
+
+from core.spec_cache import SpecCache
+
+SPEC = {"terrain": {"type": "plains"}, "theme": "test"}
+
+
+def test_waiter_computes_the_spec_when_the_leader_is_cancelled():
+    async def scenario():
+        cache = SpecCache()
+        started = asyncio.Event()
+        calls = []
+
+        async def compute():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                started.set()
+                await asyncio.sleep(3600)
+            return SPEC
+
+        leader = asyncio.create_task(cache.get_or_compute("a castle", {}, compute))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_compute("A castle!", {}, compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        spec = await asyncio.wait_for(waiter, 5)
+        return spec, calls, cache.stats()
+
+    spec, calls, stats = asyncio.run(scenario())
+    assert spec == SPEC
+    assert len(calls) == 2
+    assert stats["coalesced"] == 1 and stats["upstream_calls"] == 2
+
+
+def test_compute_errors_reach_every_waiter():
+    async def scenario():
+        cache = SpecCache()
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            raise ValueError("upstream down")
+
+        tasks = [asyncio.create_task(cache.get_or_compute("a castle", {}, compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
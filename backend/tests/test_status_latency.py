@@ -0,0 +1,150 @@
+"""
+Status latency - /api/status stays fast while jobs wait on a slow LLM
+
+A local stub of the OpenAI chat completions API holds every request for
+LLM_DELAY seconds. JOBS generations are queued through the API and
+/api/status is polled while their LLM calls are in flight; every poll
+must come back well within the delay, and the calls must overlap.
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+JOBS = 4
+LLM_DELAY = 1.5
+# A status poll stuck behind one LLM round trip would take LLM_DELAY
+MAX_STATUS_SECONDS = 0.25
+
+STUB_SPEC = {
+    "terrain": {"type": "plains", "height_variation": 0.2, "features": []},
+    "structures": [],
+    "objects": [],
+    "atmosphere": {"lighting": "bright", "weather": "clear", "color_scheme": ["#87CEEB"]},
+    "theme": "stub"
+}
+
+
+class SlowCompletions(ThreadingHTTPServer):
+    """Chat completions stub that answers every request after a delay"""
+
+    daemon_threads = True
+
+    def __init__(self, delay: float):
+        super().__init__(("127.0.0.1", 0), _CompletionsHandler)
+        self.delay = delay
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class _CompletionsHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server._lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay)
+        finally:
+            with server._lock:
+                server.in_flight -= 1
+
+        body = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(STUB_SPEC)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def completions():
+    server = SlowCompletions(LLM_DELAY)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def api(completions, load_main):
+    """A fresh main module talking to the stub"""
+    return load_main(
+        OPENAI_BASE_URL=completions.base_url,
+        LLM_MAX_CONCURRENCY=str(JOBS),
+        LLM_TIMEOUT="10",
+        JOB_CONCURRENCY=str(JOBS)
+    )
+
+
+def test_status_stays_fast_while_llm_calls_are_in_flight(api, completions):
+    async def scenario():
+        await api.startup()
+        try:
+            transport = httpx.ASGITransport(app=api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                job_ids = []
+                for i in range(JOBS):
+                    response = await client.post("/api/generate", json={
+                        "prompt": f"flat meadow number {i}", "world_size": 128
+                    })
+                    assert response.status_code == 200
+                    job_ids.append(response.json()["job_id"])
+
+                latencies = []
+                statuses = {}
+                deadline = time.monotonic() + LLM_DELAY * JOBS + 30
+                while time.monotonic() < deadline:
+                    for job_id in job_ids:
+                        start = time.perf_counter()
+                        response = await client.get(f"/api/status/{job_id}")
+                        elapsed = time.perf_counter() - start
+                        assert response.status_code == 200
+                        statuses[job_id] = response.json()["status"]
+                        if completions.in_flight:
+                            latencies.append(elapsed)
+                    if all(status in ("completed", "failed") for status in statuses.values()):
+                        break
+                    await asyncio.sleep(0.05)
+                return statuses, latencies
+        finally:
+            await api.shutdown()
+
+    started = time.perf_counter()
+    statuses, latencies = asyncio.run(scenario())
+    elapsed = time.perf_counter() - started
+
+    assert set(statuses.values()) == {"completed"}
+    assert completions.requests == JOBS
+    # The LLM waits overlapped instead of running one after another
+    assert completions.max_in_flight > 1
+    assert elapsed < LLM_DELAY * JOBS
+    assert latencies, "no status polls landed while LLM calls were in flight"
+    assert max(latencies) < MAX_STATUS_SECONDS, f"slowest status poll took {max(latencies):.3f}s"
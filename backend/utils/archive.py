@@ -0,0 +1,71 @@
+"""
+Archive - streams several stored files as one zip without staging it on disk
+"""
+import io
+import zipfile
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+from utils.http_files import STREAM_CHUNK_SIZE
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, unseekable buffer that zipfile writes into and the stream drains"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def zip_stream(members: List[Tuple[str, Path]], extra: List[Tuple[str, bytes]] = (),
+               compresslevel: int = 6) -> Iterator[bytes]:
+    """
+    Yield a deflated zip of files, one block at a time
+
+    The zip is written with data descriptors (the output is not seekable),
+    so memory stays at one block per member whatever the archive size.
+    Iterate it from a thread; StreamingResponse does this for plain
+    iterators.
+
+    Args:
+        members: (name in archive, file) pairs; files that no longer
+            exist are left out
+        extra: (name, contents) pairs of small in-memory members, written first
+        compresslevel: zlib level
+
+    Yields:
+        Consecutive pieces of the archive
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED,
+                         compresslevel=compresslevel) as archive:
+        for name, data in extra:
+            archive.writestr(name, data)
+
+        for name, path in members:
+            try:
+                source = open(path, "rb")
+            except FileNotFoundError:
+                continue
+            with source, archive.open(name, "w", force_zip64=True) as target:
+                while True:
+                    block = source.read(STREAM_CHUNK_SIZE)
+                    if not block:
+                        break
+                    target.write(block)
+                    data = sink.drain()
+                    if data:
+                        yield data
+    # Remaining deflate output, descriptors and the central directory
+    yield sink.drain()
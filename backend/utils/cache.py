@@ -0,0 +1,168 @@
+"""
+Caching helpers - content-addressed keys and an in-memory LRU with a disk tier
+"""
+import copy
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def cache_key(*parts: Any) -> str:
+    """
+    Build a content-addressed key from JSON-serializable parts
+
+    Dict ordering and whitespace do not affect the key, so equal specs
+    always hash the same.
+    """
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Bounded in-memory mapping that evicts the least recently used entry
+
+    With `ttl` set (seconds), entries also expire that long after they
+    were stored.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a value and mark it most recently used"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        """Store a value, evicting the oldest entries beyond `max_entries`"""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: str) -> Optional[Any]:
+        """Remove and return a value"""
+        entry = self._entries.pop(key, None)
+        return entry[0] if entry is not None else None
+
+    def clear(self):
+        """Remove every entry"""
+        self._entries.clear()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Get hit/miss/eviction counters"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+class WorldCache:
+    """
+    Cache of finished Roblox-format worlds keyed on (spec, options, seed)
+
+    Lookups try memory first, then the disk tier kept by StorageManager;
+    disk hits are promoted back into memory. The disk tier is bounded by
+    entry count and total bytes, least recently used files going first.
+    """
+
+    # Bump when the Roblox world format changes, so worlds cached by older
+    # code are never served
+    FORMAT_VERSION = 1
+
+    def __init__(self, storage, max_entries: int = 16, output: Optional[Dict[str, Any]] = None,
+                 disk_max_entries: Optional[int] = None, disk_max_bytes: Optional[int] = None):
+        """
+        Args:
+            storage: StorageManager holding the disk tier
+            max_entries: Worlds kept in memory
+            output: Generator settings that change the output
+                (WorldGenerator.output_settings), made part of every key
+            disk_max_entries: Worlds kept on disk; defaults to
+                WORLD_CACHE_DISK_ENTRIES, then 256 (0 disables)
+            disk_max_bytes: Total bytes kept on disk; defaults to
+                WORLD_CACHE_DISK_BYTES, then 2 GiB (0 disables)
+        """
+        self.storage = storage
+        self.memory = LRUCache(max_entries)
+        self.output = output or {}
+        self.disk_max_entries = disk_max_entries if disk_max_entries is not None else int(
+            os.getenv("WORLD_CACHE_DISK_ENTRIES", "256")
+        )
+        self.disk_max_bytes = disk_max_bytes if disk_max_bytes is not None else int(
+            os.getenv("WORLD_CACHE_DISK_BYTES", str(2 * 1024 ** 3))
+        )
+        self.disk_hits = 0
+        self.disk_evictions = 0
+
+    def key_for(self, spec: Dict[str, Any], options: Dict[str, Any], seed: int) -> str:
+        """Get the cache key for a generation"""
+        return cache_key("world", self.FORMAT_VERSION, self.output, spec, options, seed)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached world
+
+        Returns a copy with its own metadata dict, so callers may stamp
+        job-specific metadata without touching the cached entry.
+        """
+        world = self.memory.get(key)
+        if world is None:
+            world = await self.storage.load_cached_world(key)
+            if world is None:
+                return None
+            self.disk_hits += 1
+            self.memory.set(key, world)
+        return _with_own_metadata(world)
+
+    async def put(self, key: str, world: Dict[str, Any]):
+        """Store a finished world in both tiers, trimming the disk tier to its limits"""
+        world = _with_own_metadata(world)
+        self.memory.set(key, world)
+        await self.storage.save_cached_world(key, world)
+        if self.disk_max_entries > 0 or self.disk_max_bytes > 0:
+            removed, _ = await self.storage.trim_cache(
+                "worlds", max_entries=self.disk_max_entries, max_bytes=self.disk_max_bytes
+            )
+            self.disk_evictions += removed
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache counters"""
+        return {**self.memory.stats(), "disk_hits": self.disk_hits, "disk_evictions": self.disk_evictions}
+
+
+def _with_own_metadata(world: Dict[str, Any]) -> Dict[str, Any]:
+    """Shallow-copy a world, giving it a private metadata dict"""
+    return {**world, "metadata": copy.copy(world.get("metadata", {}))}
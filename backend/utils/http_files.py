@@ -0,0 +1,240 @@
+"""
+File responses with content negotiation - precompressed variants, ETags and byte ranges
+"""
+import asyncio
+import gzip
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is always available
+    zstandard = None
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Preferred first; zstd only when the zstandard package is installed
+ENCODING_SUFFIXES: Dict[str, str] = {"zstd": ".zst", "gzip": ".gz"}
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def available_encodings() -> List[str]:
+    """Content codings this server can produce, preferred first"""
+    return [e for e in ENCODING_SUFFIXES if e != "zstd" or zstandard is not None]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the content coding for a response
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header
+
+    Returns:
+        "zstd", "gzip", or None for the identity coding
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        match = re.search(r"q=([\d.]+)", params)
+        if match:
+            quality = float(match.group(1))
+        accepted[name.strip().lower()] = quality
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compress_file(source: Path, target: Path, encoding: str):
+    """Write a compressed copy of a file (temp file + rename)"""
+    # A unique temp name per writer: concurrent first downloads of one file
+    # each build their own copy, and the last rename wins
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=target.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as dst, open(source, "rb") as src:
+            if encoding == "gzip":
+                # mtime=0 keeps the bytes (and so the ETag) stable across rebuilds
+                with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=6, mtime=0) as out:
+                    while block := src.read(STREAM_CHUNK_SIZE):
+                        out.write(block)
+            else:
+                zstandard.ZstdCompressor(level=6).copy_stream(src, dst)
+        os.replace(tmp_name, target)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+async def precompressed_variant(path: Path, encoding: str) -> Path:
+    """
+    Get the compressed variant of a file, creating it on first use
+
+    The variant is rebuilt whenever the source file is newer. Compression
+    runs in a thread so large worlds do not stall the event loop.
+    """
+    variant = path.with_name(path.name + ENCODING_SUFFIXES[encoding])
+    try:
+        if variant.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            return variant
+    except FileNotFoundError:
+        pass
+    await asyncio.to_thread(compress_file, path, variant, encoding)
+    return variant
+
+
+def make_etag(stat: os.stat_result, encoding: Optional[str]) -> str:
+    """Strong ETag for one representation of a file"""
+    tag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header
+
+    Returns:
+        Inclusive (start, end) byte offsets, or None when the header is not
+        a single byte range (the full body is sent instead)
+
+    Raises:
+        ValueError: If the range cannot be satisfied
+    """
+    match = _RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+async def _stream(f: BinaryIO, start: int, length: int) -> AsyncIterator[bytes]:
+    """Yield `length` bytes of an open file from `start`, one block at a time, then close it"""
+    with f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            block = await asyncio.to_thread(f.read, min(STREAM_CHUNK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+async def serve_file(
+    request: Request,
+    path: Path,
+    media_type: str,
+    filename: Optional[str] = None,
+    compress: bool = True,
+    background: Optional[BackgroundTask] = None
+) -> Response:
+    """
+    Stream a file, honouring Accept-Encoding, conditional requests and Range
+
+    Args:
+        request: Incoming request (its headers drive negotiation)
+        path: File to send
+        media_type: Content-Type of the uncompressed file
+        filename: Suggested download name (sets Content-Disposition)
+        compress: Offer precompressed variants
+        background: Task to run once the response has been sent
+
+    Returns:
+        200 with the full body, 206 with a byte range, 304 when the
+        client's copy is current, or 416 for an unsatisfiable range
+
+    Raises:
+        FileNotFoundError: If the file is gone. Once this returns, the body
+            is read from a handle opened here, so deleting the file no
+            longer affects the response.
+    """
+    encoding = negotiate_encoding(request.headers.get("accept-encoding")) if compress else None
+    body_path = await precompressed_variant(path, encoding) if encoding else path
+    body = open(body_path, "rb")
+    try:
+        return _file_response(request, body, encoding, media_type, filename, background)
+    except BaseException:
+        body.close()
+        raise
+
+
+def _file_response(
+    request: Request,
+    body: BinaryIO,
+    encoding: Optional[str],
+    media_type: str,
+    filename: Optional[str],
+    background: Optional[BackgroundTask]
+) -> Response:
+    """Build the response for an open file (see `serve_file`); takes ownership of `body`"""
+    stat = os.fstat(body.fileno())
+    etag = make_etag(stat, encoding)
+
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache"
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        body.close()
+        return Response(status_code=304, headers=headers, background=background)
+
+    size = stat.st_size
+    byte_range = None
+    range_header = request.headers.get("range")
+    # If-Range: only honour the range while the client's copy is still current
+    if range_header and request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{size}"
+            body.close()
+            return Response(status_code=416, headers=headers, background=background)
+
+    start, end = byte_range if byte_range else (0, size - 1)
+    length = max(0, end - start + 1)
+    headers["Content-Length"] = str(length)
+    status_code = 200
+    if byte_range:
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    if request.method == "HEAD":
+        body.close()
+        return Response(status_code=status_code, headers=headers, media_type=media_type,
+                        background=background)
+    return StreamingResponse(
+        _stream(body, start, length),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+        background=background
+    )
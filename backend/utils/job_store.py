@@ -0,0 +1,672 @@
+"""
+Job store - durable job records and a work queue shared by API and worker processes
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlparse
+
+QUEUED = "queued"
+PROCESSING = "processing"
+COMPLETED = "completed"
+FAILED = "failed"
+FINISHED_STATUSES = (COMPLETED, FAILED)
+
+
+class JobStore:
+    """
+    Interface shared by every job store backend
+
+    A job is a JSON-serializable record (status, progress, request, ...)
+    plus queue bookkeeping: attempts, a lease held by the worker that
+    claimed it, and the time it becomes claimable. `claim` hands each
+    queued job to exactly one worker; a worker that stops renewing its
+    lease (crash, hang) loses the job back to the queue once the
+    visibility timeout passes, until `max_attempts` is used up.
+    """
+
+    async def create(self, job_id: str, record: Dict[str, Any], max_attempts: int = 3):
+        """Store a new job and queue it"""
+        raise NotImplementedError
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job record (including status and attempts), or None"""
+        raise NotImplementedError
+
+    async def update(self, job_id: str, **fields: Any):
+        """Merge fields into a job record; None removes a field"""
+        raise NotImplementedError
+
+    async def list_recent(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get the most recently created jobs, newest first, each with its job_id"""
+        raise NotImplementedError
+
+    async def claim(self, worker_id: str, visibility_timeout: float) -> Optional[Dict[str, Any]]:
+        """Take the next claimable job, leasing it to `worker_id`; None if the queue is empty"""
+        raise NotImplementedError
+
+    async def extend_lease(self, job_id: str, worker_id: str, visibility_timeout: float) -> bool:
+        """Renew a lease; False if the worker no longer holds it"""
+        raise NotImplementedError
+
+    async def complete(self, job_id: str, worker_id: Optional[str] = None, **fields: Any) -> bool:
+        """Mark a job completed; with `worker_id`, only if that worker still holds the lease"""
+        raise NotImplementedError
+
+    async def fail(self, job_id: str, error: str, worker_id: Optional[str] = None,
+                   retry_delay: float = 0.0) -> Optional[str]:
+        """
+        Record a failed attempt
+
+        Returns:
+            The job's new status: QUEUED if attempts remain (claimable again
+            after `retry_delay` seconds), FAILED otherwise, or None if
+            `worker_id` no longer holds the lease
+        """
+        raise NotImplementedError
+
+    async def requeue_expired(self) -> int:
+        """Return jobs with lapsed leases to the queue (or fail them if out of attempts)"""
+        raise NotImplementedError
+
+    async def expire_finished(self, max_age: float) -> int:
+        """Delete completed/failed jobs finished more than `max_age` seconds ago"""
+        raise NotImplementedError
+
+    async def counts(self) -> Dict[str, int]:
+        """Count jobs per status"""
+        raise NotImplementedError
+
+    async def close(self):
+        """Release connections"""
+
+
+class MemoryJobStore(JobStore):
+    """Single-process store kept in a dict (jobs are lost on restart)"""
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    async def create(self, job_id: str, record: Dict[str, Any], max_attempts: int = 3):
+        now = time.time()
+        self._jobs[job_id] = {
+            "record": {k: v for k, v in record.items() if v is not None},
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "created": now,
+            "available_at": now,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "finished_at": None
+        }
+
+    def _view(self, job_id: str, job: Dict[str, Any]) -> Dict[str, Any]:
+        return {**job["record"], "job_id": job_id, "status": job["status"],
+                "attempts": job["attempts"]}
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return self._view(job_id, job) if job is not None else None
+
+    async def update(self, job_id: str, **fields: Any):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            _merge(job["record"], fields)
+
+    async def list_recent(self, limit: int = 10) -> List[Dict[str, Any]]:
+        recent = sorted(self._jobs.items(), key=lambda item: item[1]["created"], reverse=True)
+        return [self._view(job_id, job) for job_id, job in recent[:limit]]
+
+    async def claim(self, worker_id: str, visibility_timeout: float) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        for job_id, job in self._jobs.items():
+            if job["status"] == QUEUED and job["available_at"] <= now:
+                job.update(status=PROCESSING, lease_owner=worker_id,
+                           lease_expires_at=now + visibility_timeout,
+                           attempts=job["attempts"] + 1)
+                return self._view(job_id, job)
+        return None
+
+    async def extend_lease(self, job_id: str, worker_id: str, visibility_timeout: float) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != PROCESSING or job["lease_owner"] != worker_id:
+            return False
+        job["lease_expires_at"] = time.time() + visibility_timeout
+        return True
+
+    def _holds_lease(self, job: Optional[Dict[str, Any]], worker_id: Optional[str]) -> bool:
+        return job is not None and (worker_id is None or job["lease_owner"] == worker_id)
+
+    async def complete(self, job_id: str, worker_id: Optional[str] = None, **fields: Any) -> bool:
+        job = self._jobs.get(job_id)
+        if not self._holds_lease(job, worker_id):
+            return False
+        _merge(job["record"], fields)
+        job.update(status=COMPLETED, lease_owner=None, lease_expires_at=None,
+                   finished_at=time.time())
+        return True
+
+    async def fail(self, job_id: str, error: str, worker_id: Optional[str] = None,
+                   retry_delay: float = 0.0) -> Optional[str]:
+        job = self._jobs.get(job_id)
+        if not self._holds_lease(job, worker_id):
+            return None
+        now = time.time()
+        job["record"]["error"] = error
+        job.update(lease_owner=None, lease_expires_at=None)
+        if job["attempts"] < job["max_attempts"]:
+            job.update(status=QUEUED, available_at=now + retry_delay)
+        else:
+            job["record"]["failed_at"] = _isoformat(now)
+            job.update(status=FAILED, finished_at=now)
+        return job["status"]
+
+    async def requeue_expired(self) -> int:
+        now = time.time()
+        count = 0
+        for job in self._jobs.values():
+            if job["status"] == PROCESSING and job["lease_expires_at"] < now:
+                job.update(lease_owner=None, lease_expires_at=None)
+                if job["attempts"] < job["max_attempts"]:
+                    job.update(status=QUEUED, available_at=now)
+                else:
+                    job["record"].update(error="Worker lease expired", failed_at=_isoformat(now))
+                    job.update(status=FAILED, finished_at=now)
+                count += 1
+        return count
+
+    async def expire_finished(self, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished_at"] is not None and job["finished_at"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+    async def counts(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (QUEUED, PROCESSING, COMPLETED, FAILED)}
+        for job in self._jobs.values():
+            counts[job["status"]] += 1
+        return counts
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Store backed by a local SQLite database
+
+    Every API and worker process on the host can open the same file: WAL
+    mode lets readers run alongside the single writer, and a claim is one
+    UPDATE ... RETURNING statement, so two workers never get the same job.
+    Statements run in a worker thread, one at a time, so waiting on
+    another process's write lock never blocks the event loop.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created REAL NOT NULL,
+            available_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            finished_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, available_at);
+        CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created);
+        CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at);
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        # Autocommit: each statement is its own transaction
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False,
+                                   timeout=10.0)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+        # Threads share the connection; a statement and its fetch must not
+        # interleave with another thread's
+        self._lock = threading.Lock()
+
+    def _run(self, sql: str, params: Sequence[Any], fetch: Optional[str]) -> Any:
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            if fetch == "one":
+                return cursor.fetchone()
+            if fetch == "all":
+                return cursor.fetchall()
+            return cursor.rowcount
+
+    async def _execute(self, sql: str, params: Sequence[Any] = (), fetch: Optional[str] = None) -> Any:
+        """
+        Run one statement in a worker thread
+
+        Returns:
+            The first row with fetch="one", every row with fetch="all",
+            otherwise the number of rows changed
+        """
+        return await asyncio.to_thread(self._run, sql, params, fetch)
+
+    def _view(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {**json.loads(row["data"]), "job_id": row["job_id"], "status": row["status"],
+                "attempts": row["attempts"]}
+
+    async def create(self, job_id: str, record: Dict[str, Any], max_attempts: int = 3):
+        now = time.time()
+        data = json.dumps({k: v for k, v in record.items() if v is not None})
+        await self._execute(
+            "INSERT INTO jobs (job_id, status, data, created, available_at, max_attempts) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, QUEUED, data, now, now, max_attempts)
+        )
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = await self._execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,), "one")
+        return self._view(row) if row is not None else None
+
+    async def update(self, job_id: str, **fields: Any):
+        # json_patch merges atomically in SQL; null members are removed
+        await self._execute("UPDATE jobs SET data = json_patch(data, ?) WHERE job_id = ?",
+                            (json.dumps(fields), job_id))
+
+    async def list_recent(self, limit: int = 10) -> List[Dict[str, Any]]:
+        rows = await self._execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,), "all")
+        return [self._view(row) for row in rows]
+
+    async def claim(self, worker_id: str, visibility_timeout: float) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        row = await self._execute(
+            "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires_at = ?, "
+            "attempts = attempts + 1 "
+            "WHERE job_id = (SELECT job_id FROM jobs WHERE status = ? AND available_at <= ? "
+            "ORDER BY available_at, created LIMIT 1) AND status = ? "
+            "RETURNING *",
+            (PROCESSING, worker_id, now + visibility_timeout, QUEUED, now, QUEUED),
+            "one"
+        )
+        return self._view(row) if row is not None else None
+
+    async def extend_lease(self, job_id: str, worker_id: str, visibility_timeout: float) -> bool:
+        changed = await self._execute(
+            "UPDATE jobs SET lease_expires_at = ? "
+            "WHERE job_id = ? AND status = ? AND lease_owner = ?",
+            (time.time() + visibility_timeout, job_id, PROCESSING, worker_id)
+        )
+        return changed > 0
+
+    def _lease_clause(self, worker_id: Optional[str]) -> str:
+        return " AND lease_owner = ?" if worker_id is not None else ""
+
+    async def complete(self, job_id: str, worker_id: Optional[str] = None, **fields: Any) -> bool:
+        params = [COMPLETED, json.dumps(fields), time.time(), job_id]
+        if worker_id is not None:
+            params.append(worker_id)
+        changed = await self._execute(
+            "UPDATE jobs SET status = ?, data = json_patch(data, ?), finished_at = ?, "
+            "lease_owner = NULL, lease_expires_at = NULL "
+            "WHERE job_id = ?" + self._lease_clause(worker_id),
+            params
+        )
+        return changed > 0
+
+    async def fail(self, job_id: str, error: str, worker_id: Optional[str] = None,
+                   retry_delay: float = 0.0) -> Optional[str]:
+        now = time.time()
+        params = [QUEUED, FAILED, now + retry_delay, now, json.dumps({"error": error}),
+                  json.dumps({"error": error, "failed_at": _isoformat(now)}), job_id]
+        if worker_id is not None:
+            params.append(worker_id)
+        row = await self._execute(
+            "UPDATE jobs SET "
+            "status = CASE WHEN attempts < max_attempts THEN ? ELSE ? END, "
+            "available_at = CASE WHEN attempts < max_attempts THEN ? ELSE available_at END, "
+            "finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END, "
+            "data = json_patch(data, CASE WHEN attempts < max_attempts THEN ? ELSE ? END), "
+            "lease_owner = NULL, lease_expires_at = NULL "
+            "WHERE job_id = ?" + self._lease_clause(worker_id) + " RETURNING status",
+            params,
+            "one"
+        )
+        return row["status"] if row is not None else None
+
+    async def requeue_expired(self) -> int:
+        now = time.time()
+        requeued = await self._execute(
+            "UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, "
+            "lease_expires_at = NULL "
+            "WHERE status = ? AND lease_expires_at < ? AND attempts < max_attempts",
+            (QUEUED, now, PROCESSING, now)
+        )
+        failed = await self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, data = json_patch(data, ?), "
+            "lease_owner = NULL, lease_expires_at = NULL "
+            "WHERE status = ? AND lease_expires_at < ?",
+            (FAILED, now, json.dumps({"error": "Worker lease expired",
+                                      "failed_at": _isoformat(now)}), PROCESSING, now)
+        )
+        return requeued + failed
+
+    async def expire_finished(self, max_age: float) -> int:
+        return await self._execute("DELETE FROM jobs WHERE finished_at < ?", (time.time() - max_age,))
+
+    async def counts(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (QUEUED, PROCESSING, COMPLETED, FAILED)}
+        rows = await self._execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status", (), "all")
+        for row in rows:
+            counts[row["status"]] = row["n"]
+        return counts
+
+    async def close(self):
+        await asyncio.to_thread(self._db.close)
+
+
+class RedisJobStore(JobStore):
+    """
+    Store backed by Redis, for workers spread over several hosts
+
+    Each job is a hash whose fields hold JSON values. Sorted sets index the
+    queue (scored by when a job becomes claimable), active leases (scored
+    by expiry), creation order and finish time, with failed jobs also in a
+    set of their own, so counting jobs per status reads four set sizes.
+    Every change of a job's status is one MULTI/EXEC that moves it between
+    the sets and rewrites its hash, under WATCH on the hash: a job is never
+    in two states or none, and when workers race for it exactly one
+    transaction commits. Only plain commands are needed (no Lua), so a fake
+    such as fakeredis.aioredis.FakeRedis can stand in for a server.
+    """
+
+    def __init__(self, client, prefix: str = "rwg:jobs"):
+        """
+        Args:
+            client: A redis.asyncio.Redis (or compatible) client
+            prefix: Key prefix for every key this store writes
+        """
+        self.redis = client
+        self.prefix = prefix
+        self.queue_key = f"{prefix}:queue"
+        self.leases_key = f"{prefix}:leases"
+        self.created_key = f"{prefix}:created"
+        self.finished_key = f"{prefix}:finished"
+        self.failed_key = f"{prefix}:failed"
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    def _stage_write(self, pipe, job_id: str, fields: Dict[str, Any]):
+        """Queue commands on a pipeline that set JSON-encoded fields (None deletes)"""
+        key = self._job_key(job_id)
+        present = {k: json.dumps(v) for k, v in fields.items() if v is not None}
+        removed = [k for k, v in fields.items() if v is None]
+        if present:
+            pipe.hset(key, mapping=present)
+        if removed:
+            pipe.hdel(key, *removed)
+
+    async def _write(self, job_id: str, fields: Dict[str, Any]):
+        """Set JSON-encoded fields (None deletes)"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            self._stage_write(pipe, job_id, fields)
+            await pipe.execute()
+
+    async def _read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return _decode(await self.redis.hgetall(self._job_key(job_id)))
+
+    async def _transaction(self, job_id: str, stage: Callable[[Any, Optional[Dict[str, Any]]], Awaitable[Any]],
+                           watch: Sequence[str] = ()) -> Any:
+        """
+        Change a job in one MULTI/EXEC, retried until nobody else changed it first
+
+        `stage(pipe, job)` gets the job as read under WATCH (None if it
+        does not exist) and may read more through `pipe`; to make changes
+        it calls `pipe.multi()` and queues them. Its return value is
+        returned once the transaction commits.
+
+        Args:
+            job_id: Job whose hash is watched
+            stage: Coroutine deciding on and queueing the changes
+            watch: Further keys whose change must abort the transaction
+        """
+        from redis.exceptions import WatchError
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(self._job_key(job_id), *watch)
+                    job = _decode(await pipe.hgetall(self._job_key(job_id)))
+                    result = await stage(pipe, job)
+                    if pipe.explicit_transaction:
+                        await pipe.execute()
+                    return result
+                except WatchError:
+                    continue
+
+    def _view(self, job_id: str, job: Dict[str, Any]) -> Dict[str, Any]:
+        view = {k: v for k, v in job.items() if not k.startswith("_")}
+        view["job_id"] = job_id
+        view["status"] = job.get("_status")
+        view["attempts"] = job.get("_attempts", 0)
+        return view
+
+    async def create(self, job_id: str, record: Dict[str, Any], max_attempts: int = 3):
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            self._stage_write(pipe, job_id, {**record, "_status": QUEUED, "_attempts": 0,
+                                             "_max_attempts": max_attempts})
+            pipe.zadd(self.created_key, {job_id: now})
+            pipe.zadd(self.queue_key, {job_id: now})
+            await pipe.execute()
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = await self._read(job_id)
+        return self._view(job_id, job) if job is not None else None
+
+    async def update(self, job_id: str, **fields: Any):
+        async def write(pipe, job: Optional[Dict[str, Any]]):
+            # A job deleted meanwhile is not recreated as a partial hash
+            if job is not None:
+                pipe.multi()
+                self._stage_write(pipe, job_id, fields)
+
+        await self._transaction(job_id, write)
+
+    async def list_recent(self, limit: int = 10) -> List[Dict[str, Any]]:
+        job_ids = await self.redis.zrevrange(self.created_key, 0, limit - 1)
+        jobs = []
+        for job_id in map(_text, job_ids):
+            job = await self.get(job_id)
+            if job is not None:
+                jobs.append(job)
+        return jobs
+
+    async def claim(self, worker_id: str, visibility_timeout: float) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        # Every candidate a round loses has left the queue, so this ends
+        while True:
+            candidates = await self.redis.zrangebyscore(self.queue_key, "-inf", now, start=0, num=8)
+            if not candidates:
+                return None
+            for job_id in map(_text, candidates):
+                lease = self._lease_stage(job_id, worker_id, now + visibility_timeout)
+                if await self._transaction(job_id, lease):
+                    return await self.get(job_id)
+
+    def _lease_stage(self, job_id: str, worker_id: str, expires_at: float):
+        """Transaction stage of `claim` for one queued job"""
+        async def lease(pipe, job: Optional[Dict[str, Any]]) -> bool:
+            if await pipe.zscore(self.queue_key, job_id) is None:
+                return False  # another worker won this one
+            pipe.multi()
+            pipe.zrem(self.queue_key, job_id)
+            if job is None:
+                return False  # expired while queued
+            # Leaving the queue and taking the lease commit together, so
+            # a worker dying here cannot lose the job
+            pipe.zadd(self.leases_key, {job_id: expires_at})
+            self._stage_write(pipe, job_id, {"_status": PROCESSING,
+                                             "_attempts": job.get("_attempts", 0) + 1,
+                                             "_lease_owner": worker_id})
+            return True
+
+        return lease
+
+    async def extend_lease(self, job_id: str, worker_id: str, visibility_timeout: float) -> bool:
+        async def renew(pipe, job: Optional[Dict[str, Any]]) -> bool:
+            # Losing the lease rewrites the hash, so a worker whose job was
+            # reclaimed (and maybe leased again) cannot renew it
+            if job is None or job.get("_status") != PROCESSING or job.get("_lease_owner") != worker_id:
+                return False
+            pipe.multi()
+            pipe.zadd(self.leases_key, {job_id: time.time() + visibility_timeout}, xx=True)
+            return True
+
+        return await self._transaction(job_id, renew)
+
+    def _may_finish(self, job: Optional[Dict[str, Any]], worker_id: Optional[str]) -> bool:
+        """The job exists and, with `worker_id`, that worker holds its lease"""
+        return job is not None and (worker_id is None or job.get("_lease_owner") == worker_id)
+
+    def _stage_finish(self, pipe, job_id: str, status: str, fields: Dict[str, Any]):
+        """Queue the commands that drop a job's lease and mark it completed or failed"""
+        now = time.time()
+        pipe.zrem(self.leases_key, job_id)
+        pipe.zrem(self.queue_key, job_id)
+        self._stage_write(pipe, job_id, {**fields, "_status": status, "_lease_owner": None})
+        pipe.zadd(self.finished_key, {job_id: now})
+        if status == FAILED:
+            pipe.zadd(self.failed_key, {job_id: now})
+
+    def _stage_retry_or_fail(self, pipe, job_id: str, job: Dict[str, Any], error: str,
+                             retry_delay: float) -> str:
+        """Queue the commands that requeue a failed attempt, or fail the job; returns the new status"""
+        now = time.time()
+        if job.get("_attempts", 0) < job.get("_max_attempts", 1):
+            pipe.zrem(self.leases_key, job_id)
+            self._stage_write(pipe, job_id, {"error": error, "_status": QUEUED, "_lease_owner": None})
+            pipe.zadd(self.queue_key, {job_id: now + retry_delay})
+            return QUEUED
+        self._stage_finish(pipe, job_id, FAILED, {"error": error, "failed_at": _isoformat(now)})
+        return FAILED
+
+    async def complete(self, job_id: str, worker_id: Optional[str] = None, **fields: Any) -> bool:
+        async def finish(pipe, job: Optional[Dict[str, Any]]) -> bool:
+            if not self._may_finish(job, worker_id):
+                return False
+            pipe.multi()
+            self._stage_finish(pipe, job_id, COMPLETED, fields)
+            return True
+
+        return await self._transaction(job_id, finish)
+
+    async def fail(self, job_id: str, error: str, worker_id: Optional[str] = None,
+                   retry_delay: float = 0.0) -> Optional[str]:
+        async def retry(pipe, job: Optional[Dict[str, Any]]) -> Optional[str]:
+            if not self._may_finish(job, worker_id):
+                return None
+            pipe.multi()
+            return self._stage_retry_or_fail(pipe, job_id, job, error, retry_delay)
+
+        return await self._transaction(job_id, retry)
+
+    async def requeue_expired(self) -> int:
+        now = time.time()
+        expired = await self.redis.zrangebyscore(self.leases_key, "-inf", now)
+        count = 0
+        for job_id in map(_text, expired):
+            async def requeue(pipe, job: Optional[Dict[str, Any]]) -> bool:
+                expires_at = await pipe.zscore(self.leases_key, job_id)
+                if expires_at is None or expires_at >= now:
+                    return False  # finished or renewed meanwhile
+                pipe.multi()
+                if job is None:
+                    pipe.zrem(self.leases_key, job_id)
+                    return False
+                self._stage_retry_or_fail(pipe, job_id, job, "Worker lease expired", 0.0)
+                return True
+
+            # Watching the leases too aborts on a renewal that lands meanwhile
+            if await self._transaction(job_id, requeue, watch=(self.leases_key,)):
+                count += 1
+        return count
+
+    async def expire_finished(self, max_age: float) -> int:
+        expired = await self.redis.zrangebyscore(self.finished_key, "-inf", time.time() - max_age)
+        for job_id in map(_text, expired):
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(self._job_key(job_id))
+                pipe.zrem(self.finished_key, job_id)
+                pipe.zrem(self.failed_key, job_id)
+                pipe.zrem(self.created_key, job_id)
+                await pipe.execute()
+        return len(expired)
+
+    async def counts(self) -> Dict[str, int]:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for key in (self.queue_key, self.leases_key, self.finished_key, self.failed_key):
+                pipe.zcard(key)
+            queued, processing, finished, failed = await pipe.execute()
+        return {QUEUED: queued, PROCESSING: processing, COMPLETED: finished - failed, FAILED: failed}
+
+    async def close(self):
+        await self.redis.close()
+
+
+def create_job_store(url: Optional[str] = None) -> JobStore:
+    """
+    Build a job store from a URL
+
+    Args:
+        url: "memory://", "sqlite:///path/to/jobs.db" or "redis://host:port/db";
+            defaults to JOB_STORE_URL, then a SQLite file next to the stored worlds
+
+    Returns:
+        The configured JobStore
+    """
+    url = url or os.getenv("JOB_STORE_URL", "sqlite:///./storage/jobs.db")
+    scheme = urlparse(url).scheme
+
+    if scheme == "memory":
+        return MemoryJobStore()
+    if scheme == "sqlite":
+        return SQLiteJobStore(url[len("sqlite:///"):])
+    if scheme in ("redis", "rediss", "unix"):
+        import redis.asyncio as redis_asyncio
+        return RedisJobStore(redis_asyncio.Redis.from_url(url))
+    raise ValueError(f"Unsupported job store URL: {url}")
+
+
+def _decode(raw: Dict[Any, Any]) -> Optional[Dict[str, Any]]:
+    """Decode a Redis job hash of JSON values; None for a missing (empty) hash"""
+    if not raw:
+        return None
+    return {_text(k): json.loads(v) for k, v in raw.items()}
+
+
+def _merge(record: Dict[str, Any], fields: Dict[str, Any]):
+    """Merge fields into a record; None removes a field"""
+    for key, value in fields.items():
+        if value is None:
+            record.pop(key, None)
+        else:
+            record[key] = value
+
+
+def _isoformat(timestamp: float) -> str:
+    from datetime import datetime
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+def _text(value: Any) -> str:
+    """Decode a Redis reply that may be bytes"""
+    return value.decode() if isinstance(value, bytes) else value
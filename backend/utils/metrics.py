@@ -0,0 +1,252 @@
+"""
+Metrics - counters, gauges and histograms rendered in the Prometheus text format, plus per-job stage timers
+"""
+import asyncio
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; generation stages range from milliseconds (cache hits) to minutes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Registry:
+    """Metrics exposed together on one endpoint"""
+
+    def __init__(self):
+        self._metrics: Dict[str, "_Metric"] = {}
+
+    def register(self, metric: "_Metric"):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional["_Metric"]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY):
+        """
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Label names; values are given through `labels`
+            registry: Registry to expose the metric on (None for none)
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, **labels: Any):
+        """The series with these label values, created on first use"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _unlabeled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use labels()")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+
+class Counter(_Metric):
+    """
+    Monotonic total
+
+    `set` is for mirroring a total counted elsewhere (cache hit counters)
+    at scrape time.
+    """
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._unlabeled().inc(amount)
+
+    def samples(self) -> Iterator[str]:
+        for key, child in self._children.items():
+            yield f"{self.name}{_label_text(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float):
+        self._unlabeled().set(value)
+
+    def dec(self, amount: float = 1.0):
+        self._unlabeled().dec(amount)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional[Registry] = REGISTRY):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._unlabeled().observe(value)
+
+    def samples(self) -> Iterator[str]:
+        for key, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                labels = _label_text(self.labelnames + ("le",), key + (_format_value(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _label_text(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+# CPU seconds charged to the stage running in the current context; tasks
+# started inside a stage (gathered terrain tiles) inherit it
+_cpu_sink: ContextVar[Optional[List[float]]] = ContextVar("cpu_sink", default=None)
+
+
+def charge_cpu(seconds: float):
+    """Add CPU time spent elsewhere (a worker process) to the current stage"""
+    sink = _cpu_sink.get()
+    if sink is not None:
+        sink.append(seconds)
+
+
+def timed_call(fn: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    """Call `fn` and return its result with the CPU seconds this thread spent on it"""
+    start = time.thread_time()
+    result = fn(*args)
+    return result, time.thread_time() - start
+
+
+async def run_in_thread(fn: Callable[..., Any], *args: Any) -> Any:
+    """asyncio.to_thread, charging the thread's CPU time to the current stage"""
+    result, cpu = await asyncio.to_thread(timed_call, fn, *args)
+    charge_cpu(cpu)
+    return result
+
+
+class StageTimer:
+    """
+    Wall and CPU time of each pipeline stage of one job
+
+    CPU time is what the stage's work used in executor workers and worker
+    threads (charged through `charge_cpu`), not time spent waiting on I/O
+    on the event loop. Every finished stage is also observed in the
+    stage histograms passed in.
+    """
+
+    def __init__(self, wall: Optional[Histogram] = None, cpu: Optional[Histogram] = None):
+        self.wall = wall
+        self.cpu = cpu
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as stage `name`"""
+        sink: List[float] = []
+        token = _cpu_sink.set(sink)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _cpu_sink.reset(token)
+            cpu = sum(sink)
+            self.stages[name] = {"wall_seconds": round(elapsed, 4), "cpu_seconds": round(cpu, 4)}
+            if self.wall is not None:
+                self.wall.labels(stage=name).observe(elapsed)
+            if self.cpu is not None:
+                self.cpu.labels(stage=name).observe(cpu)
@@ -0,0 +1,166 @@
+"""
+Serialization helpers shared by storage and caches
+"""
+import json
+from collections.abc import Iterable
+from itertools import islice
+from typing import Any, Iterator
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional: the standard json module is always available
+    orjson = None
+
+# iter_json batches: list items, and NumPy values per block of rows
+ITEMS_PER_BATCH = 1024
+VALUES_PER_BATCH = 65536
+BUFFER_SIZE = 1 << 16
+INDENT = b"  "
+
+
+def json_default(obj: Any) -> Any:
+    """
+    `default` hook for json.dump that handles NumPy values
+
+    Heightmaps stay ndarrays inside the pipeline and only become nested
+    lists here, when the world is written out. Other iterables (lazy part
+    sequences) are written as arrays, as `iter_json` writes them.
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, Iterable) and not isinstance(obj, (str, bytes, bytearray)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_json(data: Any, compact: bool = True) -> bytes:
+    """
+    Encode data as UTF-8 JSON
+
+    Uses orjson when it is installed (it writes ndarrays natively, without
+    the nested-list detour), otherwise the standard json module.
+
+    Args:
+        data: JSON-serializable data, NumPy values included
+        compact: No whitespace; otherwise indented by two spaces
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if not compact:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=json_default, option=option)
+    if compact:
+        text = json.dumps(data, separators=(",", ":"), default=json_default)
+    else:
+        text = json.dumps(data, indent=2, default=json_default)
+    return text.encode("utf-8")
+
+
+def iter_json(data: Any, compact: bool = True, buffer_size: int = BUFFER_SIZE) -> Iterator[bytes]:
+    """
+    Encode data as UTF-8 JSON a piece at a time
+
+    Yields exactly the bytes of `dumps_json(data, compact)`, in chunks of
+    about `buffer_size`. Dicts are walked key by key and arrays encoded a
+    batch of items at a time (NumPy arrays a block of rows at a time), so
+    memory is bounded by a batch rather than by the document. Iterables
+    other than lists, such as generators, are pulled a batch at a time
+    as well, so their items never need to exist all at once. The chunks
+    can go to a file or straight into a StreamingResponse.
+
+    Args:
+        data: JSON-serializable data, NumPy values and iterables included
+        compact: No whitespace; otherwise indented by two spaces
+        buffer_size: Bytes to collect before yielding a chunk
+    """
+    buffer = []
+    buffered = 0
+    for piece in _encode(data, compact, 0):
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= buffer_size:
+            yield b"".join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _encode(value: Any, compact: bool, depth: int) -> Iterator[bytes]:
+    """Pieces of one value nested `depth` levels deep"""
+    if isinstance(value, dict) and value and all(isinstance(key, str) for key in value):
+        yield from _encode_object(value, compact, depth)
+    elif isinstance(value, np.ndarray) and value.ndim and len(value):
+        rows = max(1, VALUES_PER_BATCH // max(1, value[0].size))
+        batches = (value[start:start + rows] for start in range(0, len(value), rows))
+        yield from _encode_array(batches, compact, depth)
+    elif isinstance(value, (list, tuple)) and value:
+        batches = (value[start:start + ITEMS_PER_BATCH] for start in range(0, len(value), ITEMS_PER_BATCH))
+        yield from _encode_array(batches, compact, depth)
+    elif (isinstance(value, Iterable)
+          and not isinstance(value, (str, bytes, bytearray, dict, list, tuple, np.ndarray))):
+        iterator = iter(value)
+        batches = iter(lambda: list(islice(iterator, ITEMS_PER_BATCH)), [])
+        yield from _encode_array(batches, compact, depth)
+    else:
+        # Scalars, empty containers and dicts with non-string keys
+        yield _indented(dumps_json(value, compact), compact, depth)
+
+
+def _encode_object(value: dict, compact: bool, depth: int) -> Iterator[bytes]:
+    if compact:
+        separator, colon, close = b",", b":", b"}"
+    else:
+        separator = b",\n" + INDENT * (depth + 1)
+        colon = b": "
+        close = b"\n" + INDENT * depth + b"}"
+    opening = b"{" if compact else b"{" + separator[1:]
+    for key, item in value.items():
+        yield opening + dumps_json(key) + colon
+        yield from _encode(item, compact, depth + 1)
+        opening = separator
+    yield close
+
+
+def _encode_array(batches: Iterator[Any], compact: bool, depth: int) -> Iterator[bytes]:
+    """
+    Pieces of an array given as batches of its items
+
+    Each batch is encoded by `dumps_json` as an array of its own, then
+    its brackets are dropped and its lines indented to `depth`.
+    """
+    opening = b"["
+    for batch in batches:
+        encoded = dumps_json(batch, compact)
+        if compact:
+            yield opening + encoded[1:-1]
+            opening = b","
+        else:
+            # "[\n  item,\n  item\n]" -> the items, one level below depth
+            items = _indented(encoded[2:-2], compact, depth)
+            yield opening + b"\n" + INDENT * depth + items
+            opening = b","
+    if opening == b"[":
+        yield b"[]"
+    elif compact:
+        yield b"]"
+    else:
+        yield b"\n" + INDENT * depth + b"]"
+
+
+def _indented(encoded: bytes, compact: bool, depth: int) -> bytes:
+    """Indent the continuation lines of pretty JSON by `depth` levels (JSON strings hold no raw newlines)"""
+    if compact or not depth:
+        return encoded
+    return encoded.replace(b"\n", b"\n" + INDENT * depth)
+
+
+def loads_json(data: bytes) -> Any:
+    """Decode JSON written by `dumps_json` (or any JSON)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -1,65 +1,484 @@
 """
 Storage management for generated worlds
 """
+import asyncio
 import os
-import json
+import shutil
+import tempfile
+import time
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
 from datetime import datetime
 
+from utils.http_files import ENCODING_SUFFIXES, available_encodings, compress_file
+from utils.metrics import run_in_thread
+from utils.serialization import dumps_json, iter_json, loads_json
+from utils.world_index import WorldIndex
+
+WORLD_FORMATS = ("pretty", "compact")
+
 class StorageManager:
-    """Manages storage of generated world files"""
+    """
+    Manages storage of generated world files
     
-    def __init__(self, storage_path: str = "./storage"):
+    Every write goes through a temp file and a rename, so readers (and
+    other processes) never see a partial file, and file work runs in a
+    thread so the event loop keeps serving requests while large worlds
+    are written. Saved worlds are recorded in a SQLite index.
+    """
+    
+    def __init__(self, storage_path: str = "./storage", world_format: Optional[str] = None,
+                 compression: Optional[str] = None):
+        """
+        Args:
+            storage_path: Root directory for worlds and caches
+            world_format: "pretty" (indented JSON) or "compact" (no
+                whitespace); defaults to WORLD_FORMAT, then "pretty"
+            compression: Content coding ("gzip" or "zstd") to write next to
+                each world at save time, so the first download does not
+                have to compress it; defaults to WORLD_COMPRESSION, then none
+        """
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(parents=True, exist_ok=True)
         self.worlds_path = self.storage_path / "worlds"
         self.worlds_path.mkdir(exist_ok=True)
+        self.cache_root = self.storage_path / "cache"
+        self.cache_root.mkdir(exist_ok=True)
+        self.batches_path = self.storage_path / "batches"
+        self.batches_path.mkdir(exist_ok=True)
+        
+        world_format = world_format or os.getenv("WORLD_FORMAT", "pretty")
+        if world_format not in WORLD_FORMATS:
+            raise ValueError(f"Unknown world format '{world_format}', expected one of {WORLD_FORMATS}")
+        self.world_format = world_format
+        compression = compression if compression is not None else os.getenv("WORLD_COMPRESSION", "")
+        if compression in ("", "none"):
+            compression = None
+        if compression is not None and compression not in available_encodings():
+            raise ValueError(f"Unsupported world compression '{compression}', expected one of {available_encodings()}")
+        self.compression = compression
+        
+        self.index = WorldIndex(str(self.worlds_path / "index.db"))
+        if self.index.is_empty():
+            self._rebuild_index()
+        # Worlds being served by this process, with the number of responses
+        # in flight for each; retention never evicts a pinned world
+        self._pins: Dict[str, int] = {}
     
-    async def save_world(self, job_id: str, world_data: Dict[str, Any]) -> str:
+    async def save_world(self, job_id: str, world_data: Dict[str, Any],
+                         user_id: Optional[str] = None) -> str:
         """
         Save world data to file
         
+        The caller's dict is not modified: job_id and saved_at go into a
+        copy of its metadata.
+        
         Args:
             job_id: Unique job identifier
             world_data: World data in Roblox format
+            user_id: Owner of the world (for per-user retention limits)
         
         Returns:
             Path to saved file
         """
-        filename = f"world_{job_id}.json"
-        file_path = self.worlds_path / filename
-        
-        # Add metadata
-        world_data["metadata"]["job_id"] = job_id
-        world_data["metadata"]["saved_at"] = datetime.now().isoformat()
+        world = {
+            **world_data,
+            "metadata": {
+                **world_data.get("metadata", {}),
+                "job_id": job_id,
+                "saved_at": datetime.now().isoformat()
+            }
+        }
+        return await run_in_thread(self._save_world, job_id, world, user_id)
+    
+    def _save_world(self, job_id: str, world: Dict[str, Any], user_id: Optional[str] = None) -> str:
+        """Encode, write and index a world (runs in a thread)"""
+        file_path = self.world_path(job_id)
         
-        # Save as JSON (in production, convert to .rbxlx format)
-        with open(file_path, "w") as f:
-            json.dump(world_data, f, indent=2)
+        # Saved as JSON (core.rbxm exports it as a Roblox model), streamed
+        # to disk so the encoded world never sits in memory whole
+        self._write_atomic(file_path, iter_json(world, compact=self.world_format == "compact"))
+        if self.compression:
+            variant = file_path.with_name(file_path.name + ENCODING_SUFFIXES[self.compression])
+            compress_file(file_path, variant, self.compression)
         
+        self.index.put(job_id, file_path.name, self._world_bytes(job_id), self.world_format,
+                       self.compression, user_id=user_id)
         return str(file_path)
     
     async def load_world(self, job_id: str) -> Dict[str, Any]:
         """Load world data from file"""
-        filename = f"world_{job_id}.json"
-        file_path = self.worlds_path / filename
+        file_path = self.world_path(job_id)
         
-        if not file_path.exists():
+        try:
+            data = await asyncio.to_thread(file_path.read_bytes)
+        except FileNotFoundError:
             raise FileNotFoundError(f"World file not found: {file_path}")
-        
-        with open(file_path, "r") as f:
-            return json.load(f)
+        return loads_json(data)
     
     async def delete_world(self, job_id: str) -> bool:
-        """Delete world file"""
-        filename = f"world_{job_id}.json"
-        file_path = self.worlds_path / filename
-        
-        if file_path.exists():
-            file_path.unlink()
-            return True
-        return False
-
+        """Delete world file, its compressed variants and its chunks"""
+        existed = self.world_path(job_id).exists()
+        await asyncio.to_thread(self._delete_world, job_id)
+        return existed
+    
+    async def evict_world(self, job_id: str) -> int:
+        """Delete a world like `delete_world`; returns the bytes freed"""
+        return await asyncio.to_thread(self._delete_world, job_id)
+    
+    def _delete_world(self, job_id: str) -> int:
+        """Remove every file of a world and its index entry; returns bytes freed"""
+        freed = 0
+        
+        # Unlinking is safe under readers: responses already streaming
+        # keep their open file handles
+        for path in self._world_files(job_id):
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                freed += size
+            except (FileNotFoundError, IsADirectoryError):
+                pass
+        shutil.rmtree(self.chunks_path(job_id), ignore_errors=True)
+        self.index.remove(job_id)
+        return freed
+    
+    def _world_files(self, job_id: str) -> List[Path]:
+        """Every file a world owns: the world, its model, their compressed variants and its chunks"""
+        file_path = self.world_path(job_id)
+        model_path = self.model_path(job_id)
+        chunk_dir = self.chunks_path(job_id)
+        return [file_path, *self.worlds_path.glob(f"{file_path.name}.*"),
+                model_path, *self.worlds_path.glob(f"{model_path.name}.*"),
+                *(chunk_dir.iterdir() if chunk_dir.is_dir() else [])]
+    
+    def _world_bytes(self, job_id: str) -> int:
+        """Total size of every file a world owns"""
+        total = 0
+        for path in self._world_files(job_id):
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+    
+    def _update_world_bytes(self, job_id: str):
+        self.index.set_bytes(job_id, self._world_bytes(job_id))
+    
+    async def refresh_world_bytes(self, job_id: str):
+        """
+        Re-measure a world's files in the index
+        
+        Files made after saving (chunks, the model, compressed variants
+        built on first download) count towards retention's byte limit
+        from then on.
+        """
+        await asyncio.to_thread(self._update_world_bytes, job_id)
+    
+    async def touch_world(self, job_id: str, download: bool = False):
+        """
+        Record a read of a world for least-recently-used retention
+        
+        Args:
+            job_id: World that was read
+            download: The whole world (or its manifest) was fetched, as
+                opposed to a single chunk
+        """
+        # Chunk requests arrive in bursts; one index write a minute is enough
+        await asyncio.to_thread(self.index.touch, job_id, download, 0.0 if download else 60.0)
+    
+    def pin(self, job_id: str):
+        """Protect a world from eviction while this process serves it"""
+        self._pins[job_id] = self._pins.get(job_id, 0) + 1
+    
+    def unpin(self, job_id: str):
+        """Release a pin taken with `pin`"""
+        count = self._pins.get(job_id, 0) - 1
+        if count > 0:
+            self._pins[job_id] = count
+        else:
+            self._pins.pop(job_id, None)
+    
+    def is_pinned(self, job_id: str) -> bool:
+        return job_id in self._pins
+    
+    async def list_worlds(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """Stored worlds from the index, newest first (no directory scan)"""
+        return await asyncio.to_thread(self.index.list, limit, offset)
+    
+    async def world_totals(self) -> Dict[str, int]:
+        """Number of stored worlds and the total size of their files in bytes"""
+        return await asyncio.to_thread(self.index.totals)
+    
+    def _rebuild_index(self):
+        """Index world files saved before the index existed (one scan, on first start)"""
+        for file_path in self.worlds_path.glob("world_*.json"):
+            stat = file_path.stat()
+            job_id = file_path.stem[len("world_"):]
+            self.index.put(job_id, file_path.name, self._world_bytes(job_id), "unknown",
+                           saved_at=stat.st_mtime)
+    
+    def close(self):
+        """Close the world index"""
+        self.index.close()
+    
+    def world_path(self, job_id: str) -> Path:
+        """Get the path a world file is saved at"""
+        return self.worlds_path / f"world_{job_id}.json"
+    
+    def model_path(self, job_id: str) -> Path:
+        """Get the path of a world's Roblox binary model export"""
+        return self.worlds_path / f"world_{job_id}.rbxm"
+    
+    def chunks_path(self, job_id: str) -> Path:
+        """Get the directory holding a world's chunk files"""
+        return self.worlds_path / f"world_{job_id}.chunks"
+    
+    def manifest_path(self, job_id: str) -> Path:
+        """Get the path of a world's chunk manifest"""
+        return self.chunks_path(job_id) / "manifest.json"
+    
+    def chunk_path(self, job_id: str, index: int) -> Path:
+        """Get the path of one world chunk"""
+        return self.chunks_path(job_id) / f"chunk_{index:05d}.json"
+    
+    def save_world_chunks(self, job_id: str, manifest: Dict[str, Any],
+                          chunks: List[Dict[str, Any]]) -> str:
+        """
+        Save a chunked copy of a world
+        
+        Chunks are written as compact JSON and their sizes recorded in the
+        manifest, which is written last: a manifest on disk means every
+        chunk it lists is complete.
+        
+        Args:
+            job_id: Unique job identifier
+            manifest: Manifest from core.world_chunks.split_world
+            chunks: Chunks from core.world_chunks.split_world
+        
+        Returns:
+            Path to the saved manifest
+        """
+        chunk_dir = self.chunks_path(job_id)
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+        
+        for entry, chunk in zip(manifest["chunks"], chunks):
+            if "tile" in chunk:
+                # Full-resolution terrain tiles are served from the tile store
+                continue
+            data = dumps_json(chunk)
+            self._write_atomic(self.chunk_path(job_id, chunk["index"]), data)
+            entry["bytes"] = len(data)
+        manifest["total_bytes"] = sum(entry.get("bytes", 0) for entry in manifest["chunks"])
+        
+        data = dumps_json(manifest)
+        file_path = self.manifest_path(job_id)
+        self._write_atomic(file_path, data)
+        self._update_world_bytes(job_id)
+        return str(file_path)
+    
+    def save_world_model(self, job_id: str, data: Iterable[bytes]) -> str:
+        """
+        Save a world's Roblox binary model export
+        
+        Args:
+            job_id: Unique job identifier
+            data: The model's bytes, a chunk at a time (from core.rbxm.iter_rbxm)
+        
+        Returns:
+            Path to the saved model
+        """
+        file_path = self.model_path(job_id)
+        self._write_atomic(file_path, data)
+        self._update_world_bytes(job_id)
+        return str(file_path)
+    
+    def terrain_tile_path(self, key: str, row: int, col: int, lod: int = 0) -> Path:
+        """Get the path of a terrain tile (at a level of detail) in the shared tile store"""
+        suffix = f"_lod{lod}" if lod else ""
+        return self.cache_root / "tiles" / key / f"tile_{row:03d}_{col:03d}{suffix}.json"
+    
+    def save_terrain_tile(self, key: str, row: int, col: int, tile: Dict[str, Any], lod: int = 0) -> str:
+        """
+        Save a terrain tile (a terrain download chunk) to the shared tile store
+        
+        Tiles are keyed by terrain layout rather than job, so every world
+        with the same terrain shares them; a missing tile can always be
+        regenerated from its layout.
+        """
+        file_path = self.terrain_tile_path(key, row, col, lod)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        data = dumps_json(tile)
+        self._write_atomic(file_path, data)
+        return str(file_path)
+    
+    def _write_atomic(self, file_path: Path, data: Union[bytes, Iterable[bytes]]) -> int:
+        """
+        Write bytes through a temp file so readers never see a partial file
+        
+        `data` is bytes or an iterable of byte chunks (from `iter_json`);
+        returns the number of bytes written.
+        """
+        # A unique temp name per writer, so concurrent writers of one file
+        # never interleave; the last rename wins
+        fd, tmp_name = tempfile.mkstemp(dir=file_path.parent, prefix=file_path.name + ".", suffix=".tmp")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in ([data] if isinstance(data, bytes) else data):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_name, file_path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return size
+    
+    async def save_batch(self, batch_id: str, batch: Dict[str, Any]) -> str:
+        """Save a batch record (its items and shared options)"""
+        file_path = self.batches_path / f"{batch_id}.json"
+        await asyncio.to_thread(self._write_atomic, file_path, dumps_json(batch))
+        return str(file_path)
+    
+    async def load_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Load a batch record, or None if there is no such batch"""
+        file_path = self.batches_path / f"{batch_id}.json"
+        
+        try:
+            return loads_json(await asyncio.to_thread(file_path.read_bytes))
+        except FileNotFoundError:
+            return None
+    
+    async def save_cached_world(self, key: str, world_data: Dict[str, Any]) -> str:
+        """
+        Save a finished world to the disk tier of the world cache
+        
+        Args:
+            key: Content-addressed cache key
+            world_data: World data in Roblox format
+        
+        Returns:
+            Path to saved file
+        """
+        return await asyncio.to_thread(self._write_cache_entry, "worlds", key, world_data)
+    
+    async def load_cached_world(self, key: str) -> Optional[Dict[str, Any]]:
+        """Load a world from the disk tier of the world cache, if present"""
+        return await asyncio.to_thread(self._read_cache_entry, "worlds", key)
+    
+    async def save_cached_spec(self, key: str, entry: Dict[str, Any]) -> str:
+        """Save a prompt-to-spec cache entry to the persistent tier"""
+        return await asyncio.to_thread(self._write_cache_entry, "specs", key, entry)
+    
+    async def load_cached_spec(self, key: str) -> Optional[Dict[str, Any]]:
+        """Load a prompt-to-spec cache entry from the persistent tier, if present"""
+        return await asyncio.to_thread(self._read_cache_entry, "specs", key)
+    
+    def _write_cache_entry(self, namespace: str, key: str, data: Dict[str, Any]) -> str:
+        """Write a compact JSON cache entry under storage/cache/<namespace>"""
+        cache_dir = self.cache_root / namespace
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        file_path = cache_dir / f"{key}.json"
+        self._write_atomic(file_path, iter_json(data))
+        return str(file_path)
+    
+    def _read_cache_entry(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        """Read a cache entry written by `_write_cache_entry`, if present"""
+        file_path = self.cache_root / namespace / f"{key}.json"
+        
+        try:
+            data = file_path.read_bytes()
+            # The modification time doubles as the last use for `trim_cache`
+            os.utime(file_path)
+        except FileNotFoundError:
+            return None
+        return loads_json(data)
+    
+    async def trim_cache(self, *namespaces: str, max_entries: int = 0, max_bytes: int = 0,
+                         max_age: float = 0, grace: float = 0) -> Tuple[int, int]:
+        """
+        Delete cache entries past their age, then the least recently used beyond the limits
+        
+        An entry is a file (worlds, specs) or a directory (the tiles of one
+        terrain layout); its last use is its newest modification time.
+        Several namespaces share one set of limits.
+        
+        Args:
+            *namespaces: Directories under storage/cache
+            max_entries: Entries kept (0 disables)
+            max_bytes: Total bytes kept (0 disables)
+            max_age: Seconds an entry is kept after its last use (0 disables)
+            grace: Seconds after its last use during which an entry is
+                never deleted
+        
+        Returns:
+            Entries removed and bytes freed
+        """
+        return await asyncio.to_thread(self._trim_cache, namespaces, max_entries, max_bytes,
+                                       max_age, grace)
+    
+    def _trim_cache(self, namespaces: Iterable[str], max_entries: int, max_bytes: int,
+                    max_age: float, grace: float) -> Tuple[int, int]:
+        entries = []
+        for namespace in namespaces:
+            cache_dir = self.cache_root / namespace
+            if cache_dir.is_dir():
+                entries.extend(_measure(path) for path in cache_dir.iterdir()
+                               if not path.name.endswith(".tmp"))
+        entries = sorted(entry for entry in entries if entry is not None)
+        
+        now = time.time()
+        count = len(entries)
+        total = sum(size for _, size, _ in entries)
+        removed, freed = 0, 0
+        for last_used, size, path in entries:
+            expired = max_age > 0 and last_used < now - max_age
+            over = (max_entries > 0 and count > max_entries) or (max_bytes > 0 and total > max_bytes)
+            if not expired and not over:
+                break
+            if last_used > now - grace:
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+            count -= 1
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
+    
+    async def expire_batches(self, max_age: float) -> int:
+        """Delete batch records saved more than `max_age` seconds ago; returns how many"""
+        return await asyncio.to_thread(self._expire_batches, max_age)
+    
+    def _expire_batches(self, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        expired = 0
+        for file_path in self.batches_path.glob("*.json"):
+            try:
+                if file_path.stat().st_mtime < cutoff:
+                    file_path.unlink()
+                    expired += 1
+            except FileNotFoundError:
+                pass
+        return expired
 
 
+def _measure(path: Path) -> Optional[Tuple[float, int, Path]]:
+    """(last modification, total bytes, path) of a cache file or directory; None if it vanished"""
+    try:
+        stat = path.stat()
+        if not path.is_dir():
+            return stat.st_mtime, stat.st_size, path
+        last_used, size = stat.st_mtime, 0
+        for child in path.iterdir():
+            try:
+                child_stat = child.stat()
+            except FileNotFoundError:
+                continue
+            last_used = max(last_used, child_stat.st_mtime)
+            size += child_stat.st_size
+        return last_used, size, path
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,143 @@
+"""
+World index - a SQLite table of stored world files, so listing and cleanup need no directory scans
+"""
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class WorldIndex:
+    """
+    One row per saved world: file name, size of every file it owns (the
+    world, its model, compressed variants and chunks), encoding, owner,
+    save time and last access/download times
+
+    Shared by every process using the same storage directory (WAL mode,
+    one autocommit statement per call). Methods are synchronous;
+    StorageManager calls them from worker threads.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS worlds (
+            job_id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            bytes INTEGER NOT NULL,
+            encoding TEXT NOT NULL,
+            compression TEXT,
+            saved_at REAL NOT NULL,
+            user_id TEXT,
+            last_access REAL,
+            last_download REAL
+        );
+        CREATE INDEX IF NOT EXISTS worlds_saved ON worlds (saved_at);
+    """
+
+    # Columns added after the first release of the index, with their types
+    ADDED_COLUMNS = {"user_id": "TEXT", "last_access": "REAL", "last_download": "REAL"}
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False,
+                                   timeout=10.0)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(worlds)")}
+        for column, column_type in self.ADDED_COLUMNS.items():
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE worlds ADD COLUMN {column} {column_type}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS worlds_user ON worlds (user_id)")
+
+    def put(self, job_id: str, filename: str, size: int, encoding: str,
+            compression: Optional[str] = None, saved_at: Optional[float] = None,
+            user_id: Optional[str] = None):
+        """Record (or replace) a saved world"""
+        self._db.execute(
+            "INSERT OR REPLACE INTO worlds (job_id, filename, bytes, encoding, compression, saved_at, user_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, filename, size, encoding, compression, saved_at or time.time(), user_id)
+        )
+
+    def set_bytes(self, job_id: str, size: int):
+        """Record a new total size for a world's files"""
+        self._db.execute("UPDATE worlds SET bytes = ? WHERE job_id = ?", (size, job_id))
+
+    def touch(self, job_id: str, download: bool = False, min_interval: float = 0.0):
+        """
+        Record an access (and with `download`, a download) of a world
+
+        Args:
+            job_id: World to touch
+            download: Also set the last download time
+            min_interval: Skip the write if the last access is more recent
+                than this many seconds (chunked imports touch per chunk)
+        """
+        now = time.time()
+        if download:
+            self._db.execute(
+                "UPDATE worlds SET last_access = ?, last_download = ? WHERE job_id = ?",
+                (now, now, job_id)
+            )
+        else:
+            self._db.execute(
+                "UPDATE worlds SET last_access = ? WHERE job_id = ? "
+                "AND (last_access IS NULL OR last_access < ?)",
+                (now, job_id, now - min_interval)
+            )
+
+    def entries(self, order: str = "last_access") -> List[Dict[str, Any]]:
+        """
+        Every entry, least recently used first
+
+        Args:
+            order: "last_access" or "last_download"; worlds never accessed
+                (or downloaded) count from their save time
+        """
+        if order not in ("last_access", "last_download"):
+            raise ValueError(f"Unknown eviction order '{order}'")
+        rows = self._db.execute(f"SELECT * FROM worlds ORDER BY COALESCE({order}, saved_at), saved_at")
+        return [dict(row) for row in rows.fetchall()]
+
+    def remove(self, job_id: str) -> bool:
+        """Forget a world; False if it was not indexed"""
+        return self._db.execute("DELETE FROM worlds WHERE job_id = ?", (job_id,)).rowcount > 0
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Index entry of one world, or None"""
+        row = self._db.execute("SELECT * FROM worlds WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def list(self, limit: int = 50, offset: int = 0,
+             saved_before: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Index entries, newest first
+
+        Args:
+            limit: Maximum entries returned
+            offset: Entries to skip (paging)
+            saved_before: Only worlds saved before this Unix time (cleanup)
+        """
+        if saved_before is None:
+            rows = self._db.execute(
+                "SELECT * FROM worlds ORDER BY saved_at DESC LIMIT ? OFFSET ?", (limit, offset)
+            )
+        else:
+            rows = self._db.execute(
+                "SELECT * FROM worlds WHERE saved_at < ? ORDER BY saved_at DESC LIMIT ? OFFSET ?",
+                (saved_before, limit, offset)
+            )
+        return [dict(row) for row in rows.fetchall()]
+
+    def totals(self) -> Dict[str, int]:
+        """Number of indexed worlds and the total size of their files in bytes"""
+        row = self._db.execute("SELECT COUNT(*) AS worlds, COALESCE(SUM(bytes), 0) AS bytes FROM worlds").fetchone()
+        return {"worlds": row["worlds"], "bytes": row["bytes"]}
+
+    def is_empty(self) -> bool:
+        return self._db.execute("SELECT 1 FROM worlds LIMIT 1").fetchone() is None
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,34 @@
+"""
+Standalone generation worker - runs queued jobs from the shared job store
+
+Start any number of these next to API processes launched with
+EMBEDDED_WORKER=false:
+
+    python worker.py
+"""
+import asyncio
+import logging
+
+import main
+from core.job_worker import JobWorker
+
+
+async def run_worker():
+    """Claim and run jobs until interrupted"""
+    await main.generation_executor.warm_up()
+    worker = JobWorker(main.job_store, main.process_generation)
+    logging.info("Worker %s started (%d slots)", worker.worker_id, worker.concurrency)
+    try:
+        await worker.run()
+    finally:
+        await main.prompt_processor.aclose()
+        main.generation_executor.shutdown()
+        await main.job_store.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        pass
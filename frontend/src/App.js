@@ -18,12 +18,26 @@ function App() {
   const [recentJobs, setRecentJobs] = useState([]);
 
   useEffect(() => {
-    if (jobId) {
+    if (!jobId) {
+      return undefined;
+    }
+    if (!window.EventSource) {
       const interval = setInterval(() => {
         checkStatus(jobId);
       }, 2000);
       return () => clearInterval(interval);
     }
+
+    // The server pushes one event per stage; EventSource reconnects by itself
+    const source = new EventSource(`${API_URL}/api/progress/${jobId}/stream`);
+    source.addEventListener('progress', (event) => {
+      const data = JSON.parse(event.data);
+      handleStatus(data);
+      if (data.status === 'completed' || data.status === 'failed') {
+        source.close();
+      }
+    });
+    return () => source.close();
   }, [jobId]);
 
   useEffect(() => {
@@ -67,22 +81,24 @@ function App() {
     }
   };
 
+  const handleStatus = (data) => {
+    setProgress(data.progress || 0);
+    setStatus(`Status: ${data.status} (${data.progress || 0}%)`);
+
+    if (data.status === 'completed') {
+      setStatus('Generation completed! Download available below.');
+      setIsGenerating(false);
+      fetchRecentJobs();
+    } else if (data.status === 'failed') {
+      setStatus(`Generation failed: ${data.error || 'Unknown error'}`);
+      setIsGenerating(false);
+    }
+  };
+
   const checkStatus = async (id) => {
     try {
       const response = await axios.get(`${API_URL}/api/status/${id}`);
-      const data = response.data;
-
-      setProgress(data.progress || 0);
-      setStatus(`Status: ${data.status} (${data.progress || 0}%)`);
-
-      if (data.status === 'completed') {
-        setStatus('Generation completed! Download available below.');
-        setIsGenerating(false);
-        fetchRecentJobs();
-      } else if (data.status === 'failed') {
-        setStatus(`Generation failed: ${data.error || 'Unknown error'}`);
-        setIsGenerating(false);
-      }
+      handleStatus(response.data);
     } catch (error) {
       setStatus(`Error checking status: ${error.message}`);
       setIsGenerating(false);
@@ -98,7 +114,7 @@ function App() {
       const url = window.URL.createObjectURL(new Blob([response.data]));
       const link = document.createElement('a');
       link.href = url;
-      link.setAttribute('download', `world_${id}.rbxlx`);
+      link.setAttribute('download', `world_${id}.json`);
       document.body.appendChild(link);
       link.click();
       link.remove();
@@ -135,7 +151,7 @@ function App() {
                 id="worldSize"
                 type="range"
                 min="128"
-                max="2048"
+                max="16384"
                 step="64"
                 value={worldSize}
                 onChange={(e) => setWorldSize(parseInt(e.target.value))}
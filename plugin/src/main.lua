@@ -210,7 +210,7 @@ local function updateProgress(percent)
     progressBar.Size = UDim2.new(percent / 100, 0, 1, 0)
 end
 
-local function createPartFromData(partData, parent)
+local function createPartFromData(partData, parent, origin)
     local part = Instance.new("Part")
     part.Name = partData.name or "Part"
     part.Size = Vector3.new(
@@ -218,7 +218,7 @@ local function createPartFromData(partData, parent)
         partData.size.y or 4,
         partData.size.z or 4
     )
-    part.Position = Vector3.new(
+    part.Position = (origin or Vector3.zero) + Vector3.new(
         partData.position.x or 0,
         partData.position.y or 0,
         partData.position.z or 0
@@ -255,21 +255,20 @@ local function createModelFromData(modelData, parent)
     model.Name = modelData.name or "Model"
     model.PrimaryPart = nil
     
-    for _, partData in ipairs(modelData.parts or {}) do
-        local part = createPartFromData(partData, model)
-        if not model.PrimaryPart then
-            model.PrimaryPart = part
-        end
-    end
-    
+    -- Part positions are relative to the model's ground-level origin
+    local origin = Vector3.zero
     if modelData.position then
-        local cf = CFrame.new(
+        origin = Vector3.new(
             modelData.position.x or 0,
             modelData.position.y or 0,
             modelData.position.z or 0
         )
-        if model.PrimaryPart then
-            model:SetPrimaryPartCFrame(cf)
+    end
+    
+    for _, partData in ipairs(modelData.parts or {}) do
+        local part = createPartFromData(partData, model, origin)
+        if not model.PrimaryPart then
+            model.PrimaryPart = part
         end
     end
     
@@ -277,42 +276,496 @@ local function createModelFromData(modelData, parent)
     return model
 end
 
-local function generateTerrain(terrainData, workspace)
-    -- Placeholder terrain generation
-    -- In production, this would use Roblox Terrain API
-    updateStatus("Terrain generation not fully implemented in this version", Color3.fromRGB(255, 200, 0))
+-- Instanced objects: one template Part per prototype, cloned for every
+-- instance so only its CFrame has to be set
+local function buildPrototypes(prototypes)
+    local templates = {}
+    for index, prototype in ipairs(prototypes or {}) do
+        -- Prototype indices in the world file are 0-based
+        templates[index - 1] = createPartFromData({
+            name = prototype.name,
+            size = prototype.size,
+            position = {},
+            material = prototype.material,
+            color = prototype.color
+        }, nil)
+    end
+    return templates
+end
+
+local function createInstances(template, positions, rotations, parent)
+    for k, rotation in ipairs(rotations) do
+        local base = (k - 1) * 3
+        local part = template:Clone()
+        part.CFrame = CFrame.new(positions[base + 1], positions[base + 2], positions[base + 3])
+            * CFrame.Angles(0, math.rad(rotation), 0)
+        part.Parent = parent
+        if k % 500 == 0 then
+            task.wait()
+        end
+    end
+end
+
+-- Heightmap decoding (matches backend/core/heightmap_codec.py)
+local BASE64_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+local base64Lookup = {}
+for i = 1, #BASE64_ALPHABET do
+    base64Lookup[string.byte(BASE64_ALPHABET, i)] = i - 1
+end
+
+local function base64Decode(text)
+    text = string.gsub(text, "[^%w%+/]", "")
+    local groups = #text // 4
+    local remainder = #text % 4
+    local out = buffer.create(groups * 3 + math.max(remainder - 1, 0))
+    local outPos = 0
+    
+    for g = 0, groups - 1 do
+        local a, b, c, d = string.byte(text, g * 4 + 1, g * 4 + 4)
+        local n = base64Lookup[a] * 262144 + base64Lookup[b] * 4096 + base64Lookup[c] * 64 + base64Lookup[d]
+        buffer.writeu8(out, outPos, bit32.rshift(n, 16))
+        buffer.writeu8(out, outPos + 1, bit32.band(bit32.rshift(n, 8), 255))
+        buffer.writeu8(out, outPos + 2, bit32.band(n, 255))
+        outPos += 3
+    end
+    
+    if remainder >= 2 then
+        local a, b, c = string.byte(text, groups * 4 + 1, groups * 4 + 3)
+        local n = base64Lookup[a] * 262144 + base64Lookup[b] * 4096 + (c and base64Lookup[c] * 64 or 0)
+        buffer.writeu8(out, outPos, bit32.rshift(n, 16))
+        if remainder == 3 then
+            buffer.writeu8(out, outPos + 1, bit32.band(bit32.rshift(n, 8), 255))
+        end
+    end
+    
+    return out
+end
+
+local LENGTH_BASE = {3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 15, 17, 19, 23, 27, 31, 35, 43, 51, 59, 67, 83, 99, 115, 131, 163, 195, 227, 258}
+local LENGTH_EXTRA = {0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 4, 4, 4, 4, 5, 5, 5, 5, 0}
+local DIST_BASE = {1, 2, 3, 4, 5, 7, 9, 13, 17, 25, 33, 49, 65, 97, 129, 193, 257, 385, 513, 769, 1025, 1537, 2049, 3073, 4097, 6145, 8193, 12289, 16385, 24577}
+local DIST_EXTRA = {0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7, 8, 8, 9, 9, 10, 10, 11, 11, 12, 12, 13, 13}
+local CODE_LENGTH_ORDER = {16, 17, 18, 0, 8, 7, 9, 6, 10, 5, 11, 4, 12, 3, 13, 2, 14, 1, 15}
+
+-- Canonical Huffman table: code counts per length and symbols in code order
+local function buildHuffman(lengths, count)
+    local counts = {}
+    for len = 0, 15 do
+        counts[len] = 0
+    end
+    for symbol = 0, count - 1 do
+        counts[lengths[symbol]] += 1
+    end
+    
+    local offsets = {[1] = 0}
+    for len = 1, 14 do
+        offsets[len + 1] = offsets[len] + counts[len]
+    end
+    
+    local symbols = {}
+    for symbol = 0, count - 1 do
+        local len = lengths[symbol]
+        if len ~= 0 then
+            symbols[offsets[len]] = symbol
+            offsets[len] += 1
+        end
+    end
+    
+    return {counts = counts, symbols = symbols}
+end
+
+local fixedLiterals, fixedDistances
+do
+    local lengths = {}
+    for symbol = 0, 287 do
+        lengths[symbol] = (symbol < 144 and 8) or (symbol < 256 and 9) or (symbol < 280 and 7) or 8
+    end
+    fixedLiterals = buildHuffman(lengths, 288)
+    
+    local distLengths = {}
+    for symbol = 0, 29 do
+        distLengths[symbol] = 5
+    end
+    fixedDistances = buildHuffman(distLengths, 30)
+end
+
+-- Inflate a zlib stream into a buffer of known size
+local function zlibDecompress(input, outputLength)
+    local pos = 2  -- skip the zlib header; the Adler-32 trailer is not checked
+    local bitBuffer, bitCount = 0, 0
+    local out = buffer.create(outputLength)
+    local outPos = 0
+    
+    local function readBits(n)
+        while bitCount < n do
+            bitBuffer = bit32.bor(bitBuffer, bit32.lshift(buffer.readu8(input, pos), bitCount))
+            pos += 1
+            bitCount += 8
+        end
+        local value = bit32.band(bitBuffer, bit32.lshift(1, n) - 1)
+        bitBuffer = bit32.rshift(bitBuffer, n)
+        bitCount -= n
+        return value
+    end
+    
+    local function decodeSymbol(huffman)
+        local code, first, index = 0, 0, 0
+        for len = 1, 15 do
+            code = bit32.bor(code, readBits(1))
+            local count = huffman.counts[len]
+            if code - count < first then
+                return huffman.symbols[index + code - first]
+            end
+            index += count
+            first = (first + count) * 2
+            code *= 2
+        end
+        error("Invalid Huffman code in heightmap data")
+    end
+    
+    local function readDynamicTables()
+        local literalCount = readBits(5) + 257
+        local distanceCount = readBits(5) + 1
+        local codeLengthCount = readBits(4) + 4
+        
+        local codeLengths = {}
+        for symbol = 0, 18 do
+            codeLengths[symbol] = 0
+        end
+        for i = 1, codeLengthCount do
+            codeLengths[CODE_LENGTH_ORDER[i]] = readBits(3)
+        end
+        local codeLengthTable = buildHuffman(codeLengths, 19)
+        
+        local lengths = {}
+        local index = 0
+        while index < literalCount + distanceCount do
+            local symbol = decodeSymbol(codeLengthTable)
+            if symbol < 16 then
+                lengths[index] = symbol
+                index += 1
+            else
+                local value, repeatCount = 0, 0
+                if symbol == 16 then
+                    value = lengths[index - 1]
+                    repeatCount = 3 + readBits(2)
+                elseif symbol == 17 then
+                    repeatCount = 3 + readBits(3)
+                else
+                    repeatCount = 11 + readBits(7)
+                end
+                for _ = 1, repeatCount do
+                    lengths[index] = value
+                    index += 1
+                end
+            end
+        end
+        
+        local literalLengths, distanceLengths = {}, {}
+        for symbol = 0, literalCount - 1 do
+            literalLengths[symbol] = lengths[symbol]
+        end
+        for symbol = 0, distanceCount - 1 do
+            distanceLengths[symbol] = lengths[literalCount + symbol]
+        end
+        return buildHuffman(literalLengths, literalCount), buildHuffman(distanceLengths, distanceCount)
+    end
+    
+    repeat
+        local final = readBits(1)
+        local blockType = readBits(2)
+        
+        if blockType == 0 then
+            -- Stored block: drop the partial byte, then copy LEN bytes
+            bitBuffer, bitCount = 0, 0
+            local len = buffer.readu16(input, pos)
+            buffer.copy(out, outPos, input, pos + 4, len)
+            pos += 4 + len
+            outPos += len
+        elseif blockType == 1 or blockType == 2 then
+            local literals, distances = fixedLiterals, fixedDistances
+            if blockType == 2 then
+                literals, distances = readDynamicTables()
+            end
+            
+            while true do
+                local symbol = decodeSymbol(literals)
+                if symbol < 256 then
+                    buffer.writeu8(out, outPos, symbol)
+                    outPos += 1
+                elseif symbol == 256 then
+                    break
+                else
+                    symbol -= 256
+                    local length = LENGTH_BASE[symbol] + readBits(LENGTH_EXTRA[symbol])
+                    local distSymbol = decodeSymbol(distances) + 1
+                    local distance = DIST_BASE[distSymbol] + readBits(DIST_EXTRA[distSymbol])
+                    for _ = 1, length do
+                        buffer.writeu8(out, outPos, buffer.readu8(out, outPos - distance))
+                        outPos += 1
+                    end
+                end
+            end
+        else
+            error("Invalid block type in heightmap data")
+        end
+    until final == 1
+    
+    return out
+end
+
+-- Decode an int16 heightmap ({encoding, shape, scale, offset, delta, compression, data})
+local function decodeHeightmap(encoded)
+    local rows, cols = encoded.shape[1], encoded.shape[2]
+    local data = base64Decode(encoded.data)
+    if encoded.compression == "zlib" then
+        data = zlibDecompress(data, rows * cols * 2)
+    end
+    
+    local heights = table.create(rows)
+    local value = 0
+    local offset = 0
+    for i = 1, rows do
+        local row = table.create(cols)
+        for j = 1, cols do
+            local sample = buffer.readi16(data, offset)
+            offset += 2
+            if encoded.delta then
+                -- Running sum wraps in 16 bits, mirroring the encoder
+                value += sample
+                if value > 32767 then
+                    value -= 65536
+                elseif value < -32768 then
+                    value += 65536
+                end
+            else
+                value = sample
+            end
+            row[j] = value * encoded.scale + encoded.offset
+        end
+        heights[i] = row
+    end
+    
+    return heights
 end
 
-local function importWorld(worldData)
+-- Accept both encoded heightmaps and plain nested lists
+local function readHeightmap(heightmap)
+    if heightmap.encoding then
+        return decodeHeightmap(heightmap)
+    end
+    return heightmap
+end
+
+local TERRAIN_MATERIALS = {
+    mountain = Enum.Material.Rock,
+    valley = Enum.Material.Grass,
+    plains = Enum.Material.Grass,
+    island = Enum.Material.Sand,
+    desert = Enum.Material.Sand,
+    forest = Enum.Material.LeafyGrass
+}
+-- Same floor and water line as the server's voxelizer (core/voxels.py)
+local TERRAIN_FLOOR = -20
+local WATER_LEVEL = -10
+
+-- Fill terrain for a block of samples whose first sample is (firstRow, firstCol);
+-- terrainInfo carries the world's terrain type, scale and resolution
+-- `step` > 1 fills a coarser level of detail: each height covers a
+-- step x step block of full-resolution samples
+local function fillTerrainTile(terrain, heights, firstRow, firstCol, terrainInfo, step)
+    step = step or 1
+    local scale = terrainInfo.scale or 4
+    local half = (terrainInfo.resolution or #heights) * scale / 2
+    local width = scale * step
+    local material = TERRAIN_MATERIALS[terrainInfo.type] or Enum.Material.Grass
+    
+    -- Row i runs along x and column j along z; samples sit at cell centers
+    for i, row in ipairs(heights) do
+        local x = (firstRow + (i - 1) * step + step / 2) * scale - half
+        for j, height in ipairs(row) do
+            local z = (firstCol + (j - 1) * step + step / 2) * scale - half
+            local columnHeight = math.max(height - TERRAIN_FLOOR, scale)
+            terrain:FillBlock(
+                CFrame.new(x, TERRAIN_FLOOR + columnHeight / 2, z),
+                Vector3.new(width, columnHeight, width),
+                height <= WATER_LEVEL and Enum.Material.Water or material
+            )
+        end
+        if i % 16 == 0 then
+            task.wait()
+        end
+    end
+end
+
+-- Write run-length encoded voxel regions ({encoding, voxel_size, materials,
+-- regions}) with one WriteVoxels call per region; the server already
+-- picked materials and occupancy, so this only unpacks runs
+local function writeVoxels(terrain, voxels)
+    local palette = {}
+    for i, name in ipairs(voxels.materials) do
+        palette[i - 1] = Enum.Material[name]
+    end
+    local resolution = voxels.voxel_size
+    
+    for _, region in ipairs(voxels.regions) do
+        local data = base64Decode(region.data)
+        if region.compression == "zlib" then
+            data = zlibDecompress(data, region.bytes)
+        end
+        
+        local sizeX, sizeY, sizeZ = region.size[1], region.size[2], region.size[3]
+        local materials = table.create(sizeX)
+        local occupancy = table.create(sizeX)
+        for x = 1, sizeX do
+            materials[x] = table.create(sizeY)
+            occupancy[x] = table.create(sizeY)
+            for y = 1, sizeY do
+                materials[x][y] = table.create(sizeZ)
+                occupancy[x][y] = table.create(sizeZ)
+            end
+        end
+        
+        -- Runs are material (u8), occupancy (u8, 255 = full) and length
+        -- (u16), in x, z, y order with y fastest
+        local x, y, z = 1, 1, 1
+        for offset = 0, region.bytes - 4, 4 do
+            local material = palette[buffer.readu8(data, offset)]
+            local amount = buffer.readu8(data, offset + 1) / 255
+            for _ = 1, buffer.readu16(data, offset + 2) do
+                materials[x][y][z] = material
+                occupancy[x][y][z] = amount
+                y += 1
+                if y > sizeY then
+                    y = 1
+                    z += 1
+                    if z > sizeZ then
+                        z = 1
+                        x += 1
+                    end
+                end
+            end
+        end
+        
+        local origin = Vector3.new(region.origin[1], region.origin[2], region.origin[3])
+        local extent = Vector3.new(sizeX, sizeY, sizeZ) * resolution
+        terrain:WriteVoxels(Region3.new(origin, origin + extent), resolution, materials, occupancy)
+        task.wait()
+    end
+end
+
+local CHUNK_RETRIES = 3
+
+-- GET and decode JSON, retrying with backoff so one dropped request does not
+-- restart a large download
+local function fetchJson(url)
+    local lastError
+    for attempt = 1, CHUNK_RETRIES do
+        local success, response = pcall(function()
+            return HttpService:GetAsync(url)
+        end)
+        if success then
+            return HttpService:JSONDecode(response)
+        end
+        lastError = response
+        task.wait(attempt)
+    end
+    error(lastError)
+end
+
+-- Cells within this many cell widths of the camera import at full detail;
+-- each further ring drops one level of detail
+local LOD_RING_CELLS = 2
+
+-- Does a chunk belong in a cell imported at level of detail `lod`? Terrain
+-- comes once per level; object chunks show at their level and finer
+local function chunkWanted(entry, lod)
+    if entry.kind == "terrain" then
+        return entry.lod == lod
+    end
+    return entry.lod >= lod
+end
+
+-- Import a world cell by cell, nearest the camera first: near cells at full
+-- detail, distant ones with coarser terrain and without small objects
+local function importWorldChunked(jobId)
     local workspace = game:GetService("Workspace")
+    local baseUrl = API_URL .. "/api/download/" .. jobId
+    local manifest = fetchJson(baseUrl .. "/manifest")
+    local templates = buildPrototypes(manifest.prototypes)
     
-    -- Create world folder
     local worldFolder = Instance.new("Folder")
     worldFolder.Name = "GeneratedWorld_" .. os.time()
     worldFolder.Parent = workspace
     
-    -- Generate terrain
-    if worldData.workspace.terrain then
-        generateTerrain(worldData.workspace.terrain, workspace)
+    local camera = workspace.CurrentCamera
+    local focus = camera and camera.Focus.Position or Vector3.zero
+    local cells = {}
+    for _, cell in ipairs(manifest.cells) do
+        local centerX = (cell.bounds.min[1] + cell.bounds.max[1]) / 2
+        local centerZ = (cell.bounds.min[3] + cell.bounds.max[3]) / 2
+        local distance = Vector2.new(centerX - focus.X, centerZ - focus.Z).Magnitude
+        local lod = math.clamp(
+            math.floor(distance / (manifest.cell_size * LOD_RING_CELLS)),
+            0,
+            manifest.lod_levels - 1
+        )
+        table.insert(cells, {cell = cell, distance = distance, lod = lod})
     end
+    table.sort(cells, function(a, b)
+        return a.distance < b.distance
+    end)
     
-    -- Create parts
-    for _, partData in ipairs(worldData.workspace.parts or {}) do
-        createPartFromData(partData, worldFolder)
+    local plan = {}
+    for _, item in ipairs(cells) do
+        for _, index in ipairs(item.cell.chunks) do
+            -- Manifest entries are in chunk index order; indices are 0-based
+            local entry = manifest.chunks[index + 1]
+            if chunkWanted(entry, item.lod) then
+                table.insert(plan, entry)
+            end
+        end
     end
     
-    -- Create models
-    for _, modelData in ipairs(worldData.workspace.models or {}) do
-        createModelFromData(modelData, worldFolder)
+    for done, entry in ipairs(plan) do
+        local chunk = fetchJson(baseUrl .. "/chunks/" .. entry.index)
+        
+        if chunk.kind == "terrain" and chunk.voxels then
+            writeVoxels(workspace.Terrain, chunk.voxels)
+        elseif chunk.kind == "terrain" then
+            fillTerrainTile(workspace.Terrain, readHeightmap(chunk.heightmap), chunk.row, chunk.col, manifest.terrain, chunk.step)
+        elseif chunk.kind == "models" then
+            for _, modelData in ipairs(chunk.items) do
+                createModelFromData(modelData, worldFolder)
+            end
+        elseif chunk.kind == "instances" then
+            createInstances(templates[chunk.prototype], chunk.positions, chunk.rotations, worldFolder)
+        elseif chunk.kind == "parts" then
+            for _, partData in ipairs(chunk.items) do
+                createPartFromData(partData, worldFolder)
+            end
+        end
+        
+        updateProgress(100 * done / #plan)
+        updateStatus("Importing... " .. done .. "/" .. #plan .. " chunks", Color3.fromRGB(0, 162, 255))
     end
     
     Selection:Set({worldFolder})
     updateStatus("World imported successfully!", Color3.fromRGB(0, 255, 0))
 end
 
-local function checkStatus(jobId)
+-- Seconds the server may hold a status request open (below HttpService's timeout)
+local LONG_POLL_SECONDS = 20
+
+-- Long-poll the job's status: each request returns as soon as the status or
+-- progress moves past what we last saw, so a job costs one request per stage
+local function checkStatus(jobId, lastStatus, lastProgress)
+    local url = string.format(
+        "%s/api/status/%s?wait=%d&status=%s&progress=%d",
+        API_URL, jobId, LONG_POLL_SECONDS, lastStatus, lastProgress
+    )
     local success, response = pcall(function()
-        return HttpService:GetAsync(API_URL .. "/api/status/" .. jobId)
+        return HttpService:GetAsync(url)
     end)
     
     if not success then
@@ -323,21 +776,15 @@ local function checkStatus(jobId)
     local statusData = HttpService:JSONDecode(response)
     
     if statusData.status == "completed" then
-        updateProgress(100)
-        -- Download world
-        local downloadSuccess, worldResponse = pcall(function()
-            return HttpService:GetAsync(API_URL .. "/api/download/" .. jobId)
-        end)
+        -- Download the world in chunks so large worlds stay under request size limits
+        local downloadSuccess, downloadError = pcall(importWorldChunked, jobId)
         
         if downloadSuccess then
-            local worldData = HttpService:JSONDecode(worldResponse)
-            importWorld(worldData)
             progressFrame.Visible = false
-            return true
         else
-            updateStatus("Error downloading world: " .. tostring(worldResponse), Color3.fromRGB(255, 0, 0))
-            return false
+            updateStatus("Error downloading world: " .. tostring(downloadError), Color3.fromRGB(255, 0, 0))
         end
+        return false
     elseif statusData.status == "failed" then
         updateStatus("Generation failed: " .. (statusData.error or "Unknown error"), Color3.fromRGB(255, 0, 0))
         progressFrame.Visible = false
@@ -345,7 +792,7 @@ local function checkStatus(jobId)
     else
         updateProgress(statusData.progress or 0)
         updateStatus("Generating... " .. (statusData.progress or 0) .. "%", Color3.fromRGB(0, 162, 255))
-        return true
+        return true, statusData.status, statusData.progress or 0
     end
 end
 
@@ -388,13 +835,13 @@ local function startGeneration()
     local responseData = HttpService:JSONDecode(response)
     local jobId = responseData.job_id
     
-    -- Poll for status
-    local connection
-    connection = game:GetService("RunService").Heartbeat:Connect(function()
-        if not checkStatus(jobId) then
-            connection:Disconnect()
-            generateButton.Enabled = true
+    -- Follow the job with long-polls until it finishes
+    task.spawn(function()
+        local keepPolling, lastStatus, lastProgress = true, "queued", 0
+        while keepPolling do
+            keepPolling, lastStatus, lastProgress = checkStatus(jobId, lastStatus, lastProgress)
         end
+        generateButton.Enabled = true
     end)
 end
 